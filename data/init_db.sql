@@ -9,11 +9,16 @@ CREATE TABLE projet.table_cles_api(
     id_utilisateur                SERIAL, 
     cle_api                         TEXT,
     type_utilisateur                TEXT,
+    prefixe                         TEXT,
     PRIMARY KEY (id_utilisateur, cle_api)
 );
+CREATE UNIQUE INDEX table_cles_api_prefixe_idx ON projet.table_cles_api (prefixe);
 
 -----------------------------------------------------
 -- historique_consommateur
+-- Partitionnée par mois de date_requete : les lectures filtrées par date ne parcourent
+-- que les mois concernés et la rétention supprime des partitions entières.
+-- Les lignes d'un mois sans partition sont reçues par la partition par défaut.
 -----------------------------------------------------
 DROP TABLE IF EXISTS projet.historique_consommateur CASCADE ;
 CREATE TABLE projet.historique_consommateur(
@@ -32,4 +37,261 @@ CREATE TABLE projet.historique_consommateur(
     FOREIGN KEY (id_utilisateur, cle_api) 
         REFERENCES projet.table_cles_api (id_utilisateur, cle_api)
         ON DELETE CASCADE
-);
\ No newline at end of file
+) PARTITION BY RANGE (date_requete);
+CREATE TABLE projet.historique_consommateur_defaut PARTITION OF projet.historique_consommateur DEFAULT;
+-- Pagination par clé de l'historique complet (vue administrateur)
+CREATE INDEX historique_consommateur_date_idx ON projet.historique_consommateur (date_requete, cle_api);
+-- Historique d'un utilisateur (vue administrateur)
+CREATE INDEX historique_consommateur_utilisateur_idx ON projet.historique_consommateur (id_utilisateur, date_requete);
+
+-----------------------------------------------------
+-- totaux_consommateur
+-- Nombre de requêtes et somme des empreintes de chaque clé API,
+-- tenus à jour par trigger sur projet.historique_consommateur.
+-----------------------------------------------------
+DROP TABLE IF EXISTS projet.totaux_consommateur CASCADE ;
+CREATE TABLE projet.totaux_consommateur(
+    id_utilisateur                 INT,
+    cle_api                       TEXT,
+    nb_requetes                 BIGINT NOT NULL DEFAULT 0,
+    somme_empreinte   DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (cle_api),
+    FOREIGN KEY (id_utilisateur, cle_api) 
+        REFERENCES projet.table_cles_api (id_utilisateur, cle_api)
+        ON DELETE CASCADE
+);
+
+CREATE OR REPLACE FUNCTION projet.maj_totaux_consommateur() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE projet.totaux_consommateur t
+            SET nb_requetes = t.nb_requetes - a.nb_requetes,
+                somme_empreinte = t.somme_empreinte - a.somme_empreinte
+            FROM (SELECT cle_api, COUNT(*) AS nb_requetes, COALESCE(SUM(empreinte_carbone), 0) AS somme_empreinte
+                    FROM anciennes GROUP BY cle_api) a
+            WHERE t.cle_api = a.cle_api;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO projet.totaux_consommateur AS t (id_utilisateur, cle_api, nb_requetes, somme_empreinte)
+            SELECT id_utilisateur, cle_api, COUNT(*), COALESCE(SUM(empreinte_carbone), 0)
+                FROM nouvelles GROUP BY id_utilisateur, cle_api
+            ON CONFLICT (cle_api) DO UPDATE
+                SET nb_requetes = t.nb_requetes + EXCLUDED.nb_requetes,
+                    somme_empreinte = t.somme_empreinte + EXCLUDED.somme_empreinte;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER historique_consommateur_insertion
+    AFTER INSERT ON projet.historique_consommateur
+    REFERENCING NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_totaux_consommateur();
+CREATE TRIGGER historique_consommateur_modification
+    AFTER UPDATE ON projet.historique_consommateur
+    REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_totaux_consommateur();
+CREATE TRIGGER historique_consommateur_suppression
+    AFTER DELETE ON projet.historique_consommateur
+    REFERENCING OLD TABLE AS anciennes
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_totaux_consommateur();
+
+-----------------------------------------------------
+-- agregats_consommateur_jour
+-- Agrégats quotidiens de l'historique par clé API et par combinaison de résolution, matériel
+-- et type de connexion (nombre, somme, minimum et maximum des empreintes), tenus à jour par trigger
+-- sur projet.historique_consommateur et conservés quand la rétention supprime l'historique détaillé.
+-----------------------------------------------------
+DROP TABLE IF EXISTS projet.agregats_consommateur_jour CASCADE ;
+CREATE TABLE projet.agregats_consommateur_jour(
+    id_utilisateur                 INT,
+    cle_api                       TEXT,
+    jour                          DATE,
+    resolution                     INT,
+    materiel                      TEXT,
+    type_connexion                TEXT,
+    nb_requetes                 BIGINT NOT NULL,
+    somme_empreinte   DOUBLE PRECISION NOT NULL,
+    min_empreinte                 REAL,
+    max_empreinte                 REAL,
+    PRIMARY KEY (cle_api, jour, resolution, materiel, type_connexion),
+    FOREIGN KEY (id_utilisateur, cle_api) 
+        REFERENCES projet.table_cles_api (id_utilisateur, cle_api)
+        ON DELETE CASCADE
+);
+CREATE INDEX agregats_consommateur_jour_jour_idx ON projet.agregats_consommateur_jour (jour);
+CREATE INDEX agregats_consommateur_jour_utilisateur_idx ON projet.agregats_consommateur_jour (id_utilisateur, jour);
+
+-- Avancement de la reconstitution des agrégats à partir de l'historique existant :
+-- les jours [prochain_jour, jour_fin) restent à recalculer.
+DROP TABLE IF EXISTS projet.reprise_agregats CASCADE ;
+CREATE TABLE projet.reprise_agregats(
+    nom                           TEXT,
+    prochain_jour                 DATE,
+    jour_fin                      DATE,
+    PRIMARY KEY (nom)
+);
+
+CREATE OR REPLACE FUNCTION projet.recalculer_agregats_consommateur(cles TEXT[], jours DATE[]) RETURNS VOID AS $$
+    DELETE FROM projet.agregats_consommateur_jour a
+        USING unnest(cles, jours) AS j(cle_api, jour)
+        WHERE a.cle_api = j.cle_api AND a.jour = j.jour;
+    INSERT INTO projet.agregats_consommateur_jour (id_utilisateur, cle_api, jour, resolution, materiel, type_connexion,
+                                                   nb_requetes, somme_empreinte, min_empreinte, max_empreinte)
+        SELECT h.id_utilisateur, h.cle_api, j.jour, COALESCE(h.resolution, 0), COALESCE(h.materiel, ''),
+               COALESCE(h.type_connexion, ''), COUNT(*), COALESCE(SUM(h.empreinte_carbone), 0),
+               MIN(h.empreinte_carbone), MAX(h.empreinte_carbone)
+            FROM unnest(cles, jours) AS j(cle_api, jour)
+            JOIN projet.historique_consommateur h
+              ON h.cle_api = j.cle_api AND h.date_requete >= j.jour AND h.date_requete < j.jour + 1
+            GROUP BY h.id_utilisateur, h.cle_api, j.jour, COALESCE(h.resolution, 0), COALESCE(h.materiel, ''),
+                     COALESCE(h.type_connexion, '');
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION projet.maj_agregats_consommateur() RETURNS TRIGGER AS $$
+DECLARE
+    cles TEXT[];
+    jours DATE[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO projet.agregats_consommateur_jour AS a (id_utilisateur, cle_api, jour, resolution, materiel,
+                                                            type_connexion, nb_requetes, somme_empreinte,
+                                                            min_empreinte, max_empreinte)
+            SELECT id_utilisateur, cle_api, date_requete::date, COALESCE(resolution, 0), COALESCE(materiel, ''),
+                   COALESCE(type_connexion, ''), COUNT(*), COALESCE(SUM(empreinte_carbone), 0),
+                   MIN(empreinte_carbone), MAX(empreinte_carbone)
+                FROM nouvelles
+                GROUP BY id_utilisateur, cle_api, date_requete::date, COALESCE(resolution, 0),
+                         COALESCE(materiel, ''), COALESCE(type_connexion, '')
+            ON CONFLICT (cle_api, jour, resolution, materiel, type_connexion) DO UPDATE
+                SET nb_requetes = a.nb_requetes + EXCLUDED.nb_requetes,
+                    somme_empreinte = a.somme_empreinte + EXCLUDED.somme_empreinte,
+                    min_empreinte = LEAST(a.min_empreinte, EXCLUDED.min_empreinte),
+                    max_empreinte = GREATEST(a.max_empreinte, EXCLUDED.max_empreinte);
+        RETURN NULL;
+    END IF;
+    -- Les agrégats survivent à la suppression de l'historique détaillé par la rétention.
+    IF current_setting('projet.retention', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    -- Le minimum et le maximum ne se décrémentent pas : les jours touchés sont recalculés depuis l'historique.
+    SELECT array_agg(cle_api), array_agg(jour) INTO cles, jours
+        FROM (SELECT DISTINCT cle_api, date_requete::date AS jour FROM anciennes) j;
+    PERFORM projet.recalculer_agregats_consommateur(cles, jours);
+    IF TG_OP = 'UPDATE' THEN
+        SELECT array_agg(cle_api), array_agg(jour) INTO cles, jours
+            FROM (SELECT DISTINCT cle_api, date_requete::date AS jour FROM nouvelles) j;
+        PERFORM projet.recalculer_agregats_consommateur(cles, jours);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER agregats_consommateur_insertion
+    AFTER INSERT ON projet.historique_consommateur
+    REFERENCING NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_agregats_consommateur();
+CREATE TRIGGER agregats_consommateur_modification
+    AFTER UPDATE ON projet.historique_consommateur
+    REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_agregats_consommateur();
+CREATE TRIGGER agregats_consommateur_suppression
+    AFTER DELETE ON projet.historique_consommateur
+    REFERENCING OLD TABLE AS anciennes
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_agregats_consommateur();
+
+-----------------------------------------------------
+-- Partitions mensuelles de historique_consommateur
+-- creer_partitions_historique(debut, fin) crée les mois manquants entre deux dates,
+-- purger_historique(avant) supprime l'historique antérieur à une date en supprimant les partitions entières.
+-----------------------------------------------------
+CREATE OR REPLACE FUNCTION projet.creer_partition_historique(mois DATE) RETURNS BOOLEAN AS $$
+DECLARE
+    debut DATE := date_trunc('month', mois)::date;
+    fin DATE := (date_trunc('month', mois) + INTERVAL '1 month')::date;
+    nom TEXT := 'historique_consommateur_p' || to_char(mois, 'YYYYMM');
+BEGIN
+    -- Verrou pris avant de vérifier l'existence de la partition : deux appels concurrents pour le même mois
+    -- sont sérialisés jusqu'à la fin de la transaction, le second constate que la partition existe déjà.
+    PERFORM pg_advisory_xact_lock(hashtext('projet.' || nom));
+    IF to_regclass('projet.' || nom) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+    -- Les lignes du mois déjà reçues par la partition par défaut sont déplacées avant le rattachement,
+    -- directement entre partitions : les triggers de l'historique ne sont pas déclenchés.
+    LOCK TABLE projet.historique_consommateur_defaut IN ACCESS EXCLUSIVE MODE;
+    EXECUTE format('CREATE TABLE projet.%I (LIKE projet.historique_consommateur INCLUDING DEFAULTS)', nom);
+    EXECUTE format('WITH deplacees AS (DELETE FROM projet.historique_consommateur_defaut '
+                   '    WHERE date_requete >= %L AND date_requete < %L RETURNING *) '
+                   'INSERT INTO projet.%I SELECT * FROM deplacees', debut, fin, nom);
+    EXECUTE format('ALTER TABLE projet.historique_consommateur ATTACH PARTITION projet.%I '
+                   '    FOR VALUES FROM (%L) TO (%L)', nom, debut, fin);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION projet.creer_partitions_historique(debut DATE, fin DATE) RETURNS INT AS $$
+DECLARE
+    mois DATE := date_trunc('month', debut)::date;
+    nb INT := 0;
+BEGIN
+    WHILE mois <= fin LOOP
+        IF projet.creer_partition_historique(mois) THEN
+            nb := nb + 1;
+        END IF;
+        mois := (mois + INTERVAL '1 month')::date;
+    END LOOP;
+    RETURN nb;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION projet.purger_historique(avant TIMESTAMP) RETURNS BIGINT AS $$
+DECLARE
+    partition TEXT;
+    nb BIGINT := 0;
+    nb_partition BIGINT;
+BEGIN
+    FOR partition IN
+        SELECT c.relname
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'projet.historique_consommateur'::regclass
+              AND c.relname ~ '^historique_consommateur_p[0-9]{6}$'
+              AND to_date(right(c.relname, 6), 'YYYYMM') + INTERVAL '1 month' <= avant
+            ORDER BY c.relname
+    LOOP
+        EXECUTE format('LOCK TABLE projet.%I IN ACCESS EXCLUSIVE MODE', partition);
+        -- La suppression d'une partition ne déclenche pas les triggers : les totaux sont corrigés ici.
+        EXECUTE format('WITH anciennes AS (SELECT cle_api, COUNT(*) AS nb_requetes, '
+                       '        COALESCE(SUM(empreinte_carbone), 0) AS somme_empreinte '
+                       '        FROM projet.%I GROUP BY cle_api), '
+                       '    maj AS (UPDATE projet.totaux_consommateur t '
+                       '        SET nb_requetes = t.nb_requetes - a.nb_requetes, '
+                       '            somme_empreinte = t.somme_empreinte - a.somme_empreinte '
+                       '        FROM anciennes a WHERE t.cle_api = a.cle_api) '
+                       'SELECT COALESCE(SUM(nb_requetes), 0) FROM anciennes', partition) INTO nb_partition;
+        EXECUTE format('DROP TABLE projet.%I', partition);
+        nb := nb + nb_partition;
+    END LOOP;
+    -- Reste éventuel dans la partition par défaut ou dans un mois entamé.
+    -- Les agrégats quotidiens sont conservés (voir projet.maj_agregats_consommateur).
+    PERFORM set_config('projet.retention', 'on', true);
+    DELETE FROM projet.historique_consommateur WHERE date_requete < avant;
+    GET DIAGNOSTICS nb_partition = ROW_COUNT;
+    PERFORM set_config('projet.retention', 'off', true);
+    RETURN nb + nb_partition;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT projet.creer_partitions_historique(CURRENT_DATE, (CURRENT_DATE + INTERVAL '3 months')::date);
+
+-----------------------------------------------------
+-- cache_zone
+-----------------------------------------------------
+DROP TABLE IF EXISTS projet.cache_zone CASCADE ;
+CREATE TABLE projet.cache_zone(
+    ville                         TEXT,
+    pays                          TEXT,
+    zone                          TEXT,
+    date_maj                 TIMESTAMP,
+    PRIMARY KEY (ville, pays)
+);
@@ -0,0 +1,7 @@
+-----------------------------------------------------
+-- Préfixe public des clés API
+-- Les clés existantes gardent un préfixe NULL et restent valides ;
+-- elles peuvent être migrées une à une via /migrer-cle.
+-----------------------------------------------------
+ALTER TABLE projet.table_cles_api ADD COLUMN IF NOT EXISTS prefixe TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS table_cles_api_prefixe_idx ON projet.table_cles_api (prefixe);
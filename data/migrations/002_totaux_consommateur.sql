@@ -0,0 +1,61 @@
+-----------------------------------------------------
+-- Totaux par clé API de l'historique des consommateurs
+-- (nombre de requêtes et somme des empreintes), tenus à jour par trigger
+-- et initialisés à partir de l'historique existant.
+-----------------------------------------------------
+CREATE TABLE IF NOT EXISTS projet.totaux_consommateur(
+    id_utilisateur                 INT,
+    cle_api                       TEXT,
+    nb_requetes                 BIGINT NOT NULL DEFAULT 0,
+    somme_empreinte   DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (cle_api),
+    FOREIGN KEY (id_utilisateur, cle_api) 
+        REFERENCES projet.table_cles_api (id_utilisateur, cle_api)
+        ON DELETE CASCADE
+);
+
+CREATE OR REPLACE FUNCTION projet.maj_totaux_consommateur() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE projet.totaux_consommateur t
+            SET nb_requetes = t.nb_requetes - a.nb_requetes,
+                somme_empreinte = t.somme_empreinte - a.somme_empreinte
+            FROM (SELECT cle_api, COUNT(*) AS nb_requetes, COALESCE(SUM(empreinte_carbone), 0) AS somme_empreinte
+                    FROM anciennes GROUP BY cle_api) a
+            WHERE t.cle_api = a.cle_api;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO projet.totaux_consommateur AS t (id_utilisateur, cle_api, nb_requetes, somme_empreinte)
+            SELECT id_utilisateur, cle_api, COUNT(*), COALESCE(SUM(empreinte_carbone), 0)
+                FROM nouvelles GROUP BY id_utilisateur, cle_api
+            ON CONFLICT (cle_api) DO UPDATE
+                SET nb_requetes = t.nb_requetes + EXCLUDED.nb_requetes,
+                    somme_empreinte = t.somme_empreinte + EXCLUDED.somme_empreinte;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Les triggers sont recréés dans la même transaction que le recalcul des totaux :
+-- aucune insertion ne peut s'intercaler entre les deux.
+LOCK TABLE projet.historique_consommateur IN SHARE ROW EXCLUSIVE MODE;
+DROP TRIGGER IF EXISTS historique_consommateur_insertion ON projet.historique_consommateur;
+DROP TRIGGER IF EXISTS historique_consommateur_modification ON projet.historique_consommateur;
+DROP TRIGGER IF EXISTS historique_consommateur_suppression ON projet.historique_consommateur;
+CREATE TRIGGER historique_consommateur_insertion
+    AFTER INSERT ON projet.historique_consommateur
+    REFERENCING NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_totaux_consommateur();
+CREATE TRIGGER historique_consommateur_modification
+    AFTER UPDATE ON projet.historique_consommateur
+    REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_totaux_consommateur();
+CREATE TRIGGER historique_consommateur_suppression
+    AFTER DELETE ON projet.historique_consommateur
+    REFERENCING OLD TABLE AS anciennes
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_totaux_consommateur();
+
+TRUNCATE projet.totaux_consommateur;
+INSERT INTO projet.totaux_consommateur (id_utilisateur, cle_api, nb_requetes, somme_empreinte)
+    SELECT id_utilisateur, cle_api, COUNT(*), COALESCE(SUM(empreinte_carbone), 0)
+        FROM projet.historique_consommateur GROUP BY id_utilisateur, cle_api;
@@ -0,0 +1,4 @@
+-----------------------------------------------------
+-- Pagination par clé de l'historique complet (vue administrateur)
+-----------------------------------------------------
+CREATE INDEX IF NOT EXISTS historique_consommateur_date_idx ON projet.historique_consommateur (date_requete, cle_api);
@@ -0,0 +1,132 @@
+-----------------------------------------------------
+-- Partitionnement mensuel de l'historique des consommateurs par date_requete,
+-- index secondaires et fonctions de création et de purge des partitions.
+-- L'historique existant est recopié dans la table partitionnée ; les totaux sont inchangés.
+-----------------------------------------------------
+CREATE OR REPLACE FUNCTION projet.creer_partition_historique(mois DATE) RETURNS BOOLEAN AS $$
+DECLARE
+    debut DATE := date_trunc('month', mois)::date;
+    fin DATE := (date_trunc('month', mois) + INTERVAL '1 month')::date;
+    nom TEXT := 'historique_consommateur_p' || to_char(mois, 'YYYYMM');
+BEGIN
+    -- Verrou pris avant de vérifier l'existence de la partition : deux appels concurrents pour le même mois
+    -- sont sérialisés jusqu'à la fin de la transaction, le second constate que la partition existe déjà.
+    PERFORM pg_advisory_xact_lock(hashtext('projet.' || nom));
+    IF to_regclass('projet.' || nom) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+    -- Les lignes du mois déjà reçues par la partition par défaut sont déplacées avant le rattachement,
+    -- directement entre partitions : les triggers de l'historique ne sont pas déclenchés.
+    LOCK TABLE projet.historique_consommateur_defaut IN ACCESS EXCLUSIVE MODE;
+    EXECUTE format('CREATE TABLE projet.%I (LIKE projet.historique_consommateur INCLUDING DEFAULTS)', nom);
+    EXECUTE format('WITH deplacees AS (DELETE FROM projet.historique_consommateur_defaut '
+                   '    WHERE date_requete >= %L AND date_requete < %L RETURNING *) '
+                   'INSERT INTO projet.%I SELECT * FROM deplacees', debut, fin, nom);
+    EXECUTE format('ALTER TABLE projet.historique_consommateur ATTACH PARTITION projet.%I '
+                   '    FOR VALUES FROM (%L) TO (%L)', nom, debut, fin);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION projet.creer_partitions_historique(debut DATE, fin DATE) RETURNS INT AS $$
+DECLARE
+    mois DATE := date_trunc('month', debut)::date;
+    nb INT := 0;
+BEGIN
+    WHILE mois <= fin LOOP
+        IF projet.creer_partition_historique(mois) THEN
+            nb := nb + 1;
+        END IF;
+        mois := (mois + INTERVAL '1 month')::date;
+    END LOOP;
+    RETURN nb;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION projet.purger_historique(avant TIMESTAMP) RETURNS BIGINT AS $$
+DECLARE
+    partition TEXT;
+    nb BIGINT := 0;
+    nb_partition BIGINT;
+BEGIN
+    FOR partition IN
+        SELECT c.relname
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'projet.historique_consommateur'::regclass
+              AND c.relname ~ '^historique_consommateur_p[0-9]{6}$'
+              AND to_date(right(c.relname, 6), 'YYYYMM') + INTERVAL '1 month' <= avant
+            ORDER BY c.relname
+    LOOP
+        EXECUTE format('LOCK TABLE projet.%I IN ACCESS EXCLUSIVE MODE', partition);
+        -- La suppression d'une partition ne déclenche pas les triggers : les totaux sont corrigés ici.
+        EXECUTE format('WITH anciennes AS (SELECT cle_api, COUNT(*) AS nb_requetes, '
+                       '        COALESCE(SUM(empreinte_carbone), 0) AS somme_empreinte '
+                       '        FROM projet.%I GROUP BY cle_api), '
+                       '    maj AS (UPDATE projet.totaux_consommateur t '
+                       '        SET nb_requetes = t.nb_requetes - a.nb_requetes, '
+                       '            somme_empreinte = t.somme_empreinte - a.somme_empreinte '
+                       '        FROM anciennes a WHERE t.cle_api = a.cle_api) '
+                       'SELECT COALESCE(SUM(nb_requetes), 0) FROM anciennes', partition) INTO nb_partition;
+        EXECUTE format('DROP TABLE projet.%I', partition);
+        nb := nb + nb_partition;
+    END LOOP;
+    -- Reste éventuel dans la partition par défaut ou dans un mois entamé.
+    DELETE FROM projet.historique_consommateur WHERE date_requete < avant;
+    GET DIAGNOSTICS nb_partition = ROW_COUNT;
+    RETURN nb + nb_partition;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'projet.historique_consommateur'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+    LOCK TABLE projet.historique_consommateur IN ACCESS EXCLUSIVE MODE;
+    ALTER TABLE projet.historique_consommateur RENAME TO historique_consommateur_ancien;
+    ALTER INDEX projet.historique_consommateur_pkey RENAME TO historique_consommateur_ancien_pkey;
+    ALTER INDEX IF EXISTS projet.historique_consommateur_date_idx RENAME TO historique_consommateur_ancien_date_idx;
+
+    CREATE TABLE projet.historique_consommateur(
+        id_utilisateur                 INT,
+        cle_api                       TEXT,
+        date_requete             TIMESTAMP,
+        duree                          INT,
+        date_visionnage          TIMESTAMP,
+        resolution                     INT,
+        type_connexion                TEXT,
+        materiel                      TEXT,
+        empreinte_carbone             REAL,
+        ville                         TEXT,
+        pays                          TEXT,
+        PRIMARY KEY (cle_api, date_requete),
+        FOREIGN KEY (id_utilisateur, cle_api) 
+            REFERENCES projet.table_cles_api (id_utilisateur, cle_api)
+            ON DELETE CASCADE
+    ) PARTITION BY RANGE (date_requete);
+    CREATE TABLE projet.historique_consommateur_defaut PARTITION OF projet.historique_consommateur DEFAULT;
+    CREATE INDEX historique_consommateur_date_idx ON projet.historique_consommateur (date_requete, cle_api);
+    CREATE INDEX historique_consommateur_utilisateur_idx ON projet.historique_consommateur (id_utilisateur, date_requete);
+
+    PERFORM projet.creer_partitions_historique(
+        COALESCE((SELECT MIN(date_requete) FROM projet.historique_consommateur_ancien)::date, CURRENT_DATE),
+        (GREATEST((SELECT MAX(date_requete) FROM projet.historique_consommateur_ancien), CURRENT_DATE)
+            + INTERVAL '3 months')::date);
+    -- Recopie avant la création des triggers : les totaux portent déjà sur ces lignes.
+    INSERT INTO projet.historique_consommateur SELECT * FROM projet.historique_consommateur_ancien;
+    DROP TABLE projet.historique_consommateur_ancien;
+
+    CREATE TRIGGER historique_consommateur_insertion
+        AFTER INSERT ON projet.historique_consommateur
+        REFERENCING NEW TABLE AS nouvelles
+        FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_totaux_consommateur();
+    CREATE TRIGGER historique_consommateur_modification
+        AFTER UPDATE ON projet.historique_consommateur
+        REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles
+        FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_totaux_consommateur();
+    CREATE TRIGGER historique_consommateur_suppression
+        AFTER DELETE ON projet.historique_consommateur
+        REFERENCING OLD TABLE AS anciennes
+        FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_totaux_consommateur();
+END;
+$$;
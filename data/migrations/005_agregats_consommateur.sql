@@ -0,0 +1,150 @@
+-----------------------------------------------------
+-- Agrégats quotidiens de l'historique par clé API et par combinaison de résolution, matériel
+-- et type de connexion, tenus à jour par trigger et conservés par la rétention.
+-- Les agrégats de l'historique existant sont reconstitués par lots, de façon reprenable,
+-- à partir de l'avancement enregistré dans projet.reprise_agregats.
+-----------------------------------------------------
+CREATE TABLE IF NOT EXISTS projet.agregats_consommateur_jour(
+    id_utilisateur                 INT,
+    cle_api                       TEXT,
+    jour                          DATE,
+    resolution                     INT,
+    materiel                      TEXT,
+    type_connexion                TEXT,
+    nb_requetes                 BIGINT NOT NULL,
+    somme_empreinte   DOUBLE PRECISION NOT NULL,
+    min_empreinte                 REAL,
+    max_empreinte                 REAL,
+    PRIMARY KEY (cle_api, jour, resolution, materiel, type_connexion),
+    FOREIGN KEY (id_utilisateur, cle_api) 
+        REFERENCES projet.table_cles_api (id_utilisateur, cle_api)
+        ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS agregats_consommateur_jour_jour_idx ON projet.agregats_consommateur_jour (jour);
+CREATE INDEX IF NOT EXISTS agregats_consommateur_jour_utilisateur_idx ON projet.agregats_consommateur_jour (id_utilisateur, jour);
+
+-- Avancement de la reconstitution des agrégats à partir de l'historique existant :
+-- les jours [prochain_jour, jour_fin) restent à recalculer.
+CREATE TABLE IF NOT EXISTS projet.reprise_agregats(
+    nom                           TEXT,
+    prochain_jour                 DATE,
+    jour_fin                      DATE,
+    PRIMARY KEY (nom)
+);
+
+CREATE OR REPLACE FUNCTION projet.recalculer_agregats_consommateur(cles TEXT[], jours DATE[]) RETURNS VOID AS $$
+    DELETE FROM projet.agregats_consommateur_jour a
+        USING unnest(cles, jours) AS j(cle_api, jour)
+        WHERE a.cle_api = j.cle_api AND a.jour = j.jour;
+    INSERT INTO projet.agregats_consommateur_jour (id_utilisateur, cle_api, jour, resolution, materiel, type_connexion,
+                                                   nb_requetes, somme_empreinte, min_empreinte, max_empreinte)
+        SELECT h.id_utilisateur, h.cle_api, j.jour, COALESCE(h.resolution, 0), COALESCE(h.materiel, ''),
+               COALESCE(h.type_connexion, ''), COUNT(*), COALESCE(SUM(h.empreinte_carbone), 0),
+               MIN(h.empreinte_carbone), MAX(h.empreinte_carbone)
+            FROM unnest(cles, jours) AS j(cle_api, jour)
+            JOIN projet.historique_consommateur h
+              ON h.cle_api = j.cle_api AND h.date_requete >= j.jour AND h.date_requete < j.jour + 1
+            GROUP BY h.id_utilisateur, h.cle_api, j.jour, COALESCE(h.resolution, 0), COALESCE(h.materiel, ''),
+                     COALESCE(h.type_connexion, '');
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION projet.maj_agregats_consommateur() RETURNS TRIGGER AS $$
+DECLARE
+    cles TEXT[];
+    jours DATE[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO projet.agregats_consommateur_jour AS a (id_utilisateur, cle_api, jour, resolution, materiel,
+                                                            type_connexion, nb_requetes, somme_empreinte,
+                                                            min_empreinte, max_empreinte)
+            SELECT id_utilisateur, cle_api, date_requete::date, COALESCE(resolution, 0), COALESCE(materiel, ''),
+                   COALESCE(type_connexion, ''), COUNT(*), COALESCE(SUM(empreinte_carbone), 0),
+                   MIN(empreinte_carbone), MAX(empreinte_carbone)
+                FROM nouvelles
+                GROUP BY id_utilisateur, cle_api, date_requete::date, COALESCE(resolution, 0),
+                         COALESCE(materiel, ''), COALESCE(type_connexion, '')
+            ON CONFLICT (cle_api, jour, resolution, materiel, type_connexion) DO UPDATE
+                SET nb_requetes = a.nb_requetes + EXCLUDED.nb_requetes,
+                    somme_empreinte = a.somme_empreinte + EXCLUDED.somme_empreinte,
+                    min_empreinte = LEAST(a.min_empreinte, EXCLUDED.min_empreinte),
+                    max_empreinte = GREATEST(a.max_empreinte, EXCLUDED.max_empreinte);
+        RETURN NULL;
+    END IF;
+    -- Les agrégats survivent à la suppression de l'historique détaillé par la rétention.
+    IF current_setting('projet.retention', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    -- Le minimum et le maximum ne se décrémentent pas : les jours touchés sont recalculés depuis l'historique.
+    SELECT array_agg(cle_api), array_agg(jour) INTO cles, jours
+        FROM (SELECT DISTINCT cle_api, date_requete::date AS jour FROM anciennes) j;
+    PERFORM projet.recalculer_agregats_consommateur(cles, jours);
+    IF TG_OP = 'UPDATE' THEN
+        SELECT array_agg(cle_api), array_agg(jour) INTO cles, jours
+            FROM (SELECT DISTINCT cle_api, date_requete::date AS jour FROM nouvelles) j;
+        PERFORM projet.recalculer_agregats_consommateur(cles, jours);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION projet.purger_historique(avant TIMESTAMP) RETURNS BIGINT AS $$
+DECLARE
+    partition TEXT;
+    nb BIGINT := 0;
+    nb_partition BIGINT;
+BEGIN
+    FOR partition IN
+        SELECT c.relname
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'projet.historique_consommateur'::regclass
+              AND c.relname ~ '^historique_consommateur_p[0-9]{6}$'
+              AND to_date(right(c.relname, 6), 'YYYYMM') + INTERVAL '1 month' <= avant
+            ORDER BY c.relname
+    LOOP
+        EXECUTE format('LOCK TABLE projet.%I IN ACCESS EXCLUSIVE MODE', partition);
+        -- La suppression d'une partition ne déclenche pas les triggers : les totaux sont corrigés ici.
+        EXECUTE format('WITH anciennes AS (SELECT cle_api, COUNT(*) AS nb_requetes, '
+                       '        COALESCE(SUM(empreinte_carbone), 0) AS somme_empreinte '
+                       '        FROM projet.%I GROUP BY cle_api), '
+                       '    maj AS (UPDATE projet.totaux_consommateur t '
+                       '        SET nb_requetes = t.nb_requetes - a.nb_requetes, '
+                       '            somme_empreinte = t.somme_empreinte - a.somme_empreinte '
+                       '        FROM anciennes a WHERE t.cle_api = a.cle_api) '
+                       'SELECT COALESCE(SUM(nb_requetes), 0) FROM anciennes', partition) INTO nb_partition;
+        EXECUTE format('DROP TABLE projet.%I', partition);
+        nb := nb + nb_partition;
+    END LOOP;
+    -- Reste éventuel dans la partition par défaut ou dans un mois entamé.
+    -- Les agrégats quotidiens sont conservés (voir projet.maj_agregats_consommateur).
+    PERFORM set_config('projet.retention', 'on', true);
+    DELETE FROM projet.historique_consommateur WHERE date_requete < avant;
+    GET DIAGNOSTICS nb_partition = ROW_COUNT;
+    PERFORM set_config('projet.retention', 'off', true);
+    RETURN nb + nb_partition;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Les triggers et le point de départ de la reprise sont posés dans la même transaction :
+-- les lignes antérieures au jour suivant sont toutes couvertes par la reprise.
+LOCK TABLE projet.historique_consommateur IN SHARE ROW EXCLUSIVE MODE;
+DROP TRIGGER IF EXISTS agregats_consommateur_insertion ON projet.historique_consommateur;
+DROP TRIGGER IF EXISTS agregats_consommateur_modification ON projet.historique_consommateur;
+DROP TRIGGER IF EXISTS agregats_consommateur_suppression ON projet.historique_consommateur;
+CREATE TRIGGER agregats_consommateur_insertion
+    AFTER INSERT ON projet.historique_consommateur
+    REFERENCING NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_agregats_consommateur();
+CREATE TRIGGER agregats_consommateur_modification
+    AFTER UPDATE ON projet.historique_consommateur
+    REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_agregats_consommateur();
+CREATE TRIGGER agregats_consommateur_suppression
+    AFTER DELETE ON projet.historique_consommateur
+    REFERENCING OLD TABLE AS anciennes
+    FOR EACH STATEMENT EXECUTE FUNCTION projet.maj_agregats_consommateur();
+
+INSERT INTO projet.reprise_agregats (nom, prochain_jour, jour_fin)
+    SELECT 'agregats_consommateur_jour', MIN(date_requete)::date, CURRENT_DATE + 1
+        FROM projet.historique_consommateur
+        HAVING MIN(date_requete) IS NOT NULL
+    ON CONFLICT (nom) DO NOTHING;
@@ -2,21 +2,38 @@ from enum import Enum
 import uvicorn
 import os
 from dotenv import load_dotenv
-from datetime import datetime
-from fastapi import HTTPException, Depends, FastAPI, Header
+from datetime import date, datetime
+import anyio
+import json
+import itertools
+import threading
+from fastapi import HTTPException, Depends, FastAPI, Header, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from service.offre_cloud_service import OffreCloudService
 from service.empreinte_carbone_service import EmpreinteCarboneService
-from service.etat_service import EtatService
+from service.etat_service import MoniteurEtat
 from service.table.cles_api_service import ClesApiService
-from service.table.historique_consommateur_service import HistoriqueConsommateurService
+from service.table.historique_consommateur_service import HistoriqueConsommateurService, MaintenanceHistorique
 from service.table.serveurs_service import ServeursService
 from business_object.info_video import InfoVideo
 from business_object.zone_geographique import ZoneGeographique
+from dao.db_connection import DBConnection
+from dao.tampon_historique_dao import TamponHistoriqueDao
+from utils.cache_cles import CacheCles
+from utils.cache_prevision import CachePrevision
+from utils.cache_zone import CacheZone
+from utils.session_http import SessionHttp
 
 load_dotenv()
 token_administrateur = os.environ.get('token_admin')
+taille_max_lot = int(os.environ.get('LOT_TAILLE_MAX', 10000))
+# Chaque export NDJSON de l'historique garde une connexion du pool jusqu'à sa lecture complète par le client :
+# leur nombre est limité pour laisser des connexions aux autres endpoints.
+exports_historique = threading.BoundedSemaphore(int(os.environ.get('HISTORIQUE_EXPORTS_MAX', 2)))
 
 app = FastAPI()
 
@@ -100,6 +117,20 @@ class FournisseurCloud(str, Enum):
         """
         return [fournisseur.strip("() ") for fournisseur in self.value.split(",")]
 
+class FormatHistorique(str, Enum):
+    """
+    Enumération des formats de réponse de l'historique.
+    """
+    json = "json"
+    ndjson = "ndjson"
+
+class PeriodeAgregat(str, Enum):
+    """
+    Enumération des périodes d'agrégation de l'historique.
+    """
+    jour = "jour"
+    semaine = "semaine"
+
 class ZoneGeographiqueModel(BaseModel):
     """
     Modèle représentant une zone géographique.
@@ -140,6 +171,20 @@ class ServeurModel(BaseModel):
     impact_carbone: float | None = None
     localisation: ZoneGeographiqueModel
 
+class ServeurHoraireModel(BaseModel):
+    """
+    Modèle représentant un serveur cloud associé à une heure de début de visionnage.
+
+    Attributes
+    ----------
+    serveur: ServeurModel
+        Modèle représentant le serveur et l'impact carbone du visionnage (voir la documentation de la classe ServeurModel).
+    date_visionnage: datetime
+        Date de début du visionnage.
+    """
+    serveur: ServeurModel
+    date_visionnage: datetime
+
 class InfoVideoModel(BaseModel):
     """
     Modèle représentant les informations associées au visionnage d'une vidéo.
@@ -154,8 +199,8 @@ class InfoVideoModel(BaseModel):
         Type de connexion utilisé pour visionner la vidéo.
     materiel: Materiel
         Matériel utilisé pour visionner la vidéo.
-    date_visionnage: datetime, facultatif
-        Date de visionnage de la vidéo (par défaut, la date actuelle).
+    date_visionnage: datetime | None, facultatif
+        Date de visionnage de la vidéo (par défaut, la date de la requête).
     localisation: ZoneGeographiqueModel
         Modèle représentant la localisation géographique (voir la documentation de la classe ZoneGeographiqueModel).
     """
@@ -163,7 +208,7 @@ class InfoVideoModel(BaseModel):
     resolution: Resolution
     type_connexion: TypeConnexion
     materiel: Materiel
-    date_visionnage: datetime = datetime.now()
+    date_visionnage: datetime | None = None
     localisation: ZoneGeographiqueModel
 
 def get_cle_api_consommateur(cle_api: str = Header(...)):
@@ -241,7 +286,8 @@ def get_cle_fournisseur_ou_administateur(cle_api: str = Header(...)):
 
 def get_liens_api():
     """
-    Vérifie l'état des liens avec les API ElectricityMap et Nominatim.openstreetmap.
+    Vérifie l'état des liens avec les API ElectricityMap et Nominatim.openstreetmap,
+    d'après le dernier état connu du moniteur qui les surveille en tâche de fond.
 
     Returns:
     - True si les liens sont établis avec succès.
@@ -249,9 +295,9 @@ def get_liens_api():
     Raises:
     - HTTPException(503): En cas d'échec de connexion avec l'une des API.
     """
-    if not EtatService().lien_api_electricity_map():
+    if not MoniteurEtat().disponible("electricity_map"):
         raise HTTPException(status_code = 503, detail = "Lien avec l'API ElectricityMap impossible")
-    if not EtatService().lien_api_nominatim_openstreetmap():
+    if not MoniteurEtat().disponible("nominatim_openstreetmap"):
         raise HTTPException(status_code = 503, detail = "Lien avec l'API Nominatim.openstreetmap impossible")
     return True
 
@@ -272,19 +318,22 @@ async def get_etat_fonctionnement():
     Obtient l'état actuel de fonctionnement de l'API.
 
     Returns:
-    - Un dictionnaire contenant l'état actuel de l'API, indiquant si elle fonctionne normalement ou en mode réduit, avec la liste des endpoints accessibles dans chaque cas.
+    - Un dictionnaire contenant l'état actuel de l'API, indiquant si elle fonctionne normalement ou en mode réduit, avec la liste des endpoints accessibles dans chaque cas
+      et l'état des API externes (dates de dernière vérification et de dernier succès).
     """
-    if get_liens_api():
+    moniteur = MoniteurEtat()
+    if moniteur.disponible("electricity_map") and moniteur.disponible("nominatim_openstreetmap"):
         return {
             'etat': 'ok', 
             'accessible': ["/serveurs", "/serveurs-eligibles/simulation", "/serveurs-optimaux/simulation",
-            "/empreinte-carbone/simulation", "/empreinte-carbone/moyenne", "/empreinte-carbone/total", "/historique-empreinte",
-            "/historique-empreinte/supprimer"]}
+            "/serveurs-horaires-optimaux/simulation", "/empreinte-carbone/simulation", "/empreinte-carbone/meilleurs-horaires", "/empreinte-carbone/moyenne", "/empreinte-carbone/total", "/historique-empreinte",
+            "/historique-empreinte/agregats", "/historique-empreinte/supprimer"],
+            'apis': moniteur.etat()}
     return {
         'etat': 'mode reduit', 
         'accessible': ["/serveurs", "/empreinte-carbone/moyenne", "/empreinte-carbone/total", "/historique-empreinte",
-            "/historique-empreinte/supprimer"]}
-    
+            "/historique-empreinte/agregats", "/historique-empreinte/supprimer"],
+        'apis': moniteur.etat()}
 
 @app.post("/generer-cle")
 async def generer_cle_api(type_utilisateur: Utilisateur, cle_api: str = Header(...)):
@@ -307,9 +356,34 @@ async def generer_cle_api(type_utilisateur: Utilisateur, cle_api: str = Header(.
     """
     if cle_api != token_administrateur:
         raise HTTPException(status_code = 401, detail = message)
-    nouvelle_cle = ClesApiService().generer_cle_api(type_utilisateur)
+    nouvelle_cle = await run_in_threadpool(ClesApiService().generer_cle_api, type_utilisateur)
     return nouvelle_cle
 
+@app.post("/migrer-cle")
+async def migrer_cle_api(type_utilisateur: Utilisateur, cle_api: str = Header(...)):
+    """
+    Migre une clé API créée avant l'introduction des préfixes vers le format "prefixe.secret", plus rapide à vérifier.
+
+    Parameters:
+    - `type_utilisateur` (query): Type de l'utilisateur propriétaire de la clé.
+
+    - `cle_api` (header): Ancienne clé API à migrer.
+
+    Possible values:
+    - `type_utilisateur`: "Fournisseur", "Consommateur".
+
+    Returns:
+    - Nouvelle forme de la clé API, à utiliser pour les prochaines requêtes. L'historique associé est conservé.
+
+    Raises:
+    - HTTPException(401): En cas de clé API invalide ou déjà migrée.
+    """
+    try :
+        nouvelle_cle = await run_in_threadpool(ClesApiService().migrer_cle_api, type_utilisateur, cle_api)
+    except ValueError as e:
+        raise HTTPException(status_code = 401, detail = str(e))
+    return {"cle_api": nouvelle_cle}
+
 @app.get("/serveurs", dependencies = [Depends(get_cle_fournisseur_ou_administateur)])
 async def get_serveurs(fournisseurs_cloud: FournisseurCloud = FournisseurCloud.AWS_GCP_Azure):
     """
@@ -324,7 +398,7 @@ async def get_serveurs(fournisseurs_cloud: FournisseurCloud = FournisseurCloud.A
     Returns:
     - Liste des serveurs au format JSON.
     """
-    list_serveurs = ServeursService().voir(fournisseurs_cloud.to_list())
+    list_serveurs = await run_in_threadpool(ServeursService().voir, fournisseurs_cloud.to_list())
     list_model = [ServeurModel(id_serveur = instance.id_serveur, nom = instance.nom,
                                code_region = instance.code_region,
                                fournisseur_cloud = instance.fournisseur_cloud, 
@@ -356,7 +430,7 @@ async def get_serveurs_eligibles(ville: str, pays: str = None, fournisseurs_clou
     """
     lieu = ZoneGeographique(ville, pays)
     try :
-        list_serveurs = OffreCloudService().serveurs_eligibles(lieu, fournisseurs_cloud.to_list())
+        list_serveurs = await run_in_threadpool(OffreCloudService().serveurs_eligibles, lieu, fournisseurs_cloud.to_list())
     except ValueError as e:
         raise HTTPException(status_code = 404, detail = str(e))
     list_model = [ServeurModel(id_serveur = instance.id_serveur, nom = instance.nom,
@@ -396,7 +470,8 @@ async def get_serveurs_optimaux(duree: int, ville: str, pays: str = None,
     """
     lieu = ZoneGeographique(ville, pays)
     try :
-        dict_serveurs = OffreCloudService().serveurs_optimaux(lieu, duree, date_visionnage, fournisseurs_cloud.to_list())
+        dict_serveurs = await run_in_threadpool(OffreCloudService().serveurs_optimaux, lieu, duree, date_visionnage,
+                                                fournisseurs_cloud.to_list())
     except ValueError as e:
         raise HTTPException(status_code = 404, detail = str(e))
     list_model = [ServeurModel(id_serveur = key.id_serveur, nom = key.nom, 
@@ -406,7 +481,60 @@ async def get_serveurs_optimaux(duree: int, ville: str, pays: str = None,
                                impact_carbone = value) for key, value in dict_serveurs.items()]
     return jsonable_encoder(list_model, exclude_none = True)
 
-@app.get("/empreinte-carbone/simulation", dependencies = [Depends(get_cle_api_consommateur), Depends(get_liens_api)])
+@app.get("/serveurs-horaires-optimaux/simulation", dependencies = [Depends(get_cle_api_fournisseur), Depends(get_liens_api)])
+async def get_serveurs_horaires_optimaux(duree: int, ville: str, pays: str = None,
+    date_visionnage: datetime | None = None, nb_resultats: int = Query(10, ge = 1, le = 1000),
+    capacite: int = Query(None, ge = 1), pas: int = Query(60, ge = 1, le = 1440),
+    fournisseurs_cloud: FournisseurCloud = FournisseurCloud.AWS_GCP_Azure):
+    """
+    Obtenez les meilleurs couples (serveur, heure de début de visionnage) associés avec l'impact de la consommation électrique en gCO2eq/kWh prévisionnel,
+    de la date de visionnage jusqu'à la fin des prévisions d'Electricity Map, en fonction des fournisseurs, de la durée et de la localisation.
+
+    Parameters:
+    - `duree` (query): Durée de visionnage en minutes.
+
+    - `ville` (query): Nom de la ville.
+
+    - `pays` (query, facultatif): Nom du pays.
+
+    - `date_visionnage` (query, facultatif): Début de visionnage au plus tôt au format datetime, par défaut datetime.now().
+
+    - `nb_resultats` (query, facultatif): Nombre de couples renvoyés, par défaut 10.
+
+    - `capacite` (query, facultatif): Nombre maximal d'heures de début retenues par serveur, par défaut sans limite.
+
+    - `pas` (query, facultatif): Écart en minutes entre deux heures de début évaluées, par défaut 60.
+
+    - `fournisseurs_cloud` (query, facultatif): Liste des fournisseurs cloud à considérer, par défaut "(AWS, GCP, Azure)".
+
+    - `cle_api` (header): Clé API d'un fournisseur de VOD pour l'autorisation.
+
+    Possible values:
+    - `fournisseurs_cloud`: "(AWS, GCP, Azure)", "(AWS, GCP)", "(AWS, Azure)", "(GCP, Azure)", "AWS", "GCP", "Azure".
+
+    Returns:
+    - Liste ordonnée des couples (serveur, heure de début) associés à leur impact de la consommation électrique prévisionel en gCO2eq/kWh au format JSON.
+
+    Raises:
+    - HTTPException(404): Non reconnaissance de la ville par Openstreetmap ou non accès aux données d'Electricty Map.
+    """
+    if date_visionnage is None:
+        date_visionnage = datetime.now()
+    lieu = ZoneGeographique(ville, pays)
+    try :
+        meilleurs = await run_in_threadpool(OffreCloudService().serveurs_horaires_optimaux, lieu, duree, date_visionnage,
+                                            nb_resultats, capacite, pas, fournisseurs_cloud.to_list())
+    except ValueError as e:
+        raise HTTPException(status_code = 404, detail = str(e))
+    list_model = [ServeurHoraireModel(serveur = ServeurModel(id_serveur = item["serveur"].id_serveur, nom = item["serveur"].nom,
+                                                             code_region = item["serveur"].code_region,
+                                                             fournisseur_cloud = item["serveur"].fournisseur_cloud,
+                                                             localisation = ZoneGeographiqueModel(ville = item["serveur"].localisation.ville),
+                                                             impact_carbone = item["impact_carbone"]),
+                                      date_visionnage = item["date_visionnage"]) for item in meilleurs]
+    return jsonable_encoder(list_model, exclude_none = True)
+
+@app.get("/empreinte-carbone/simulation", dependencies = [Depends(get_liens_api)])
 async def get_empreinte_carbone(
     duree : int, resolution : Resolution, type_connexion : TypeConnexion, materiel : Materiel, ville: str, pays: str = None,
     date_visionnage : datetime = datetime.now(),
@@ -448,7 +576,7 @@ async def get_empreinte_carbone(
     lieu = ZoneGeographique(ville, pays)
     donnees = InfoVideo(duree, resolution, type_connexion, materiel, lieu, date_visionnage)
     try :
-        empreinte = EmpreinteCarboneService().empreinte_carbone(donnees, cle_api_hache)
+        empreinte = await run_in_threadpool(EmpreinteCarboneService().empreinte_carbone, donnees, cle_api_hache)
     except ValueError as e:
         raise HTTPException(status_code = 404, detail = str(e))
     result = {
@@ -459,7 +587,94 @@ async def get_empreinte_carbone(
     }
     return jsonable_encoder(result, exclude_none = True)
 
-@app.get("/empreinte-carbone/moyenne", dependencies = [Depends(get_cle_api_consommateur)])
+@app.get("/empreinte-carbone/meilleurs-horaires", dependencies = [Depends(get_liens_api)])
+async def get_meilleurs_horaires(
+    duree : int, resolution : Resolution, type_connexion : TypeConnexion, materiel : Materiel, ville: str, pays: str = None,
+    date_visionnage : datetime | None = None, nb_resultats: int = Query(3, ge = 1, le = 100),
+    pas: int = Query(15, ge = 1, le = 1440), cle_api_hache: str = Depends(get_cle_api_consommateur)
+    ):
+    """
+    Obtenez les heures de début de visionnage à l'empreinte carbone la plus faible, de la date de visionnage
+    jusqu'à la fin de la prévision d'Electricity Map, ainsi que l'empreinte de chaque début possible.
+
+    Parameters:
+    - `duree` (query): Durée de visionnage en minutes.
+
+    - `resolution` (query): Résolution de la vidéo.
+
+    - `type_connexion` (query): Type de connexion.
+
+    - `materiel` (query): Matériel utilisé.
+
+    - `ville` (query): Nom de la ville.
+
+    - `pays` (query, facultatif): Nom du pays.
+
+    - `date_visionnage` (query, facultatif): Début de visionnage au plus tôt au format datetime, par défaut datetime.now().
+
+    - `nb_resultats` (query, facultatif): Nombre de meilleurs débuts renvoyés, par défaut 3.
+
+    - `pas` (query, facultatif): Écart en minutes entre deux débuts évalués, par défaut 15.
+
+    - `cle_api` (header): Clé API d'un consommateur pour l'autorisation.
+
+    Possible values:
+    - `resolution`: "240", "360", "480", "720", "1080", "1440", "2160", "4320".
+
+    - `type_connexion`: "Wifi", "Reseau", "Cable".
+
+    - `materiel`: "Ordinateur", "Mobile".
+
+    Returns:
+    - Meilleurs débuts par empreinte croissante (`meilleurs`) et courbe chronologique (`courbe`) des empreintes carbone
+      en gCO2eq de chaque début évalué, ainsi que les informations sur la vidéo au format JSON.
+
+    Raises:
+    - HTTPException(404): Non reconnaissance de la ville par Openstreetmap ou non accès aux données d'Electricty Map.
+    """
+    if date_visionnage is None:
+        date_visionnage = datetime.now()
+    lieu = ZoneGeographique(ville, pays)
+    donnees = InfoVideo(duree, resolution, type_connexion, materiel, lieu, date_visionnage)
+    try :
+        horaires = await run_in_threadpool(EmpreinteCarboneService().meilleurs_horaires, donnees, nb_resultats, pas)
+    except ValueError as e:
+        raise HTTPException(status_code = 404, detail = str(e))
+    result = {
+        "info_video": InfoVideoModel(duree = duree, resolution = resolution, type_connexion = type_connexion,
+                            materiel = materiel, date_visionnage = date_visionnage,
+                            localisation = ZoneGeographiqueModel(ville = ville, pays = pays)),
+        **horaires
+    }
+    return jsonable_encoder(result, exclude_none = True)
+
+@app.post("/empreinte-carbone/simulation/lot", dependencies = [Depends(get_liens_api)])
+async def post_empreinte_carbone_lot(lot: list[InfoVideoModel], cle_api_hache: str = Depends(get_cle_api_consommateur)):
+    """
+    Obtenez l'empreinte carbone d'un lot de visionnages en une seule requête.
+
+    Parameters:
+    - `lot` (body): Liste des informations de visionnage (voir la documentation de la classe InfoVideoModel).
+
+    - `cle_api` (header): Clé API d'un consommateur pour l'autorisation.
+
+    Returns:
+    - Liste, dans l'ordre du lot, contenant pour chaque visionnage soit l'empreinte carbone en gCO2eq (`empreinte_carbone`),
+      soit le message d'erreur (`erreur`) en cas de paramètres invalides ou de localisation non reconnue.
+
+    Raises:
+    - HTTPException(413): Lot plus grand que la taille maximale autorisée (variable d'environnement LOT_TAILLE_MAX).
+    """
+    if len(lot) > taille_max_lot:
+        raise HTTPException(status_code = 413, detail = "Le lot ne peut pas dépasser {} visionnages".format(taille_max_lot))
+    maintenant = datetime.now()
+    liste_donnees = [InfoVideo(item.duree, item.resolution, item.type_connexion, item.materiel,
+                               ZoneGeographique(item.localisation.ville, item.localisation.pays),
+                               item.date_visionnage if item.date_visionnage is not None else maintenant)
+                     for item in lot]
+    return await run_in_threadpool(EmpreinteCarboneService().empreinte_carbone_lot, liste_donnees, cle_api_hache)
+
+@app.get("/empreinte-carbone/moyenne")
 async def get_empreinte_moyenne(cle_api_hache: str = Depends(get_cle_api_consommateur)):
     """
     Obtenez l'empreinte carbone moyenne en fonction de la clé API consommateur.
@@ -470,11 +685,11 @@ async def get_empreinte_moyenne(cle_api_hache: str = Depends(get_cle_api_consomm
     Returns:
     - Empreinte carbone moyenne en gCO2eq au format JSON.
     """
-    empreinte = EmpreinteCarboneService().empreinte_moyenne(cle_api_hache)
+    empreinte = await run_in_threadpool(EmpreinteCarboneService().empreinte_moyenne, cle_api_hache)
     result = {"empreinte_carbone_moyenne": empreinte}
     return result
 
-@app.get("/empreinte-carbone/total", dependencies = [Depends(get_cle_api_consommateur)])
+@app.get("/empreinte-carbone/total")
 async def get_empreinte_total(cle_api_hache: str = Depends(get_cle_api_consommateur)):
     """
     Obtenez l'empreinte carbone totale en fonction de la clé API consommateur.
@@ -485,49 +700,167 @@ async def get_empreinte_total(cle_api_hache: str = Depends(get_cle_api_consommat
     Returns:
     - Empreinte carbone totale en gCO2eq au format JSON.
     """
-    empreinte = EmpreinteCarboneService().empreinte_total(cle_api_hache)
+    empreinte = await run_in_threadpool(EmpreinteCarboneService().empreinte_total, cle_api_hache)
     result = {"empreinte_carbone_totale": empreinte}
     return result
 
-@app.get("/historique-empreinte", dependencies = [Depends(get_cle_consommateur_ou_administateur)])
-async def get_historique_consommateur(cle_api: str = Depends(get_cle_consommateur_ou_administateur), id_utilisateur: int = None):
+def formater_requete(requete: dict, administrateur: bool) -> dict:
+    """
+    Met en forme un enregistrement de l'historique pour la réponse, sans passer par les modèles pydantic.
+
+    Parameters:
+    - `requete`: Enregistrement de l'historique.
+
+    - `administrateur`: True pour ajouter l'identifiant et la clé API hachée du consommateur.
+
+    Returns:
+    - Dictionnaire sérialisable en JSON.
+    """
+    localisation = {"ville": requete["ville"]}
+    if requete["pays"] is not None:
+        localisation["pays"] = requete["pays"]
+    resultat = {"id_utilisateur": requete["id_utilisateur"], "cle_api_haché": requete["cle_api"]} if administrateur else {}
+    resultat["info_video"] = {"duree": requete["duree"], "resolution": requete["resolution"],
+                              "type_connexion": requete["type_connexion"], "materiel": requete["materiel"],
+                              "date_visionnage": requete["date_visionnage"].isoformat(), "localisation": localisation}
+    resultat["empreinte_carbone"] = requete["empreinte_carbone"]
+    resultat["date_requete"] = requete["date_requete"].isoformat()
+    return resultat
+
+def diffuser_historique(requetes, premiere: dict, administrateur: bool) -> StreamingResponse:
+    """
+    Diffuse l'historique au format NDJSON, une requête par ligne.
+    Le parcours de l'historique, et donc sa connexion à la base, est fermé et la place d'export libérée
+    à la fin du flux, en cas d'erreur ou dès que le client se déconnecte.
+
+    Parameters:
+    - `requetes`: Parcours de l'historique (HistoriqueConsommateurService.parcourir), dont la première requête a été lue.
+
+    - `premiere`: Première requête du parcours.
+
+    - `administrateur`: True pour ajouter l'identifiant et la clé API hachée du consommateur.
+
+    Returns:
+    - Réponse en flux de type application/x-ndjson.
+    """
+    places = [exports_historique]
+
+    def fermer():
+        requetes.close()
+        # La place n'est libérée qu'une fois, que la fermeture vienne de la fin du flux ou de la tâche de fond.
+        if places:
+            places.pop().release()
+
+    def lignes():
+        try:
+            for requete in itertools.chain([premiere], requetes):
+                yield json.dumps(formater_requete(requete, administrateur), ensure_ascii = False) + "\n"
+        finally:
+            fermer()
+
+    flux = lignes()
+
+    def terminer():
+        # Exécutée après l'envoi de la réponse ou la déconnexion du client
+        flux.close()
+        fermer()
+
+    return StreamingResponse(flux, media_type = "application/x-ndjson", background = BackgroundTask(terminer))
+
+@app.get("/historique-empreinte")
+async def get_historique_consommateur(response: Response,
+    cle_api: str = Depends(get_cle_consommateur_ou_administateur), id_utilisateur: int = None,
+    apres: str = Query(None, alias = "after"), limite: int = Query(1000, alias = "limit", ge = 1, le = 10000),
+    date_debut: datetime = None, date_fin: datetime = None, format: FormatHistorique = FormatHistorique.json):
     """
-    Obtenez l'historique de l'empreinte carbone d'un consommateur ou de tous les consommateurs si clé administrateur.
+    Obtenez l'historique de l'empreinte carbone d'un consommateur ou de tous les consommateurs si clé administrateur,
+    trié par date de requête.
 
     Parameters:
     - `id_utilisateur` (query, facultatif): identifiant d'un consommateur.
 
+    - `after` (query, facultatif): curseur de la page précédente, renvoyé dans l'en-tête `X-Curseur-Suivant`.
+
+    - `limit` (query, facultatif): nombre maximal de requêtes par page, par défaut 1000 (au plus 10000).
+
+    - `date_debut` (query, facultatif): date de requête minimale (incluse).
+
+    - `date_fin` (query, facultatif): date de requête maximale (exclue).
+
+    - `format` (query, facultatif): "json" pour une page, "ndjson" pour tout l'historique filtré en flux, une requête par ligne.
+
     - `cle_api` (header): Clé API consommateur ou administrateur.
 
     Returns:
-    - Historique des requêtes empreintes carbones au format JSON.
+    - Historique des requêtes empreintes carbones au format JSON. En format "json", l'en-tête `X-Curseur-Suivant`
+      contient le curseur de la page suivante s'il en reste une.
 
     Raises:
-    - HTTPException(404): Pas d'historique trouvé.
+    - HTTPException(400): Curseur de pagination invalide.
+
+    - HTTPException(404): Pas d'historique trouvé, dans les deux formats (en format "json", seulement pour la première page).
+
+    - HTTPException(503): En format "ndjson", trop d'exports en cours (variable d'environnement HISTORIQUE_EXPORTS_MAX).
+    """
+    administrateur = cle_api == token_administrateur
+    historique_absent = "L'historique du consommateur associé à l'utilisateur numéro {} n'existe pas".format(id_utilisateur)
+    if format == FormatHistorique.ndjson:
+        if not exports_historique.acquire(blocking = False):
+            raise HTTPException(status_code = 503, detail = "Trop d'exports de l'historique en cours, réessayez plus tard")
+        try:
+            requetes = await run_in_threadpool(HistoriqueConsommateurService().parcourir, cle_api = cle_api,
+                                               id_utilisateur = id_utilisateur, date_debut = date_debut, date_fin = date_fin)
+            # La première requête est lue avant d'envoyer le flux, pour répondre 404 comme en format "json".
+            premiere = await run_in_threadpool(next, requetes, None)
+        except BaseException:
+            exports_historique.release()
+            raise
+        if premiere is None:
+            exports_historique.release()
+            raise HTTPException(status_code = 404, detail = historique_absent)
+        return diffuser_historique(requetes, premiere, administrateur)
+
+    try:
+        historique = await run_in_threadpool(HistoriqueConsommateurService().voir, cle_api = cle_api,
+                                             id_utilisateur = id_utilisateur, apres = apres, limite = limite,
+                                             date_debut = date_debut, date_fin = date_fin)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
+    if historique == [] and apres is None:
+        raise HTTPException(status_code = 404, detail = historique_absent)
+    suivant = HistoriqueConsommateurService.curseur_suivant(historique, limite)
+    if suivant:
+        response.headers["X-Curseur-Suivant"] = suivant
+    return [formater_requete(requete, administrateur) for requete in historique]
+
+@app.get("/historique-empreinte/agregats")
+async def get_agregats_historique(cle_api: str = Depends(get_cle_consommateur_ou_administateur),
+    periode: PeriodeAgregat = PeriodeAgregat.jour, id_utilisateur: int = None,
+    date_debut: date = None, date_fin: date = None):
+    """
+    Obtenez l'empreinte carbone d'un consommateur, ou de tous les consommateurs si clé administrateur,
+    par jour ou par semaine, calculée à partir des agrégats quotidiens tenus à jour en base.
+
+    Parameters:
+    - `periode` (query, facultatif): "jour" ou "semaine" (semaines commençant le lundi), par défaut "jour".
+
+    - `id_utilisateur` (query, facultatif): identifiant d'un consommateur.
+
+    - `date_debut` (query, facultatif): premier jour inclus.
+
+    - `date_fin` (query, facultatif): dernier jour exclu.
+
+    - `cle_api` (header): Clé API consommateur ou administrateur.
+
+    Returns:
+    - Pour chaque période : début, nombre de requêtes, somme, moyenne, minimum et maximum des empreintes carbone
+      en gCO2eq, et répartition par résolution, par matériel et par type de connexion, au format JSON.
     """
-    historique = HistoriqueConsommateurService().voir(cle_api = cle_api, id_utilisateur = id_utilisateur)
-    if historique == []:
-        raise HTTPException(status_code = 404, 
-            detail = "L'historique du consommateur associé à l'utilisateur numéro {} n'existe pas".format(id_utilisateur))
-    if cle_api != token_administrateur:
-        list_model = [{
-        "info_video": InfoVideoModel(duree = requete["duree"], resolution = requete["resolution"], type_connexion = requete["type_connexion"],
-                            materiel = requete["materiel"], date_visionnage = requete["date_visionnage"],
-                            localisation = ZoneGeographiqueModel(ville = requete["ville"], pays = requete["pays"])),
-        "empreinte_carbone": requete["empreinte_carbone"],
-        "date_requete": requete["date_requete"]
-        } for requete in historique]
-    else :
-        list_model = [{"id_utilisateur": requete["id_utilisateur"], "cle_api_haché": requete["cle_api"],
-        "info_video": InfoVideoModel(duree = requete["duree"], resolution = requete["resolution"], type_connexion = requete["type_connexion"],
-                            materiel = requete["materiel"], date_visionnage = requete["date_visionnage"],
-                            localisation = ZoneGeographiqueModel(ville = requete["ville"], pays = requete["pays"])),
-        "empreinte_carbone": requete["empreinte_carbone"],
-        "date_requete": requete["date_requete"]
-        } for requete in historique]
-    return jsonable_encoder(list_model, exclude_none = True)
+    return await run_in_threadpool(HistoriqueConsommateurService().agreger, cle_api = cle_api,
+                                   id_utilisateur = id_utilisateur, periode = periode.value,
+                                   date_debut = date_debut, date_fin = date_fin)
 
-@app.delete("/historique-empreinte/supprimer", dependencies = [Depends(get_cle_consommateur_ou_administateur)])
+@app.delete("/historique-empreinte/supprimer")
 async def delete_historique_consommateur(cle_api: str = Depends(get_cle_consommateur_ou_administateur)):
     """
     Supprime l'historique de l'empreinte carbone d'un consommateur ou de tous les consommateurs si clé administrateur.
@@ -541,7 +874,7 @@ async def delete_historique_consommateur(cle_api: str = Depends(get_cle_consomma
     Raises:
     - HTTPException(404): Pas d'historique trouvé.
     """
-    resultat = HistoriqueConsommateurService().supprimer(cle_api)
+    resultat = await run_in_threadpool(HistoriqueConsommateurService().supprimer, cle_api)
     if resultat:
         return {"message": "L'historique a bien été supprimé"}
     raise HTTPException(status_code = 404, detail = "L'historique associé à la clé API {} n'existe pas".format(id_utilisateur))
@@ -562,7 +895,7 @@ async def get_cles_api(cle_api: str = Header(...)):
     """
     if cle_api != token_administrateur:
         raise HTTPException(status_code = 401, detail = message)
-    return ClesApiService().voir()
+    return await run_in_threadpool(ClesApiService().voir)
 
 @app.delete("/table-cles-api/supprimer")
 async def delete_cles_api(id_utilisateur: int = None, cle_api: str = Header(...)):
@@ -585,12 +918,72 @@ async def delete_cles_api(id_utilisateur: int = None, cle_api: str = Header(...)
     if cle_api != token_administrateur:
         raise HTTPException(status_code = 401, detail = message)
 
-    resultat = ClesApiService().supprimer(id_utilisateur = id_utilisateur)
+    resultat = await run_in_threadpool(ClesApiService().supprimer, id_utilisateur = id_utilisateur)
     if id_utilisateur:
         if resultat:
             return {"message": "La clé d'api associé à l'utilisateur numéro {} été supprimé".format(id_utilisateur)}
         raise HTTPException(status_code = 404, detail = "La clé d'api associé à l'utilisateur numéro {} n'existe pas".format(id_utilisateur))
     return {"message": "La table des clés d'api a été supprimé"}
 
+@app.get("/metriques")
+async def get_metriques(cle_api: str = Header(...)):
+    """
+    Obtenez les métriques des caches de l'API avec autorisation d'administrateur.
+
+    Parameters:
+    - `cle_api` (header): Clé API de l'administrateur pour l'autorisation.
+
+    Returns:
+    - Compteurs des caches des clés API, des zones et des prévisions, dont le taux de succès
+      et la latence des vérifications complètes de clés API, l'utilisation du pool de connexions
+      et l'état de la file d'écriture de l'historique.
+
+    Raises:
+    - HTTPException(401): En cas de clé API invalide.
+    """
+    if cle_api != token_administrateur:
+        raise HTTPException(status_code = 401, detail = "Clé API invalide")
+    return {"cache_cles": CacheCles().statistiques(),
+            "cache_zone": CacheZone().statistiques(),
+            "cache_prevision": CachePrevision().statistiques(),
+            "pool_connexions": DBConnection().statistiques(),
+            "tampon_historique": TamponHistoriqueDao().statistiques()}
+
+@app.on_event("startup")
+def configurer_threads():
+    """
+    Fixe le nombre de threads dans lesquels sont exécutés les appels bloquants (base de données, API externes, bcrypt),
+    pour que la boucle d'événements continue de servir les autres requêtes pendant ces appels.
+    """
+    limite = os.environ.get("API_THREADS")
+    if limite:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = int(limite)
+
+@app.on_event("startup")
+def demarrer_moniteur():
+    """
+    Lance la surveillance en tâche de fond des API externes.
+    """
+    MoniteurEtat().demarrer()
+
+@app.on_event("startup")
+def demarrer_maintenance_historique():
+    """
+    Lance l'entretien en tâche de fond des partitions mensuelles de l'historique.
+    """
+    MaintenanceHistorique().demarrer()
+
+@app.on_event("shutdown")
+def fermer_connexions():
+    """
+    Arrête la surveillance des API externes et l'entretien de l'historique, enregistre l'historique encore en file d'écriture
+    et ferme les connexions du pool de la base de données et de la session HTTP à l'arrêt de l'API.
+    """
+    MoniteurEtat().arreter()
+    MaintenanceHistorique().arreter()
+    TamponHistoriqueDao().arreter()
+    DBConnection().fermer()
+    SessionHttp().fermer()
+
 if __name__ == "__main__":
     uvicorn.run(app)
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Microbenchmark du moteur d'empreinte : coût du calcul d'un lot de visionnages par le calcul scalaire
+historique (une boucle heure par heure par visionnage) et par MoteurEmpreinte (vectorisé par zone).
+
+Le calcul scalaire est mesuré sur un échantillon puis extrapolé au nombre de visionnages demandé.
+
+Lancement depuis le dossier src :
+    python -m benchmarks.bench_moteur --sessions 1000000
+"""
+import argparse
+import random
+import time
+import timeit
+import numpy as np
+from datetime import datetime, timedelta
+from business_object.prevision_carbone import PrevisionCarbone
+from service.moteur_empreinte import (MoteurEmpreinte, resolutions, materiels, types_connexion, coefficients_resolution,
+                                      coefficients_materiel, coefficients_connexion, energie_data_center)
+
+nb_heures = 72
+nb_zones = 20
+debut = datetime(2024, 1, 1, 0, 0)
+
+
+def previsions_zones(aleatoire: random.Random) -> list:
+    """
+    Prévisions horaires au format historique (date en chaîne, intensité) de chaque zone.
+    """
+    return [[((debut + timedelta(hours = h)).strftime("%Y-%m-%d %H:%M:%S"), aleatoire.randint(20, 600))
+             for h in range(nb_heures)] for _ in range(nb_zones)]
+
+
+def sessions(aleatoire: random.Random, nombre: int) -> list:
+    """
+    Visionnages tirés au hasard : durée, minute de début, résolution, matériel, type de connexion et zone.
+    """
+    l = []
+    for _ in range(nombre):
+        minute_debut = aleatoire.randrange((nb_heures - 1) * 60)
+        l.append((aleatoire.randint(1, min(240, nb_heures * 60 - minute_debut)), minute_debut,
+                  aleatoire.choice(resolutions), aleatoire.choice(materiels), aleatoire.choice(types_connexion),
+                  aleatoire.randrange(nb_zones)))
+    return l
+
+
+def empreinte_scalaire(duree: int, resolution: int, materiel: str, type_connexion: str, date_visionnage: datetime,
+                       liste: list) -> float:
+    """
+    Calcul historique d'un visionnage : les dates sont ré-analysées, puis parcourues heure par heure.
+    """
+    impact_energie = duree * coefficients_materiel[materiels.index(materiel)] \
+        + coefficients_resolution[resolutions.index(resolution)] * 25 * 60 * duree \
+        * (coefficients_connexion[types_connexion.index(type_connexion)] + energie_data_center)
+    dates = [datetime.strptime(date[0], "%Y-%m-%d %H:%M:%S") for date in liste]
+    date_visionnage_arrondie = date_visionnage.replace(minute = 0, second = 0, microsecond = 0)
+    indice = next((i for i, date in enumerate(dates) if date == date_visionnage_arrondie), None)
+    l = []
+    ecart_date = (dates[indice + 1] - date_visionnage).seconds // 60 % 60
+    if date_visionnage == date_visionnage_arrondie:
+        ecart_date = 60
+    duree_restante = duree
+    while duree_restante > 0:
+        l.append((ecart_date, liste[indice][1]))
+        duree_restante = duree_restante - ecart_date
+        ecart_date = min(60, duree_restante)
+        indice += 1
+    return round(impact_energie * sum((minutes * intensite) / duree for minutes, intensite in l), 1)
+
+
+def lot_scalaire(lot: list, listes: list) -> list:
+    """
+    Calcul historique d'un lot, un visionnage après l'autre.
+    """
+    return [empreinte_scalaire(duree, resolution, materiel, type_connexion, debut + timedelta(minutes = minute_debut),
+                               listes[zone])
+            for duree, minute_debut, resolution, materiel, type_connexion, zone in lot]
+
+
+def lot_vectorise(moteur: MoteurEmpreinte, tableaux: tuple) -> np.ndarray:
+    """
+    Calcul actuel d'un lot par MoteurEmpreinte.
+    """
+    return np.round(moteur.calculer(*tableaux), 1)
+
+
+def mesurer(fonction, nombre: int) -> float:
+    """
+    Renvoie la meilleure durée d'un appel en secondes sur trois séries.
+    """
+    return min(timeit.repeat(fonction, number = nombre, repeat = 3)) / nombre
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(description = "Microbenchmark du moteur d'empreinte")
+    parseur.add_argument("--sessions", type = int, default = 1_000_000, help = "nombre de visionnages du lot")
+    parseur.add_argument("--echantillon", type = int, default = 2000,
+                         help = "nombre de visionnages mesurés pour extrapoler le calcul scalaire")
+    arguments = parseur.parse_args()
+
+    aleatoire = random.Random(0)
+    listes = previsions_zones(aleatoire)
+    lot = sessions(aleatoire, arguments.sessions)
+    echantillon = lot[:arguments.echantillon]
+
+    instant = time.perf_counter()
+    moteur = MoteurEmpreinte.depuis_previsions([PrevisionCarbone.depuis_liste(liste) for liste in listes])
+    duree, minute_debut, resolution, materiel, type_connexion, zone = zip(*lot)
+    tableaux = (np.array(duree), MoteurEmpreinte.coder(resolution, resolutions), MoteurEmpreinte.coder(materiel, materiels),
+                MoteurEmpreinte.coder(type_connexion, types_connexion),
+                MoteurEmpreinte.secondes([debut])[0] + np.array(minute_debut, dtype = np.float64) * 60, np.array(zone))
+    preparation = time.perf_counter() - instant
+
+    scalaire = mesurer(lambda: lot_scalaire(echantillon, listes), 1) / len(echantillon) * len(lot)
+    vectorise = mesurer(lambda: lot_vectorise(moteur, tableaux), 1)
+    print(f"{len(lot)} visionnages, {nb_zones} zones, prévisions de {nb_heures} heures")
+    print(f"{'calcul scalaire historique (extrapolé)':<45} {scalaire:10.2f} s")
+    print(f"{'MoteurEmpreinte (préparation des tableaux)':<45} {preparation:10.2f} s")
+    print(f"{'MoteurEmpreinte (calcul)':<45} {vectorise:10.2f} s")
+    print(f"{'accélération du calcul':<45} {scalaire / vectorise:10.0f} x")
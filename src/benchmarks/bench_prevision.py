@@ -0,0 +1,78 @@
+"""
+Microbenchmark de la prévision carbone : coût de la conversion d'une réponse ElectricityMap
+et du calcul de l'intensité moyenne d'une fenêtre de visionnage, avant et après PrevisionCarbone.
+
+Lancement depuis le dossier src :
+    python -m benchmarks.bench_prevision
+"""
+import timeit
+import numpy as np
+from datetime import datetime, timedelta
+from business_object.prevision_carbone import PrevisionCarbone
+
+nb_heures = 72
+debut = datetime(2024, 1, 1, 0, 0)
+reponse = [{"carbonIntensity": 100 + (h * 37) % 400,
+            "datetime": (debut + timedelta(hours = h)).strftime("%Y-%m-%dT%H:%M:%S.000Z")} for h in range(nb_heures)]
+date_visionnage = debut + timedelta(hours = 20, minutes = 17)
+duree = 95
+
+
+def conversion_chaines(reponse: list) -> list:
+    """
+    Conversion historique : chaque date est analysée puis reformatée en chaîne.
+    """
+    l = []
+    for entree in reponse:
+        date_object = datetime.strptime(entree['datetime'], '%Y-%m-%dT%H:%M:%S.%fZ')
+        l.append((date_object.strftime('%Y-%m-%d %H:%M:%S'), entree['carbonIntensity']))
+    return l
+
+
+def moyenne_chaines(liste: list, date_visionnage: datetime, duree: int) -> float:
+    """
+    Calcul historique : les dates sont ré-analysées à chaque requête, puis parcourues heure par heure.
+    """
+    date_visionnage_arrondie = date_visionnage.replace(minute = 0, second = 0, microsecond = 0)
+    dates = [datetime.strptime(date[0], "%Y-%m-%d %H:%M:%S") for date in liste]
+    indice = next((i for i, date in enumerate(dates) if date == date_visionnage_arrondie), None)
+    l = []
+    ecart_date = (dates[indice + 1] - date_visionnage).seconds // 60 % 60
+    duree_restante = duree
+    while duree_restante > 0:
+        l.append((ecart_date, liste[indice][1]))
+        duree_restante = duree_restante - ecart_date
+        ecart_date = min(60, duree_restante)
+        indice += 1
+    return sum((minutes * intensite) / duree for minutes, intensite in l)
+
+
+def conversion_epochs(reponse: list) -> PrevisionCarbone:
+    """
+    Conversion actuelle (ZoneGeographique.telecharger_prevision) : une seule conversion vectorisée.
+    """
+    instants = np.array([entree['datetime'].rstrip('Z') for entree in reponse], dtype = 'datetime64[s]').astype(np.int64)
+    intensites = np.array([entree['carbonIntensity'] for entree in reponse], dtype = np.float64)
+    return PrevisionCarbone.depuis_epochs(instants, intensites)
+
+
+def mesurer(fonction, nombre: int) -> float:
+    """
+    Renvoie la meilleure durée d'un appel en microsecondes sur cinq séries.
+    """
+    return min(timeit.repeat(fonction, number = nombre, repeat = 5)) / nombre * 1e6
+
+
+if __name__ == "__main__":
+    liste = conversion_chaines(reponse)
+    prevision = conversion_epochs(reponse)
+    mesures = [
+        ("conversion d'une réponse (chaînes)", mesurer(lambda: conversion_chaines(reponse), 2000)),
+        ("conversion d'une réponse (epochs)", mesurer(lambda: conversion_epochs(reponse), 2000)),
+        ("intensité moyenne par requête (chaînes)", mesurer(lambda: moyenne_chaines(liste, date_visionnage, duree), 2000)),
+        ("intensité moyenne par requête (PrevisionCarbone)",
+         mesurer(lambda: prevision.intensite_moyenne(date_visionnage, duree), 20000)),
+    ]
+    print(f"Prévision de {nb_heures} heures, fenêtre de {duree} minutes")
+    for nom, duree_us in mesures:
+        print(f"{nom:<50} {duree_us:10.2f} µs")
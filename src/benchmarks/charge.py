@@ -0,0 +1,311 @@
+"""
+Test de charge HTTP de l'API : des utilisateurs virtuels envoient un mélange réaliste de requêtes
+(simulations des consommateurs, serveurs optimaux des fournisseurs, lectures de l'historique, exports administrateur),
+chacun avec la clé API de son rôle, à des paliers de concurrence croissants. Pour chaque palier et chaque route,
+le débit et les latences p50 / p95 / p99 sont mesurés, ce qui permet de situer le point de saturation.
+
+Par défaut tout est lancé localement : le simulateur des API externes (simulateur_api) et l'API (uvicorn),
+chacun dans son propre processus, l'API utilisant la base PostgreSQL configurée dans le .env (de préférence dédiée).
+Les clés API des utilisateurs virtuels sont générées au lancement avec la clé administrateur (token_admin)
+puis supprimées à la fin.
+
+Lancement depuis le dossier src :
+    python -m benchmarks.charge --paliers 1,4,16,64 --duree 20
+    python -m benchmarks.charge --workers 4 --latence-amont 50 --sortie charge.json
+    python -m benchmarks.charge --url http://127.0.0.1:8000    (API déjà lancée, simulateur non démarré)
+
+Le générateur de charge tourne dans un seul processus : aux concurrences élevées, vérifier qu'il n'est pas
+lui-même le facteur limitant (charge CPU du processus) avant de conclure sur la saturation de l'API.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+
+dossier_src = Path(__file__).resolve().parents[1]
+
+# Poids par défaut de chaque scénario dans le mélange de requêtes
+melange_defaut = {"simulation": 45, "simulation_lot": 5, "meilleurs_horaires": 5, "serveurs_optimaux": 20,
+                  "historique": 12, "agregats": 5, "export_admin": 3, "metriques_admin": 5}
+
+villes = [("Paris", "France"), ("Marseille", "France"), ("Lyon", "France"), ("Rennes", "France"),
+          ("Toulouse", "France"), ("Berlin", "Allemagne"), ("Madrid", "Espagne"), ("Londres", "Royaume-Uni")]
+resolutions = [360, 480, 720, 1080, 2160]
+types_connexion = ["Wifi", "Reseau", "Cable"]
+materiels = ["Ordinateur", "Mobile"]
+
+
+class Scenarios:
+    """
+    Construction des requêtes de chaque scénario, avec la clé API de son rôle.
+
+    Attributes
+    ----------
+    cles_consommateurs : list[str]
+        Clés API des consommateurs virtuels.
+    cles_fournisseurs : list[str]
+        Clés API des fournisseurs virtuels.
+    cle_admin : str
+        Clé API administrateur.
+
+    Methods
+    -------
+    requete(nom, utilisateur, aleatoire) -> tuple[str, str, dict]
+        Méthode HTTP, chemin et arguments httpx d'une requête du scénario.
+    """
+    def __init__(self, cles_consommateurs: list[str], cles_fournisseurs: list[str], cle_admin: str):
+        self.cles_consommateurs = cles_consommateurs
+        self.cles_fournisseurs = cles_fournisseurs
+        self.cle_admin = cle_admin
+
+    @staticmethod
+    def _visionnage(aleatoire: random.Random) -> dict:
+        ville, pays = aleatoire.choice(villes)
+        return {"duree": aleatoire.randint(5, 180), "resolution": aleatoire.choice(resolutions),
+                "type_connexion": aleatoire.choice(types_connexion), "materiel": aleatoire.choice(materiels),
+                "ville": ville, "pays": pays}
+
+    def requete(self, nom: str, utilisateur: int, aleatoire: random.Random) -> tuple[str, str, dict]:
+        """
+        Méthode HTTP, chemin et arguments httpx (params, json, headers) d'une requête du scénario.
+        """
+        consommateur = {"cle-api": self.cles_consommateurs[utilisateur % len(self.cles_consommateurs)]}
+        fournisseur = {"cle-api": self.cles_fournisseurs[utilisateur % len(self.cles_fournisseurs)]}
+        admin = {"cle-api": self.cle_admin}
+
+        if nom == "simulation":
+            return "GET", "/empreinte-carbone/simulation", {"params": self._visionnage(aleatoire), "headers": consommateur}
+        if nom == "simulation_lot":
+            lot = []
+            for _ in range(50):
+                visionnage = self._visionnage(aleatoire)
+                localisation = {"ville": visionnage.pop("ville"), "pays": visionnage.pop("pays")}
+                lot.append({**visionnage, "date_visionnage": datetime.now().isoformat(), "localisation": localisation})
+            return "POST", "/empreinte-carbone/simulation/lot", {"json": lot, "headers": consommateur}
+        if nom == "meilleurs_horaires":
+            return "GET", "/empreinte-carbone/meilleurs-horaires", {"params": self._visionnage(aleatoire), "headers": consommateur}
+        if nom == "serveurs_optimaux":
+            ville, pays = aleatoire.choice(villes)
+            return "GET", "/serveurs-optimaux/simulation", {"params": {"duree": aleatoire.randint(5, 180), "ville": ville,
+                                                                       "pays": pays}, "headers": fournisseur}
+        if nom == "historique":
+            return "GET", "/historique-empreinte", {"params": {"limit": 100}, "headers": consommateur}
+        if nom == "agregats":
+            return "GET", "/historique-empreinte/agregats", {"params": {"periode": "jour"}, "headers": consommateur}
+        if nom == "export_admin":
+            debut = (datetime.now() - timedelta(minutes = 5)).isoformat()
+            return "GET", "/historique-empreinte", {"params": {"format": "ndjson", "date_debut": debut}, "headers": admin}
+        if nom == "metriques_admin":
+            return "GET", "/metriques", {"headers": admin}
+        raise ValueError(f"Scénario inconnu : {nom}")
+
+
+async def utilisateur_virtuel(client: httpx.AsyncClient, scenarios: Scenarios, melange: dict, utilisateur: int,
+                              fin: float, mesures: list):
+    """
+    Envoie des requêtes tirées selon le mélange jusqu'à la fin du palier et enregistre (scénario, statut, durée).
+    """
+    aleatoire = random.Random(utilisateur)
+    noms, poids = list(melange), list(melange.values())
+    while time.perf_counter() < fin:
+        nom = aleatoire.choices(noms, poids)[0]
+        methode, chemin, arguments = scenarios.requete(nom, utilisateur, aleatoire)
+        debut = time.perf_counter()
+        try:
+            reponse = await client.request(methode, chemin, **arguments)
+            await reponse.aread()
+            statut = reponse.status_code
+        except httpx.HTTPError:
+            statut = 0
+        mesures.append((nom, statut, time.perf_counter() - debut))
+
+
+def resumer(mesures: list, duree: float) -> dict:
+    """
+    Débit et latences par scénario d'un palier.
+
+    Parameters
+    ----------
+    mesures : list
+        Tuples (scénario, statut HTTP ou 0 en cas d'erreur réseau, durée en secondes).
+    duree : float
+        Durée du palier en secondes.
+
+    Returns
+    -------
+    dict
+        Pour chaque scénario et pour l'ensemble ("total") : nombre de requêtes, d'erreurs (statut 0 ou 5xx),
+        débit en requêtes par seconde et latences p50, p95, p99 et maximale en millisecondes.
+    """
+    par_scenario = {}
+    for nom, statut, secondes in mesures:
+        par_scenario.setdefault(nom, []).append((statut, secondes))
+    par_scenario["total"] = [(statut, secondes) for _, statut, secondes in mesures]
+
+    resume = {}
+    for nom, valeurs in par_scenario.items():
+        if not valeurs:
+            continue
+        statuts = np.array([statut for statut, _ in valeurs])
+        latences = np.array([secondes for _, secondes in valeurs]) * 1000
+        p50, p95, p99 = np.percentile(latences, [50, 95, 99])
+        resume[nom] = {"requetes": len(valeurs), "erreurs": int(np.sum((statuts == 0) | (statuts >= 500))),
+                       "debit": round(len(valeurs) / duree, 2), "p50_ms": round(float(p50), 2),
+                       "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2),
+                       "max_ms": round(float(latences.max()), 2)}
+    return resume
+
+
+async def executer_palier(url: str, scenarios: Scenarios, melange: dict, concurrence: int,
+                          duree: float, echauffement: float) -> dict:
+    """
+    Exécute un palier de concurrence : échauffement non mesuré puis mesure pendant la durée donnée.
+    """
+    limites = httpx.Limits(max_connections = concurrence, max_keepalive_connections = concurrence)
+    async with httpx.AsyncClient(base_url = url, limits = limites, timeout = 60) as client:
+        if echauffement > 0:
+            fin = time.perf_counter() + echauffement
+            await asyncio.gather(*(utilisateur_virtuel(client, scenarios, melange, u, fin, [])
+                                   for u in range(concurrence)))
+        mesures = []
+        debut = time.perf_counter()
+        fin = debut + duree
+        await asyncio.gather(*(utilisateur_virtuel(client, scenarios, melange, u, fin, mesures)
+                               for u in range(concurrence)))
+        return resumer(mesures, time.perf_counter() - debut)
+
+
+def afficher_palier(concurrence: int, resume: dict):
+    print(f"\nConcurrence {concurrence}")
+    print(f"{'scénario':<22} {'requêtes':>9} {'erreurs':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for nom in sorted(resume, key = lambda nom: (nom == "total", nom)):
+        ligne = resume[nom]
+        print(f"{nom:<22} {ligne['requetes']:>9} {ligne['erreurs']:>8} {ligne['debit']:>9.1f} "
+              f"{ligne['p50_ms']:>9.1f} {ligne['p95_ms']:>9.1f} {ligne['p99_ms']:>9.1f}", flush = True)
+
+
+def point_saturation(paliers: list[dict], gain_minimal: float = 0.1) -> int | None:
+    """
+    Premier palier de concurrence à partir duquel le débit total augmente de moins de gain_minimal
+    par rapport au palier précédent, None si le débit augmente jusqu'au dernier palier.
+    """
+    for precedent, palier in zip(paliers, paliers[1:]):
+        if palier["resume"]["total"]["debit"] < precedent["resume"]["total"]["debit"] * (1 + gain_minimal):
+            return palier["concurrence"]
+    return None
+
+
+def port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def attendre(url: str, processus: subprocess.Popen, delai: float = 30):
+    """
+    Attend qu'un serveur lancé en sous-processus réponde.
+    """
+    limite = time.monotonic() + delai
+    while time.monotonic() < limite:
+        if processus.poll() is not None:
+            raise RuntimeError(f"Le serveur {url} s'est arrêté au démarrage")
+        try:
+            httpx.get(url, timeout = 1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Le serveur {url} n'a pas démarré")
+
+
+def generer_cles(url: str, cle_admin: str, type_utilisateur: str, nombre: int) -> list[dict]:
+    """
+    Génère des clés API par l'endpoint /generer-cle.
+    """
+    return [httpx.post(f"{url}/generer-cle", params = {"type_utilisateur": type_utilisateur},
+                       headers = {"cle-api": cle_admin}, timeout = 30).raise_for_status().json()
+            for _ in range(nombre)]
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parseur = argparse.ArgumentParser(description = "Test de charge HTTP de l'API")
+    parseur.add_argument("--url", help = "adresse d'une API déjà lancée (sinon API et simulateur sont lancés localement)")
+    parseur.add_argument("--paliers", default = "1,4,16,64", help = "niveaux de concurrence successifs")
+    parseur.add_argument("--duree", type = float, default = 20, help = "durée mesurée de chaque palier en secondes")
+    parseur.add_argument("--echauffement", type = float, default = 3, help = "durée non mesurée avant chaque palier")
+    parseur.add_argument("--melange", help = "poids des scénarios, par exemple simulation=70,historique=30")
+    parseur.add_argument("--consommateurs", type = int, default = 8, help = "nombre de clés API de consommateurs")
+    parseur.add_argument("--fournisseurs", type = int, default = 2, help = "nombre de clés API de fournisseurs")
+    parseur.add_argument("--workers", type = int, default = 1, help = "nombre de processus uvicorn de l'API")
+    parseur.add_argument("--latence-amont", type = float, default = 0, help = "latence du simulateur en millisecondes")
+    parseur.add_argument("--taux-erreur-amont", type = float, default = 0, help = "proportion de réponses 503 du simulateur")
+    parseur.add_argument("--sortie", help = "fichier JSON des résultats")
+    arguments = parseur.parse_args()
+
+    cle_admin = os.environ.get("token_admin")
+    if not cle_admin:
+        sys.exit("La variable token_admin (clé administrateur) est requise pour générer les clés API")
+    melange = dict(melange_defaut)
+    if arguments.melange:
+        melange = {nom: float(poids) for nom, poids in (element.split("=") for element in arguments.melange.split(","))}
+
+    processus = []
+    url = arguments.url
+    try:
+        if url is None:
+            port_simulateur, port_api = port_libre(), port_libre()
+            processus.append(subprocess.Popen(
+                [sys.executable, "-m", "simulateur_api.serveur", "--port", str(port_simulateur),
+                 "--latence", str(arguments.latence_amont), "--taux-erreur", str(arguments.taux_erreur_amont)],
+                cwd = dossier_src))
+            url_simulateur = f"http://127.0.0.1:{port_simulateur}"
+            attendre(url_simulateur + "/health", processus[-1])
+            environnement = {**os.environ, "NOMINATIM_URL": url_simulateur, "ELECTRICITY_MAP_URL": url_simulateur}
+            processus.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port_api), "--workers", str(arguments.workers),
+                 "--log-level", "warning"], cwd = dossier_src, env = environnement))
+            url = f"http://127.0.0.1:{port_api}"
+            attendre(url + "/", processus[-1])
+
+        cles = (generer_cles(url, cle_admin, "Consommateur", arguments.consommateurs)
+                + generer_cles(url, cle_admin, "Fournisseur", arguments.fournisseurs))
+        try:
+            scenarios = Scenarios([cle["cle_api"] for cle in cles if cle["type_utilisateur"] == "Consommateur"],
+                                  [cle["cle_api"] for cle in cles if cle["type_utilisateur"] == "Fournisseur"], cle_admin)
+            paliers = []
+            for concurrence in (int(c) for c in arguments.paliers.split(",") if c):
+                resume = asyncio.run(executer_palier(url, scenarios, melange, concurrence,
+                                                     arguments.duree, arguments.echauffement))
+                afficher_palier(concurrence, resume)
+                paliers.append({"concurrence": concurrence, "resume": resume})
+        finally:
+            for cle in cles:
+                if cle.get("id_utilisateur"):
+                    httpx.delete(f"{url}/table-cles-api/supprimer", params = {"id_utilisateur": cle["id_utilisateur"]},
+                                 headers = {"cle-api": cle_admin}, timeout = 30)
+
+        saturation = point_saturation(paliers)
+        print("\nDébit total par palier : " + ", ".join(f"{p['concurrence']} → {p['resume']['total']['debit']:.1f} req/s"
+                                                        for p in paliers))
+        print(f"Saturation à partir de la concurrence {saturation}" if saturation
+              else "Pas de saturation observée sur ces paliers")
+
+        if arguments.sortie:
+            with open(arguments.sortie, "w", encoding = "utf-8") as fichier:
+                json.dump({"date": datetime.now().isoformat(timespec = "seconds"), "url": url, "workers": arguments.workers,
+                           "melange": melange, "duree": arguments.duree, "paliers": paliers, "saturation": saturation},
+                          fichier, indent = 2, ensure_ascii = False)
+    finally:
+        for p in reversed(processus):
+            p.terminate()
+            p.wait(timeout = 10)
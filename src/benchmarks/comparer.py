@@ -0,0 +1,86 @@
+"""
+Comparaison de deux résultats de la suite de benchmarks (voir benchmarks.suite) : chaque mesure
+dont la durée médiane dépasse celle de la référence de plus du seuil est signalée comme régression.
+
+Lancement depuis le dossier src :
+    python -m benchmarks.comparer benchmarks/resultats/reference.json benchmarks/resultats/actuel.json --seuil 0.2
+
+Le code de sortie vaut 1 si au moins une régression est détectée.
+"""
+import argparse
+import json
+import sys
+
+
+def charger(chemin: str) -> dict:
+    """
+    Charge un fichier de résultats de la suite de benchmarks.
+    """
+    with open(chemin, encoding = "utf-8") as fichier:
+        return json.load(fichier)
+
+
+def comparer(reference: dict, actuel: dict, seuil: float = 0.2) -> list[dict]:
+    """
+    Compare les durées médianes de deux résultats de la suite de benchmarks.
+
+    Parameters
+    ----------
+    reference : dict
+        Résultats de référence.
+    actuel : dict
+        Résultats à comparer à la référence.
+    seuil : float, optional
+        Écart relatif au-delà duquel une mesure est une régression ou une amélioration, par défaut 0.2 (20 %).
+
+    Returns
+    -------
+    list[dict]
+        Pour chaque mesure, par ordre alphabétique : nom, durées médianes de référence et actuelle en microsecondes
+        (None si absente d'un des résultats), écart relatif et statut ("regression", "amelioration", "stable",
+        "nouvelle" ou "supprimee").
+    """
+    mesures_reference = reference["resultats"]
+    mesures_actuelles = actuel["resultats"]
+    lignes = []
+    for nom in sorted(set(mesures_reference) | set(mesures_actuelles)):
+        avant = mesures_reference.get(nom, {}).get("mediane_us")
+        apres = mesures_actuelles.get(nom, {}).get("mediane_us")
+        ecart = None
+        if avant is None:
+            statut = "nouvelle"
+        elif apres is None:
+            statut = "supprimee"
+        else:
+            ecart = apres / avant - 1 if avant > 0 else 0.0
+            statut = "regression" if ecart > seuil else "amelioration" if ecart < -seuil else "stable"
+        lignes.append({"nom": nom, "reference_us": avant, "actuel_us": apres, "ecart": ecart, "statut": statut})
+    return lignes
+
+
+def rapport(lignes: list[dict], seuil: float) -> str:
+    """
+    Met en forme le résultat de comparer sous forme de tableau texte.
+    """
+    def duree(valeur):
+        return f"{valeur:14.1f}" if valeur is not None else f"{'-':>14}"
+
+    texte = [f"{'mesure':<55} {'référence µs':>14} {'actuel µs':>14} {'écart':>8}  statut"]
+    for ligne in lignes:
+        ecart = f"{ligne['ecart']:+8.1%}" if ligne["ecart"] is not None else f"{'-':>8}"
+        texte.append(f"{ligne['nom']:<55} {duree(ligne['reference_us'])} {duree(ligne['actuel_us'])} {ecart}  {ligne['statut']}")
+    regressions = sum(ligne["statut"] == "regression" for ligne in lignes)
+    texte.append(f"{regressions} régression(s) au-delà de {seuil:.0%}")
+    return "\n".join(texte)
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(description = "Compare deux résultats de la suite de benchmarks")
+    parseur.add_argument("reference")
+    parseur.add_argument("actuel")
+    parseur.add_argument("--seuil", type = float, default = 0.2, help = "écart relatif toléré (par défaut 0.2)")
+    arguments = parseur.parse_args()
+
+    lignes = comparer(charger(arguments.reference), charger(arguments.actuel), arguments.seuil)
+    print(rapport(lignes, arguments.seuil))
+    sys.exit(1 if any(ligne["statut"] == "regression" for ligne in lignes) else 0)
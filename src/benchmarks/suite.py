@@ -0,0 +1,260 @@
+"""
+Suite de benchmarks des chemins critiques des services, exécutée hors ligne : les API Nominatim et Electricity Map
+sont remplacées par le simulateur local (simulateur_api) et les accès aux données utilisent la base PostgreSQL
+configurée dans le .env, de préférence une base dédiée.
+
+Les clés API et l'historique nécessaires sont créés au lancement puis supprimés à la fin.
+Chaque mesure est répétée plusieurs fois ; la durée retenue pour la comparaison est la médiane
+des durées moyennes d'un appel sur chaque répétition.
+
+Lancement depuis le dossier src :
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sortie benchmarks/resultats/reference.json
+    python -m benchmarks.suite --reference benchmarks/resultats/reference.json --seuil 0.2
+
+Avec --reference, le rapport de comparaison est affiché et le code de sortie vaut 1 en cas de régression.
+"""
+import argparse
+import json
+import os
+import platform
+import secrets
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+import bcrypt
+from benchmarks.comparer import charger, comparer, rapport
+from simulateur_api.serveur import ConfigurationSimulateur, ServeurSimulateur
+
+dossier_resultats = Path(__file__).resolve().parent / "resultats"
+
+
+def mesurer(fonction, appels: int, repetitions: int = 5, preparation = None) -> dict:
+    """
+    Mesure la durée d'un appel d'une fonction.
+
+    Parameters
+    ----------
+    fonction : Callable
+        Fonction mesurée, appelée sans argument.
+    appels : int
+        Nombre d'appels par répétition.
+    repetitions : int, optional
+        Nombre de répétitions, par défaut 5.
+    preparation : Callable | None, optional
+        Fonction appelée avant chaque appel, hors mesure (par exemple pour vider un cache).
+
+    Returns
+    -------
+    dict
+        Durées médiane, minimale et maximale d'un appel en microsecondes sur les répétitions,
+        nombre d'appels et de répétitions.
+    """
+    fonction()
+    durees = []
+    for _ in range(repetitions):
+        total = 0.0
+        for _ in range(appels):
+            if preparation is not None:
+                preparation()
+            debut = time.perf_counter()
+            fonction()
+            total += time.perf_counter() - debut
+        durees.append(total / appels * 1e6)
+    return {"mediane_us": round(statistics.median(durees), 3), "min_us": round(min(durees), 3),
+            "max_us": round(max(durees), 3), "appels": appels, "repetitions": repetitions}
+
+
+class DonneesBenchmark:
+    """
+    Clés API et historique créés pour les benchmarks, supprimés par nettoyer().
+
+    Methods
+    -------
+    cle(type_utilisateur) -> dict
+        Génère une clé API comme l'endpoint /generer-cle (hachage bcrypt complet).
+    completer_cles(nombre)
+        Ajoute des clés API de remplissage jusqu'à en avoir créé le nombre donné.
+    historique(nb_lignes) -> str
+        Crée une clé de consommateur et son historique, et renvoie la clé hachée.
+    nettoyer()
+        Supprime les clés créées, avec leur historique et leurs agrégats.
+    """
+    def __init__(self):
+        self.identifiants = []
+        self.nb_cles_remplissage = 0
+        # Un seul hachage, à faible coût, partagé par les clés qui ne sont jamais vérifiées.
+        self._hachage_remplissage = bcrypt.hashpw(b"remplissage", bcrypt.gensalt(4)).decode("utf-8")
+
+    def cle(self, type_utilisateur: str) -> dict:
+        from service.table.cles_api_service import ClesApiService
+
+        cle = ClesApiService().generer_cle_api(type_utilisateur)
+        self.identifiants.append(cle["id_utilisateur"])
+        return cle
+
+    def _cle_remplissage(self, hachage: str | None = None) -> dict:
+        from dao.cles_api_dao import ClesAPIDao
+
+        cle = ClesAPIDao().creer(hachage or self._hachage_remplissage, "Consommateur", secrets.token_hex(8))
+        self.identifiants.append(cle["id_utilisateur"])
+        return cle
+
+    def completer_cles(self, nombre: int):
+        for _ in range(nombre - self.nb_cles_remplissage):
+            self._cle_remplissage()
+        self.nb_cles_remplissage = max(nombre, self.nb_cles_remplissage)
+
+    def historique(self, nb_lignes: int) -> str:
+        from dao.historique_consommateur_dao import HistoriqueConsommateurDao
+
+        # Hachage propre à la clé : les agrégats de l'historique sont indexés par clé hachée.
+        cle_api = self._cle_remplissage(bcrypt.hashpw(secrets.token_bytes(16), bcrypt.gensalt(4)).decode("utf-8"))["cle_api"]
+        # Requêtes réparties sur les 60 derniers jours
+        fin = datetime.now().replace(microsecond = 0)
+        ecart = timedelta(days = 60) / nb_lignes
+        for debut_lot in range(0, nb_lignes, 10000):
+            lignes = []
+            for i in range(debut_lot, min(debut_lot + 10000, nb_lignes)):
+                date_requete = fin - ecart * (nb_lignes - i)
+                lignes.append((cle_api, date_requete, 30 + i % 90, date_requete, (720, 1080, 480)[i % 3],
+                               ("Wifi", "Reseau", "Cable")[i % 3], ("Mobile", "Ordinateur")[i % 2],
+                               round(5 + (i * 37) % 400 / 10, 1), "Paris", "France"))
+            HistoriqueConsommateurDao().creer_lignes(lignes)
+        return cle_api
+
+    def nettoyer(self):
+        from service.table.cles_api_service import ClesApiService
+
+        for id_utilisateur in self.identifiants:
+            ClesApiService().supprimer(id_utilisateur)
+        self.identifiants = []
+
+
+def executer(tailles_cles: list[int], tailles_historique: list[int], repetitions: int = 5,
+             filtre: str | None = None) -> dict:
+    """
+    Exécute les benchmarks contre le simulateur local et la base de données configurée.
+
+    Parameters
+    ----------
+    tailles_cles : list[int]
+        Nombres de clés API ajoutées en base pour la vérification des clés.
+    tailles_historique : list[int]
+        Nombres de lignes d'historique du consommateur pour les lectures de l'historique.
+    repetitions : int, optional
+        Nombre de répétitions de chaque mesure, par défaut 5.
+    filtre : str | None, optional
+        Ne mesure que les benchmarks dont le nom contient ce texte.
+
+    Returns
+    -------
+    dict
+        Date, environnement d'exécution et mesures par nom de benchmark (voir mesurer).
+    """
+    simulateur = ServeurSimulateur(ConfigurationSimulateur())
+    url = simulateur.demarrer()
+    # Avant l'import des services, qui lisent les adresses des API au chargement.
+    os.environ["NOMINATIM_URL"] = url
+    os.environ["ELECTRICITY_MAP_URL"] = url
+
+    from business_object.info_video import InfoVideo
+    from business_object.zone_geographique import ZoneGeographique
+    from dao.agregats_consommateur_dao import AgregatsConsommateurDao
+    from dao.historique_consommateur_dao import HistoriqueConsommateurDao
+    from dao.serveur_dao import ServeurDao
+    from dao.tampon_historique_dao import TamponHistoriqueDao
+    from service.empreinte_carbone_service import EmpreinteCarboneService
+    from service.offre_cloud_service import OffreCloudService
+    from service.table.cles_api_service import ClesApiService
+    from utils.cache_cles import CacheCles
+
+    resultats = {}
+    donnees = DonneesBenchmark()
+
+    def benchmark(nom: str, fonction, appels: int, preparation = None):
+        if filtre and filtre not in nom:
+            return
+        resultats[nom] = mesurer(fonction, appels, repetitions, preparation)
+        print(f"{nom:<55} {resultats[nom]['mediane_us']:14.1f} µs", flush = True)
+
+    try:
+        consommateur = donnees.cle("Consommateur")
+        cle_hachee = ClesApiService().trouver_cle_api("Consommateur", consommateur["cle_api"])
+        lieu = ZoneGeographique("Paris", "France")
+        maintenant = datetime.now()
+        video = InfoVideo(90, 1080, "Wifi", "Ordinateur", lieu, maintenant)
+        lot = [InfoVideo(30 + i % 120, (720, 1080, 2160)[i % 3], "Wifi", "Mobile", ZoneGeographique(ville, "France"), maintenant)
+               for i, ville in enumerate(["Paris", "Marseille", "Lyon", "Rennes", "Toulouse"] * 20)]
+
+        benchmark("empreinte_carbone", lambda: EmpreinteCarboneService().empreinte_carbone(video, cle_hachee), 2000)
+        benchmark("empreinte_carbone_lot[100]",
+                  lambda: EmpreinteCarboneService().empreinte_carbone_lot(lot, cle_hachee), 20)
+        benchmark("meilleurs_horaires", lambda: EmpreinteCarboneService().meilleurs_horaires(video), 200)
+        TamponHistoriqueDao().vider()
+
+        benchmark("serveurs_eligibles", lambda: OffreCloudService().serveurs_eligibles(lieu), 2000)
+        benchmark("serveurs_optimaux", lambda: OffreCloudService().serveurs_optimaux(lieu, 90, maintenant), 500)
+        benchmark("serveurs_horaires_optimaux",
+                  lambda: OffreCloudService().serveurs_horaires_optimaux(lieu, 90, maintenant, 10, 2, 15), 100)
+        benchmark("ServeurDao.trouver_par_fournisseur_cloud",
+                  lambda: ServeurDao().trouver_par_fournisseur_cloud(["AWS", "GCP", "Azure"]), 50)
+
+        # Vérification complète (base de données et bcrypt), le cache étant vidé avant chaque appel
+        for nombre in tailles_cles:
+            donnees.completer_cles(nombre)
+            benchmark(f"trouver_cle_api[{nombre} cles]",
+                      lambda: ClesApiService().trouver_cle_api("Consommateur", consommateur["cle_api"]), 3,
+                      preparation = CacheCles().vider)
+        benchmark("trouver_cle_api[cache]",
+                  lambda: ClesApiService().trouver_cle_api("Consommateur", consommateur["cle_api"]), 20000)
+
+        for nombre in tailles_historique:
+            noms = [f"{nom}[{nombre} lignes]" for nom in ("historique.trouver_page", "historique.trouver_totaux", "agregats.trouver")]
+            if filtre and not any(filtre in nom for nom in noms):
+                continue
+            cle_api = donnees.historique(nombre)
+            benchmark(noms[0],
+                      lambda: HistoriqueConsommateurDao().trouver_page(cle_api = cle_api, limite = 1000), 20)
+            benchmark(noms[1],
+                      lambda: HistoriqueConsommateurDao().trouver_totaux_par_cle_api(cle_api), 200)
+            benchmark(noms[2],
+                      lambda: AgregatsConsommateurDao().trouver(cle_api = cle_api, periode = "semaine"), 50)
+    finally:
+        TamponHistoriqueDao().vider()
+        donnees.nettoyer()
+        simulateur.arreter()
+
+    return {"date": datetime.now().isoformat(timespec = "seconds"),
+            "environnement": {"python": platform.python_version(), "machine": platform.machine(),
+                              "systeme": platform.platform(), "processeurs": os.cpu_count()},
+            "resultats": resultats}
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(description = "Benchmarks des chemins critiques des services")
+    parseur.add_argument("--sortie", help = "fichier JSON des résultats (par défaut benchmarks/resultats/<date>.json)")
+    parseur.add_argument("--reference", help = "résultats de référence à comparer")
+    parseur.add_argument("--seuil", type = float, default = 0.2, help = "écart relatif toléré (par défaut 0.2)")
+    parseur.add_argument("--repetitions", type = int, default = 5)
+    parseur.add_argument("--tailles-cles", default = "10,100,1000")
+    parseur.add_argument("--tailles-historique", default = "1000,10000,100000")
+    parseur.add_argument("--filtre", help = "ne mesure que les benchmarks dont le nom contient ce texte")
+    arguments = parseur.parse_args()
+
+    resultats = executer([int(t) for t in arguments.tailles_cles.split(",") if t],
+                         [int(t) for t in arguments.tailles_historique.split(",") if t],
+                         arguments.repetitions, arguments.filtre)
+
+    sortie = Path(arguments.sortie) if arguments.sortie else dossier_resultats / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    sortie.parent.mkdir(parents = True, exist_ok = True)
+    with open(sortie, "w", encoding = "utf-8") as fichier:
+        json.dump(resultats, fichier, indent = 2, ensure_ascii = False)
+    print(f"Résultats enregistrés dans {sortie}")
+
+    if arguments.reference:
+        lignes = comparer(charger(arguments.reference), resultats, arguments.seuil)
+        print(rapport(lignes, arguments.seuil))
+        sys.exit(1 if any(ligne["statut"] == "regression" for ligne in lignes) else 0)
@@ -0,0 +1,214 @@
+import math
+import numpy as np
+from datetime import datetime, timedelta
+
+epoch = datetime(1970, 1, 1)
+
+
+class PrevisionCarbone:
+    """
+    Classe représentant la prévision de l'intensité carbone d'une zone electricity map, à pas régulier.
+    Les sommes cumulées des intensités pondérées par la durée de chaque pas permettent d'obtenir
+    l'intensité moyenne sur n'importe quelle fenêtre de visionnage en temps constant, sans parcourir la prévision.
+
+    Une fenêtre de visionnage commence à la première minute entière qui suit la date de visionnage
+    et dure un nombre entier de minutes.
+
+    Attributes
+    ----------
+    debut : int
+        Date du début de la prévision, en secondes depuis l'epoch.
+    pas : int
+        Durée de chaque pas de la prévision en secondes, par défaut une heure.
+    intensites : np.ndarray
+        Intensités carbone de chaque pas en gCO2eq/kWh.
+    cumuls : np.ndarray
+        cumuls[i] est l'intensité intégrée en gCO2eq/kWh x minute du début de la prévision au début du pas i.
+
+    Methods
+    -------
+    depuis_epochs(instants, intensites) -> PrevisionCarbone
+        Construit la prévision à partir des dates en secondes depuis l'epoch et des intensités de chaque pas.
+    depuis_liste(liste) -> PrevisionCarbone
+        Construit la prévision à partir d'une liste horaire de tuples (date, intensité carbone).
+    instants -> np.ndarray
+        Dates de début de chaque pas, en secondes depuis l'epoch.
+    fin -> int
+        Date de fin de la prévision, en secondes depuis l'epoch.
+    moyennes(debuts, durees) -> np.ndarray
+        Calcule l'intensité carbone moyenne de plusieurs fenêtres de visionnage.
+    debuts_possibles(depuis, duree, pas) -> np.ndarray
+        Dates de début des fenêtres de visionnage entièrement couvertes par la prévision.
+    intensite_moyenne(date_visionnage, duree) -> float
+        Calcule l'intensité carbone moyenne d'une fenêtre de visionnage.
+    """
+    def __init__(self, debut: int, intensites, pas: int = 3600):
+        self.debut = int(debut)
+        self.pas = int(pas)
+        self.intensites = np.asarray(intensites, dtype = np.float64)
+        self.cumuls = np.zeros(len(self.intensites) + 1)
+        np.cumsum(self.intensites * (self.pas / 60), out = self.cumuls[1:])
+
+    @classmethod
+    def depuis_epochs(cls, instants, intensites) -> "PrevisionCarbone":
+        """
+        Construit la prévision à partir des dates en secondes depuis l'epoch et des intensités de chaque pas.
+
+        Parameters
+        ----------
+        instants : array-like
+            Dates de début de chaque pas, en secondes depuis l'epoch, croissantes et régulièrement espacées.
+        intensites : array-like
+            Intensités carbone de chaque pas en gCO2eq/kWh.
+
+        Returns
+        -------
+        PrevisionCarbone
+            Prévision compacte, vide s'il n'y a aucun pas.
+        """
+        instants = np.asarray(instants, dtype = np.int64)
+        if len(instants) == 0:
+            return cls(0, [])
+        pas = int(instants[1] - instants[0]) if len(instants) > 1 else 3600
+        if pas <= 0 or np.any(np.diff(instants) != pas):
+            raise ValueError("Prévision carbone à pas irrégulier")
+        return cls(instants[0], intensites, pas)
+
+    @classmethod
+    def depuis_liste(cls, liste: list[tuple]) -> "PrevisionCarbone":
+        """
+        Construit la prévision à partir d'une liste horaire de tuples (date "%Y-%m-%d %H:%M:%S", intensité carbone),
+        dont les dates se suivent d'heure en heure.
+
+        Parameters
+        ----------
+        liste : list[tuple]
+            Prévision horaire de l'impact carbone de la consommation d'électricité.
+
+        Returns
+        -------
+        PrevisionCarbone
+            Prévision compacte, vide si la liste l'est.
+        """
+        if not liste:
+            return cls(0, [])
+        debut = np.datetime64(liste[0][0], "s").astype(np.int64)
+        return cls(debut, [intensite for _, intensite in liste])
+
+    @property
+    def instants(self) -> np.ndarray:
+        """
+        Dates de début de chaque pas, en secondes depuis l'epoch.
+        """
+        return self.debut + self.pas * np.arange(len(self.intensites), dtype = np.int64)
+
+    @property
+    def fin(self) -> int:
+        """
+        Date de fin de la prévision (exclue), en secondes depuis l'epoch.
+        """
+        return self.debut + self.pas * len(self.intensites)
+
+    def _integrale(self, instants: np.ndarray) -> np.ndarray:
+        """
+        Intensité intégrée en gCO2eq/kWh x minute entre le début de la prévision et chaque instant,
+        les instants devant être compris dans la prévision.
+        """
+        ecart = instants - self.debut
+        indice = np.clip(ecart // self.pas, 0, len(self.intensites) - 1).astype(np.int64)
+        return self.cumuls[indice] + (ecart - indice * self.pas) / 60 * self.intensites[indice]
+
+    def moyennes(self, debuts, durees) -> np.ndarray:
+        """
+        Calcule l'intensité carbone moyenne de plusieurs fenêtres de visionnage, en temps constant par fenêtre.
+
+        Parameters
+        ----------
+        debuts : array-like
+            Dates de visionnage en secondes depuis l'epoch.
+        durees : array-like
+            Durées de visionnage en minutes.
+
+        Returns
+        -------
+        np.ndarray
+            Intensités carbone moyennes en gCO2eq/kWh, NaN lorsque la prévision ne couvre pas la fenêtre.
+            Pour une durée nulle, intensité carbone à la première minute entière de visionnage.
+        """
+        durees = np.asarray(durees, dtype = np.int64)
+        debuts = np.ceil(np.asarray(debuts, dtype = np.float64) / 60) * 60
+        fins = debuts + 60 * np.maximum(durees, 0)
+        if len(self.intensites) == 0:
+            return np.full(debuts.shape, np.nan)
+        valide = (debuts >= self.debut) & (fins <= self.fin) & (debuts < self.fin)
+        debuts = np.where(valide, debuts, self.debut)
+        fins = np.where(valide, fins, self.debut)
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            moyennes = np.where(durees > 0, (self._integrale(fins) - self._integrale(debuts)) / durees,
+                                self.intensites[np.clip((debuts - self.debut) // self.pas, 0, len(self.intensites) - 1)
+                                                .astype(np.int64)])
+        return np.where(valide, moyennes, np.nan)
+
+    def debuts_possibles(self, depuis: datetime, duree: int, pas: int = 15) -> np.ndarray:
+        """
+        Dates de début, alignées sur un multiple du pas, des fenêtres de visionnage commençant après une date
+        et entièrement couvertes par la prévision.
+
+        Parameters
+        ----------
+        depuis : datetime
+            Date de visionnage au plus tôt.
+        duree : int
+            Durée de la vidéo en minutes.
+        pas : int, optional
+            Écart en minutes entre deux débuts, par défaut 15.
+
+        Returns
+        -------
+        np.ndarray
+            Dates de début en secondes depuis l'epoch, vide si aucune fenêtre n'est couverte.
+        """
+        if len(self.intensites) == 0:
+            return np.empty(0, dtype = np.int64)
+        ecart = 60 * pas
+        premier = max(math.ceil((depuis - epoch).total_seconds() / 60) * 60, self.debut)
+        premier = -(-premier // ecart) * ecart
+        dernier = min(self.fin - 60 * max(duree, 0), self.fin - 1)
+        return np.arange(premier, dernier + 1, ecart, dtype = np.int64)
+
+    def intensite_moyenne(self, date_visionnage: datetime, duree: int) -> float:
+        """
+        Calcule l'intensité carbone moyenne d'une fenêtre de visionnage.
+
+        Parameters
+        ----------
+        date_visionnage : datetime
+            Date de visionnage de la vidéo.
+        duree : int
+            Durée de la vidéo en minutes.
+
+        Returns
+        -------
+        float
+            Intensité carbone moyenne en gCO2eq/kWh, NaN lorsque la prévision ne couvre pas la fenêtre.
+        """
+        # Calcul scalaire : pour une seule fenêtre, il évite le coût de création des tableaux numpy.
+        debut = math.ceil((date_visionnage - epoch).total_seconds() / 60) * 60
+        fin = debut + 60 * max(duree, 0)
+        if len(self.intensites) == 0 or debut < self.debut or fin > self.fin or debut >= self.fin:
+            return math.nan
+        if duree <= 0:
+            return float(self.intensites[(debut - self.debut) // self.pas])
+        return float(self._integrale_scalaire(fin) - self._integrale_scalaire(debut)) / duree
+
+    def _integrale_scalaire(self, instant: int) -> float:
+        """
+        Intensité intégrée en gCO2eq/kWh x minute entre le début de la prévision et un instant compris dans la prévision.
+        """
+        ecart = instant - self.debut
+        indice = min(ecart // self.pas, len(self.intensites) - 1)
+        return self.cumuls[indice] + (ecart - indice * self.pas) / 60 * self.intensites[indice]
+
+    def __repr__(self):
+        return (f"PrevisionCarbone[debut = '{epoch + timedelta(seconds = self.debut)}', pas = {self.pas}, "
+                f"nb_pas = {len(self.intensites)}]")
@@ -21,6 +21,8 @@ class ServeurCloud:
 
     Methods
     -------
+    zone -> str
+        Zone electricity map du serveur.
     __repr__()
         Retourne une représentation simplifié sous forme de chaîne de caractères du serveur.
     """
@@ -33,5 +35,12 @@ class ServeurCloud:
         self.zone_disponibilite = zone_disponibilite
         self.localisation = localisation
 
+    @property
+    def zone(self) -> str:
+        """
+        Zone electricity map du serveur, sans appel API lorsqu'elle a été pré-calculée en base de données.
+        """
+        return self.localisation.name_to_zone()
+
     def __repr__(self):
         return f"ServeurCloud[id_serveur = '{self.id_serveur}', nom = '{self.nom}', localisation = '{self.localisation}']"
\ No newline at end of file
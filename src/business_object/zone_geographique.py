@@ -1,17 +1,23 @@
-import requests
 import os
+import numpy as np
 from dotenv import load_dotenv
-from datetime import datetime
+from business_object.prevision_carbone import PrevisionCarbone
+from utils.cache_zone import CacheZone
+from utils.cache_prevision import CachePrevision
+from utils.session_http import SessionHttp
 
 load_dotenv()
 token_em = os.environ.get('token_em')
 headers = {'auth-token': token_em}
 
-# URL pour les requetes API sur Nominatim et ElectricityMap
-url_geo = "https://nominatim.openstreetmap.org/search"
-url_em = "https://api.electricitymap.org/v3/carbon-intensity/latest"
+# URL pour les requetes API sur Nominatim et ElectricityMap,
+# configurables pour pointer vers un serveur local (voir simulateur_api).
+url_nominatim = os.environ.get('NOMINATIM_URL', "https://nominatim.openstreetmap.org").rstrip('/')
+url_electricity_map = os.environ.get('ELECTRICITY_MAP_URL', "https://api.electricitymap.org").rstrip('/')
+url_geo = url_nominatim + "/search"
+url_em = url_electricity_map + "/v3/carbon-intensity/latest"
 # Utilisé pour récupérer la zone. Url plus rapide que le deuxième et moins restrictif.
-url_em_prev = "https://api.electricitymap.org/v3/carbon-intensity/forecast"
+url_em_prev = url_electricity_map + "/v3/carbon-intensity/forecast"
 
 erreur_geo = "Non reconnaissance de votre position géographique"
 erreur_em = "Non accès aux données provenant de l'API Electricity Map"
@@ -27,35 +33,56 @@ class ZoneGeographique:
         Le nom de la ville.
     pays : str | None, optional
         Le nom du pays. Par défaut, None.
+    zone : str | None, optional
+        La zone electricity map si elle est déjà connue (par exemple pré-calculée en base). Par défaut, None.
+    latitude : float | None, optional
+        La latitude de la ville si elle est déjà connue. Par défaut, None.
+    longitude : float | None, optional
+        La longitude de la ville si elle est déjà connue. Par défaut, None.
 
     Methods
     -------
+    coordonnees()
+        Fournit la latitude et la longitude de la ville.
+    coordonnees_to_zone(latitude, longitude)
+        Fournit la zone electricity map contenant un point géographique.
     name_to_zone()
         Fournit la zone electricity map contenant la ville.
     prevision_carbone()
         Accède à la prévision de l'impact de la consommation électrique en gCO2eq/kWh de la zone electricity map correspondante.
+    prevision_zone(zone)
+        Accède à la prévision d'une zone electricity map depuis le cache partagé des prévisions.
+    telecharger_prevision(zone)
+        Télécharge la prévision d'une zone electricity map depuis l'API.
     __repr__()
         Retourne une représentation sous forme de chaîne de caractères de la zone géographique.
     """
-    def __init__(self, ville : str, pays : str | None = None) :
+    def __init__(self, ville : str, pays : str | None = None, zone : str | None = None,
+                 latitude : float | None = None, longitude : float | None = None) :
         self.ville = ville
         self.pays = pays
-    
-    def name_to_zone(self) -> str:
+        self.zone = zone
+        self.latitude = latitude
+        self.longitude = longitude
+
+    def coordonnees(self) -> tuple[float, float]:
         """ 
-        Fournit la zone electricity map comprenant la ville.
+        Fournit la latitude et la longitude de la ville.
 
         Returns
         -------
-        str
-            Zone electricity map.
+        tuple[float, float]
+            Latitude et longitude de la ville.
         """
+        if self.latitude is not None and self.longitude is not None:
+            return self.latitude, self.longitude
+
         if self.pays is None:
             params_geo = {'city': self.ville, 'format': 'json'}
-            response = requests.get(url_geo, params = params_geo)
+            response = SessionHttp().get(url_geo, params = params_geo)
         else:
             params_geo = {'city': self.ville, 'country': self.pays, 'format': 'json'}
-            response = requests.get(url_geo, params = params_geo)
+            response = SessionHttp().get(url_geo, params = params_geo)
 
         if response.status_code != 200:
             raise ValueError(erreur_geo)
@@ -64,26 +91,101 @@ class ZoneGeographique:
             raise ValueError(erreur_geo)
  
         response_nominatim = response.json()[0] 
-        params_em = {'lat': response_nominatim['lat'], 'lon': response_nominatim['lon']}
-        response_em = requests.get(url_em, params = params_em, headers = headers)
+        self.latitude, self.longitude = float(response_nominatim['lat']), float(response_nominatim['lon'])
+        return self.latitude, self.longitude
+
+    @staticmethod
+    def coordonnees_to_zone(latitude : float, longitude : float) -> str:
+        """ 
+        Fournit la zone electricity map contenant un point géographique.
+
+        Parameters
+        ----------
+        latitude : float
+            Latitude du point.
+        longitude : float
+            Longitude du point.
+
+        Returns
+        -------
+        str
+            Zone electricity map.
+        """
+        params_em = {'lat': latitude, 'lon': longitude}
+        response_em = SessionHttp().get(url_em, params = params_em, headers = headers)
 
         if response_em.status_code != 200:
             raise ValueError(erreur_em)
 
         return response_em.json()["zone"]
+    
+    def name_to_zone(self) -> str:
+        """ 
+        Fournit la zone electricity map comprenant la ville.
+        La zone est conservée dans le cache partagé CacheZone pour éviter les appels API suivants.
 
-    def prevision_carbone(self) -> list:
+        Returns
+        -------
+        str
+            Zone electricity map.
+        """
+        if self.zone is not None:
+            return self.zone
+
+        zone = CacheZone().trouver(self.ville, self.pays)
+        if zone is not None:
+            return zone
+
+        zone = self.coordonnees_to_zone(*self.coordonnees())
+        CacheZone().enregistrer(self.ville, self.pays, zone)
+        return zone
+
+    def prevision_carbone(self) -> PrevisionCarbone:
         """ 
         Accède à la prévision de l'impact de la consommation électrique en gCO2eq/kWh de la zone géographique.
 
         Returns
         -------
-        list
-            Liste de tuples contenant la date et la prévision de l'impact carbone de la consommation d’électricité associée.
+        PrevisionCarbone
+            Prévision horaire de l'impact carbone de la consommation d’électricité associée.
+        """
+        return self.prevision_zone(self.name_to_zone())
+
+    @staticmethod
+    def prevision_zone(zone: str) -> PrevisionCarbone:
+        """ 
+        Accède à la prévision de l'impact carbone d'une zone electricity map depuis le cache partagé CachePrevision.
+
+        Parameters
+        ----------
+        zone : str
+            Zone electricity map.
+
+        Returns
+        -------
+        PrevisionCarbone
+            Prévision horaire de l'impact carbone de la consommation d’électricité associée.
+        """
+        return CachePrevision().obtenir(zone, ZoneGeographique.telecharger_prevision)
+
+    @staticmethod
+    def telecharger_prevision(zone: str) -> PrevisionCarbone:
+        """ 
+        Télécharge la prévision de l'impact carbone d'une zone electricity map depuis l'API.
+        Les dates sont converties une seule fois, au téléchargement, en secondes depuis l'epoch.
+
+        Parameters
+        ----------
+        zone : str
+            Zone electricity map.
+
+        Returns
+        -------
+        PrevisionCarbone
+            Prévision horaire de l'impact carbone de la consommation d’électricité associée.
         """
-        zone = self.name_to_zone()
         params_em_prev = {'zone': zone}
-        response = requests.get(url_em_prev, params = params_em_prev, headers = headers)
+        response = SessionHttp().get(url_em_prev, params = params_em_prev, headers = headers)
         if response.status_code != 200:
             raise ValueError(erreur_em)
 
@@ -91,14 +193,14 @@ class ZoneGeographique:
             raise ValueError(erreur_em)
 
         response_list = response.json()["forecast"]
-        l = []
-        for entree in response_list:
-            date_string = entree['datetime']
-            date_object = datetime.strptime(date_string, '%Y-%m-%dT%H:%M:%S.%fZ')
-            # Convertir l'objet datetime en une nouvelle chaîne avec un format différent
-            date_object = date_object.strftime('%Y-%m-%d %H:%M:%S')
-            l.append((date_object, entree['carbonIntensity']))
-        return l
+        # Dates de la forme "2024-01-01T10:00:00.000Z", conservées en UTC sans fuseau comme auparavant
+        instants = np.array([entree['datetime'].rstrip('Z') for entree in response_list],
+                            dtype = 'datetime64[s]').astype(np.int64)
+        intensites = np.array([entree['carbonIntensity'] for entree in response_list], dtype = np.float64)
+        try:
+            return PrevisionCarbone.depuis_epochs(instants, intensites)
+        except ValueError:
+            raise ValueError(erreur_em)
         
     def __repr__(self):
         return f"ZoneGeographique[ville = '{self.ville}', pays = '{self.pays}']"
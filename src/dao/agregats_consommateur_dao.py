@@ -0,0 +1,167 @@
+from dao.db_connection import DBConnection
+from utils.singleton import Singleton
+from datetime import date, timedelta
+
+# Unités de date_trunc des périodes d'agrégation proposées par l'API
+unites_periode = {"jour": "day", "semaine": "week"}
+
+
+class AgregatsConsommateurDao(metaclass = Singleton):
+    """
+    Classe pour l'accès aux agrégats quotidiens de l'historique des consommateurs de VOD,
+    tenus à jour par trigger à chaque enregistrement d'historique.
+
+    Methods
+    -------
+    trouver(cle_api, id_utilisateur, periode, date_debut, date_fin) -> list
+        Récupère les agrégats par période et par combinaison de paramètres de visionnage.
+
+    rattraper(nb_jours) -> dict | None
+        Reconstitue les agrégats d'un lot de jours à partir de l'historique existant.
+
+    supprimer(cle_api) -> bool
+        Supprime les agrégats associés à une clé API.
+    """
+    def trouver(self, cle_api: str | None = None, id_utilisateur: int | None = None, periode: str = "jour",
+                date_debut: date | None = None, date_fin: date | None = None) -> list:
+        """
+        Récupère les agrégats par période et par combinaison (résolution, matériel, type de connexion),
+        sans lire l'historique détaillé.
+
+        Parameters
+        ----------
+        cle_api : str | None, optional
+            Clé API du consommateur de VOD, None pour tous les consommateurs.
+        id_utilisateur : int | None, optional
+            Identifiant de l'utilisateur, None pour tous les utilisateurs.
+        periode : str, optional
+            "jour" ou "semaine" (semaines commençant le lundi), par défaut "jour".
+        date_debut : date | None, optional
+            Premier jour inclus.
+        date_fin : date | None, optional
+            Dernier jour exclu.
+
+        Returns
+        -------
+        list
+            Lignes (debut, resolution, materiel, type_connexion, nb_requetes, somme_empreinte,
+            min_empreinte, max_empreinte) triées par début de période.
+        """
+        conditions = []
+        params = {"unite": unites_periode[periode]}
+        if cle_api is not None:
+            conditions.append("cle_api = %(cle_api)s")
+            params["cle_api"] = cle_api
+        if id_utilisateur is not None:
+            conditions.append("id_utilisateur = %(id_utilisateur)s")
+            params["id_utilisateur"] = id_utilisateur
+        if date_debut is not None:
+            conditions.append("jour >= %(date_debut)s")
+            params["date_debut"] = date_debut
+        if date_fin is not None:
+            conditions.append("jour < %(date_fin)s")
+            params["date_fin"] = date_fin
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT date_trunc(%(unite)s, jour)::date AS debut, resolution, materiel, type_connexion,  "
+                        "       SUM(nb_requetes)::BIGINT AS nb_requetes, SUM(somme_empreinte) AS somme_empreinte,   "
+                        "       MIN(min_empreinte) AS min_empreinte, MAX(max_empreinte) AS max_empreinte            "
+                        "   FROM projet.agregats_consommateur_jour                                                 "
+                        + (" WHERE " + " AND ".join(conditions) if conditions else "") +
+                        "   GROUP BY 1, 2, 3, 4                                                                    "
+                        "   ORDER BY 1, 2, 3, 4;                                                                   ",
+                        params,
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            print(e)
+            raise
+
+        return res
+
+    def rattraper(self, nb_jours: int = 7) -> dict | None:
+        """
+        Reconstitue les agrégats d'un lot de jours à partir de l'historique existant, en reprenant
+        là où le lot précédent s'est arrêté. Chaque lot est recalculé entièrement dans sa propre transaction,
+        ce qui permet d'interrompre et de relancer la reprise sans double comptage.
+
+        Parameters
+        ----------
+        nb_jours : int, optional
+            Nombre de jours recalculés par lot, par défaut 7.
+
+        Returns
+        -------
+        dict | None
+            Jours recalculés (debut, fin exclue) et dernier jour à atteindre, None si la reprise est terminée.
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    # Le verrou de ligne empêche deux reprises simultanées de traiter le même lot.
+                    cursor.execute(
+                        "SELECT prochain_jour, jour_fin                 "
+                        "   FROM projet.reprise_agregats                "
+                        "   WHERE nom = 'agregats_consommateur_jour'    "
+                        "   FOR UPDATE;                                 "
+                    )
+                    reprise = cursor.fetchone()
+                    if reprise is None or reprise["prochain_jour"] >= reprise["jour_fin"]:
+                        return None
+                    debut = reprise["prochain_jour"]
+                    fin = min(debut + timedelta(days = nb_jours), reprise["jour_fin"])
+                    # Les insertions concurrentes attendent la fin du lot : une ligne est comptée
+                    # soit par le recalcul, soit par le trigger, jamais par les deux.
+                    cursor.execute(
+                        "LOCK TABLE projet.agregats_consommateur_jour IN SHARE ROW EXCLUSIVE MODE;              "
+                        "DELETE FROM projet.agregats_consommateur_jour                                           "
+                        "   WHERE jour >= %(debut)s AND jour < %(fin)s;                                          "
+                        "INSERT INTO projet.agregats_consommateur_jour (id_utilisateur, cle_api, jour, resolution, "
+                        "       materiel, type_connexion, nb_requetes, somme_empreinte, min_empreinte, max_empreinte) "
+                        "   SELECT id_utilisateur, cle_api, date_requete::date, COALESCE(resolution, 0),         "
+                        "          COALESCE(materiel, ''), COALESCE(type_connexion, ''), COUNT(*),               "
+                        "          COALESCE(SUM(empreinte_carbone), 0), MIN(empreinte_carbone), MAX(empreinte_carbone) "
+                        "       FROM projet.historique_consommateur                                              "
+                        "       WHERE date_requete >= %(debut)s AND date_requete < %(fin)s                       "
+                        "       GROUP BY 1, 2, 3, 4, 5, 6;                                                       "
+                        "UPDATE projet.reprise_agregats SET prochain_jour = %(fin)s                              "
+                        "   WHERE nom = 'agregats_consommateur_jour';                                            ",
+                        {"debut": debut, "fin": fin},
+                    )
+        except Exception as e:
+            print(e)
+            raise
+
+        return {"debut": debut, "fin": fin, "jour_fin": reprise["jour_fin"]}
+
+    def supprimer(self, cle_api: str) -> bool:
+        """
+        Supprime les agrégats d'une clé API, y compris ceux des jours dont l'historique détaillé
+        a déjà été supprimé par la rétention.
+
+        Parameters
+        ----------
+        cle_api : str
+            Clé API du consommateur de VOD.
+
+        Returns
+        -------
+        bool
+            True si la suppression est un succès, False sinon.
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "DELETE FROM projet.agregats_consommateur_jour"
+                        "   WHERE cle_api = %(cle_api)s;              ",
+                        {"cle_api": cle_api},
+                    )
+                    res = cursor.rowcount
+        except Exception as e:
+            print(e)
+            raise
+
+        return res > 0
@@ -0,0 +1,114 @@
+from dao.db_connection import DBConnection
+from utils.singleton import Singleton
+from datetime import datetime
+
+
+class CacheZoneDao(metaclass = Singleton):
+    """
+    Classe pour la persistance du cache des zones electricity map dans la base de données.
+
+    Methods
+    -------
+    creer(ville, pays, zone, date_maj) -> bool
+        Enregistre ou met à jour la zone electricity map d'une ville.
+
+    trouver_recents(limite) -> list
+        Récupère les zones enregistrées les plus récentes.
+
+    supprimer_tout() -> bool
+        Supprime toutes les zones enregistrées.
+    """
+    def creer(self, ville: str, pays: str, zone: str, date_maj: datetime) -> bool:
+        """
+        Enregistre ou met à jour la zone electricity map d'une ville.
+
+        Parameters
+        ----------
+        ville : str
+            Nom normalisé de la ville.
+        pays : str
+            Nom normalisé du pays, chaîne vide si non renseigné.
+        zone : str
+            Zone electricity map comprenant la ville.
+        date_maj : datetime
+            Date à laquelle la zone a été obtenue.
+
+        Returns
+        -------
+        bool
+            True si l'enregistrement est un succès, False sinon.
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "INSERT INTO projet.cache_zone(ville, pays, zone, date_maj)         "
+                        "   VALUES (%(ville)s, %(pays)s, %(zone)s, %(date_maj)s)            "
+                        "   ON CONFLICT (ville, pays)                                       "
+                        "   DO UPDATE SET zone = EXCLUDED.zone, date_maj = EXCLUDED.date_maj;",
+                        {"ville": ville, "pays": pays, "zone": zone, "date_maj": date_maj},
+                    )
+                    res = cursor.rowcount
+        except Exception as e:
+            print(e)
+            raise
+
+        return res > 0
+
+    def trouver_recents(self, limite: int) -> list:
+        """
+        Récupère les zones enregistrées les plus récentes.
+
+        Parameters
+        ----------
+        limite : int
+            Nombre maximal de zones renvoyées.
+
+        Returns
+        -------
+        list
+            Liste des enregistrements (ville, pays, zone, date_maj) du plus ancien au plus récent.
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT ville, pays, zone, date_maj  "
+                        "   FROM projet.cache_zone           "
+                        "   ORDER BY date_maj DESC           "
+                        "   LIMIT %(limite)s;                ",
+                        {"limite": limite},
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            print(e)
+            raise
+
+        requetes = []
+        if res:
+            for row in reversed(res):
+                requetes.append(row)
+
+        return requetes
+
+    def supprimer_tout(self) -> bool:
+        """
+        Supprime toutes les zones enregistrées.
+
+        Returns
+        -------
+        bool
+            True si la suppression est un succès, False sinon.
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "DELETE FROM projet.cache_zone;"
+                    )
+                    res = cursor.rowcount
+        except Exception as e:
+            print(e)
+            raise
+
+        return res > 0
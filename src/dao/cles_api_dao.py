@@ -7,7 +7,7 @@ class ClesAPIDao(metaclass = Singleton):
 
     Methods
     -------
-    creer(cle_api, type_utilisateur) -> bool
+    creer(cle_api, type_utilisateur, prefixe) -> bool
         Crée une clé API dans la base de données.
 
     existe_cle(cle_api) -> bool
@@ -19,6 +19,18 @@ class ClesAPIDao(metaclass = Singleton):
     trouver_par_type_utilisateur(type_utilisateur) -> list
         Trouve les clés API par type d'utilisateur.
 
+    existe_prefixe(prefixe) -> bool
+        Vérifie si un préfixe de clé API est déjà attribué.
+
+    trouver_par_prefixe(type_utilisateur, prefixe) -> dict | None
+        Trouve la clé API hachée et l'identifiant associés à un préfixe public.
+
+    trouver_sans_prefixe(type_utilisateur) -> list
+        Trouve les clés API d'un type d'utilisateur créées avant l'introduction des préfixes.
+
+    ajouter_prefixe(cle_api, prefixe) -> bool
+        Attribue un préfixe public à une clé API qui n'en a pas.
+
     trouver_tout() -> list
         Récupère toutes les clés API dans la base de données.
 
@@ -28,7 +40,7 @@ class ClesAPIDao(metaclass = Singleton):
     supprimer_tout() -> bool
         Supprime toutes les clés API enregistrés.
     """
-    def creer(self, cle_api: str, type_utilisateur: str) -> bool:
+    def creer(self, cle_api: str, type_utilisateur: str, prefixe: str | None = None) -> bool:
         """
         Crée une clé API dans la base de données.
 
@@ -38,6 +50,8 @@ class ClesAPIDao(metaclass = Singleton):
             Clé API à créer.
         type_utilisateur : str
             Type d'utilisateur associé à la clé API.
+        prefixe : str | None, optional
+            Préfixe public permettant de retrouver la clé sans parcourir la table.
 
         Returns
         -------
@@ -46,13 +60,13 @@ class ClesAPIDao(metaclass = Singleton):
         """
         res = None
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
-                        "INSERT INTO projet.table_cles_api(cle_api, type_utilisateur)  "
-                        "   VALUES (%(cle_api)s, %(type_utilisateur)s)                 "
-                        "   RETURNING *;                                               ",
-                        {"cle_api": cle_api, "type_utilisateur": type_utilisateur},
+                        "INSERT INTO projet.table_cles_api(cle_api, type_utilisateur, prefixe)  "
+                        "   VALUES (%(cle_api)s, %(type_utilisateur)s, %(prefixe)s)             "
+                        "   RETURNING *;                                                        ",
+                        {"cle_api": cle_api, "type_utilisateur": type_utilisateur, "prefixe": prefixe},
                     )
                     res = cursor.fetchone()
         except Exception as e:
@@ -78,7 +92,7 @@ class ClesAPIDao(metaclass = Singleton):
             True si la clé API existe déjà, False sinon.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "SELECT COUNT(*) as count       "
@@ -109,7 +123,7 @@ class ClesAPIDao(metaclass = Singleton):
             le numéro de l'identifiant utilisateur.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "SELECT id_utilisateur          "
@@ -142,7 +156,7 @@ class ClesAPIDao(metaclass = Singleton):
             Liste des clés API trouvées.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "SELECT cle_api                                   "
@@ -163,6 +177,139 @@ class ClesAPIDao(metaclass = Singleton):
 
         return liste_cles
 
+    def existe_prefixe(self, prefixe: str) -> bool:
+        """
+        Vérifie si un préfixe de clé API est déjà attribué.
+
+        Parameters
+        ----------
+        prefixe : str
+            Préfixe public à vérifier.
+
+        Returns
+        -------
+        bool
+            True si le préfixe existe déjà, False sinon.
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT COUNT(*) as count         "
+                        "   FROM projet.table_cles_api    "
+                        "   WHERE prefixe = %(prefixe)s;  ",
+                        {"prefixe": prefixe},
+                    )
+                    count = cursor.fetchone()["count"]
+        except Exception as e:
+            print(e)
+            raise
+
+        return count > 0
+
+    def trouver_par_prefixe(self, type_utilisateur: str, prefixe: str) -> dict | None:
+        """
+        Trouve la clé API hachée et l'identifiant associés à un préfixe public, via l'index unique sur la colonne prefixe.
+
+        Parameters
+        ----------
+        type_utilisateur : str
+            Type d'utilisateur associé à la clé API.
+        prefixe : str
+            Préfixe public de la clé API.
+
+        Returns
+        -------
+        dict | None
+            Clé API hachée (cle_api) et identifiant de l'utilisateur (id_utilisateur), None si aucune clé ne correspond.
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT cle_api, id_utilisateur                    "
+                        "   FROM projet.table_cles_api                     "
+                        "   WHERE prefixe = %(prefixe)s                    "
+                        "     AND type_utilisateur = %(type_utilisateur)s; ",
+                        {"prefixe": prefixe, "type_utilisateur": type_utilisateur},
+                    )
+                    res = cursor.fetchone()
+        except Exception as e:
+            print(e)
+            raise
+
+        return res
+
+    def trouver_sans_prefixe(self, type_utilisateur: str) -> list:
+        """
+        Trouve les clés API d'un type d'utilisateur créées avant l'introduction des préfixes.
+
+        Parameters
+        ----------
+        type_utilisateur : str
+            Type d'utilisateur pour lequel rechercher les clés API.
+
+        Returns
+        -------
+        list
+            Liste des clés API hachées sans préfixe (cle_api) et des identifiants associés (id_utilisateur).
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT cle_api, id_utilisateur                    "
+                        "   FROM projet.table_cles_api                     "
+                        "   WHERE type_utilisateur = %(type_utilisateur)s  "
+                        "     AND prefixe IS NULL;                         ",
+                        {"type_utilisateur": type_utilisateur},
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            print(e)
+            raise
+
+        liste_cles = []
+
+        if res:
+            for row in res:
+                liste_cles.append(row)
+
+        return liste_cles
+
+    def ajouter_prefixe(self, cle_api: str, prefixe: str) -> bool:
+        """
+        Attribue un préfixe public à une clé API qui n'en a pas.
+
+        Parameters
+        ----------
+        cle_api : str
+            Clé API hachée.
+        prefixe : str
+            Préfixe public à attribuer.
+
+        Returns
+        -------
+        bool
+            True si la mise à jour est un succès, False sinon.
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "UPDATE projet.table_cles_api        "
+                        "   SET prefixe = %(prefixe)s        "
+                        "   WHERE cle_api = %(cle_api)s      "
+                        "     AND prefixe IS NULL;           ",
+                        {"cle_api": cle_api, "prefixe": prefixe},
+                    )
+                    res = cursor.rowcount
+        except Exception as e:
+            print(e)
+            raise
+
+        return res > 0
+
     def trouver_tout(self) -> list:
         """
         Récupère toutes les clés API dans la base de données.
@@ -173,7 +320,7 @@ class ClesAPIDao(metaclass = Singleton):
             Liste de toutes les clés API.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "SELECT *                      "
@@ -206,7 +353,7 @@ class ClesAPIDao(metaclass = Singleton):
             True si la suppression est un succès, False sinon.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "DELETE FROM projet.table_cles_api            "
@@ -230,7 +377,7 @@ class ClesAPIDao(metaclass = Singleton):
             True si la suppression est un succès, False sinon.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "DELETE FROM projet.table_cles_api;"
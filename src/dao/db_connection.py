@@ -1,18 +1,47 @@
 import os
+import time
 import dotenv
 import psycopg2
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from psycopg2.extensions import TRANSACTION_STATUS_UNKNOWN
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 from utils.singleton import Singleton
 
 
 class DBConnection(metaclass = Singleton):
     """
-    Classe technique pour ouvrir une seule connexion a la database.
+    Classe technique gérant un pool de connexions à la database.
+    Chaque requête emprunte sa propre connexion le temps d'une transaction, de sorte que les requêtes
+    ne sont plus sérialisées et qu'une transaction en échec n'affecte pas les autres.
+
+    La configuration se fait par les variables d'environnement :
+    - DB_POOL_MIN : nombre de connexions ouvertes au démarrage (par défaut 1).
+    - DB_POOL_MAX : nombre maximal de connexions simultanées (par défaut 10).
+    - DB_POOL_ATTENTE : durée maximale d'attente d'une connexion libre en secondes (par défaut 30).
+    - DB_POOL_VERIFICATION : durée d'inactivité en secondes au-delà de laquelle une connexion
+      est vérifiée avant d'être prêtée (par défaut 30).
+
+    Methods
+    -------
+    connexion()
+        Emprunte une connexion au pool le temps d'une transaction.
+    statistiques() -> dict
+        Renvoie l'utilisation du pool et les temps d'attente.
+    fermer()
+        Ferme toutes les connexions du pool.
     """
     def __init__(self):
         dotenv.load_dotenv(override = True)
-        # Open the connection.
-        self.__connection = psycopg2.connect(
+        self.taille_min = int(os.environ.get("DB_POOL_MIN", 1))
+        self.taille_max = int(os.environ.get("DB_POOL_MAX", 10))
+        self.attente_max = float(os.environ.get("DB_POOL_ATTENTE", 30))
+        self.delai_verification = float(os.environ.get("DB_POOL_VERIFICATION", 30))
+        # Open the connections.
+        self.__pool = ThreadedConnectionPool(
+            self.taille_min,
+            self.taille_max,
             host = os.environ["HOST"],
             port = os.environ["PORT"],
             database = os.environ["DATABASE"],
@@ -20,10 +49,123 @@ class DBConnection(metaclass = Singleton):
             password = os.environ["PASSWORD"],
             cursor_factory = RealDictCursor,
         )
+        # ThreadedConnectionPool lève une erreur quand il est plein : le sémaphore fait patienter à la place.
+        self.__places = BoundedSemaphore(self.taille_max)
+        self.__verrou = Lock()
+        self.__derniere_utilisation = {}
+        self.en_cours = 0
+        self.max_en_cours = 0
+        self.emprunts = 0
+        self.duree_attente = 0.0
+        self.duree_max_attente = 0.0
+        self.reconnexions = 0
+
+    @contextmanager
+    def connexion(self):
+        """
+        Emprunte une connexion au pool le temps d'une transaction.
+        La transaction est validée à la sortie du bloc, ou annulée en cas d'exception.
+        Une connexion rompue n'est jamais rendue au pool : elle est fermée et remplacée.
+
+        Yields
+        ------
+        connection
+            Connexion psycopg2 dont les curseurs renvoient des dictionnaires.
+        """
+        debut = time.perf_counter()
+        if not self.__places.acquire(timeout = self.attente_max):
+            raise PoolError("Aucune connexion disponible après {} secondes".format(self.attente_max))
+        try:
+            connection = self.__emprunter()
+            self.__mesurer_emprunt(time.perf_counter() - debut)
+            rompue = False
+            try:
+                with connection:
+                    yield connection
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                rompue = True
+                raise
+            finally:
+                rompue = rompue or connection.closed != 0
+                self.__rendre(connection, rompue)
+        finally:
+            self.__places.release()
+
+    def __emprunter(self):
+        """
+        Obtient une connexion en bon état, en remplaçant celles qui ont été rompues.
+        """
+        for _ in range(self.taille_max + 1):
+            connection = self.__pool.getconn()
+            if self.__en_bon_etat(connection):
+                return connection
+            self.__pool.putconn(connection, close = True)
+            with self.__verrou:
+                self.reconnexions += 1
+        raise PoolError("Impossible d'obtenir une connexion valide à la base de données")
+
+    def __en_bon_etat(self, connection) -> bool:
+        """
+        Vérifie une connexion avant de la prêter ; une requête de test n'est faite qu'après une longue inactivité.
+        """
+        if connection.closed or connection.get_transaction_status() == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        derniere = self.__derniere_utilisation.get(id(connection), 0.0)
+        if time.monotonic() - derniere < self.delai_verification:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def __rendre(self, connection, rompue: bool):
+        """
+        Rend une connexion au pool, ou la ferme si elle est rompue.
+        """
+        with self.__verrou:
+            self.en_cours -= 1
+            if rompue:
+                self.reconnexions += 1
+                self.__derniere_utilisation.pop(id(connection), None)
+            else:
+                self.__derniere_utilisation[id(connection)] = time.monotonic()
+        self.__pool.putconn(connection, close = rompue)
+
+    def __mesurer_emprunt(self, attente: float):
+        """
+        Comptabilise un emprunt de connexion et son temps d'attente.
+        """
+        with self.__verrou:
+            self.emprunts += 1
+            self.en_cours += 1
+            self.max_en_cours = max(self.max_en_cours, self.en_cours)
+            self.duree_attente += attente
+            self.duree_max_attente = max(self.duree_max_attente, attente)
+
+    def statistiques(self) -> dict:
+        """
+        Renvoie l'utilisation du pool et les temps d'attente.
+
+        Returns
+        -------
+        dict
+            Tailles du pool, connexions empruntées, nombre d'emprunts, attentes moyenne et maximale
+            en millisecondes et nombre de connexions remplacées.
+        """
+        with self.__verrou:
+            return {"taille_min": self.taille_min, "taille_max": self.taille_max,
+                    "en_cours": self.en_cours, "max_en_cours": self.max_en_cours,
+                    "utilisation": round(self.en_cours / self.taille_max, 3),
+                    "emprunts": self.emprunts,
+                    "duree_moyenne_attente_ms": round(1000 * self.duree_attente / self.emprunts, 3) if self.emprunts else 0.0,
+                    "duree_max_attente_ms": round(1000 * self.duree_max_attente, 3),
+                    "reconnexions": self.reconnexions}
 
-    @property
-    def connection(self):
+    def fermer(self):
         """
-        Retourne la connexion ouverte à la base de données.
+        Ferme toutes les connexions du pool.
         """
-        return self.__connection
+        self.__pool.closeall()
@@ -2,7 +2,10 @@ from dao.db_connection import DBConnection
 from dao.cles_api_dao import ClesAPIDao
 from business_object.info_video import InfoVideo
 from utils.singleton import Singleton
-from datetime import datetime
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Iterator
+from psycopg2.extras import execute_values
 
 
 class HistoriqueConsommateurDao(metaclass = Singleton):
@@ -11,9 +14,18 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
 
     Methods
     -------
+    dates_requete(nombre) -> list[datetime]
+        Fournit des dates de requête strictement croissantes dans le processus.
+
     creer(donnee, empreinte, cle_api) -> bool
         Enregistre une estimation dans la base de données.
 
+    creer_lot(estimations, cle_api) -> int
+        Enregistre un lot d'estimations en une seule requête.
+
+    creer_lignes(lignes) -> int
+        Enregistre des lignes d'historique de plusieurs consommateurs en une seule requête.
+
     trouver_par_id_utilisateur(id_utilisateur) -> list
         Trouve les enregistrements d'historique par l'identifiant utilisateur.
 
@@ -23,15 +35,57 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
     trouver_empreinte_par_cle_api(cle_api) -> list
         Trouve les enregistrements d'empreintes carbone pour une clé API donnée.
 
+    trouver_totaux_par_cle_api(cle_api) -> dict
+        Trouve le nombre de requêtes et la somme des empreintes carbone pour une clé API donnée.
+
     trouver_tout() -> list
         Récupère tous les enregistrements d'historique des consommateurs de VOD.
 
+    trouver_page(cle_api, id_utilisateur, apres, limite, date_debut, date_fin) -> list
+        Récupère une page d'enregistrements d'historique, triés par date de requête.
+
+    parcourir(cle_api, id_utilisateur, date_debut, date_fin, taille_lot) -> Iterator[dict]
+        Parcourt les enregistrements d'historique à l'aide d'un curseur côté serveur.
+
     supprimer(cle_api) -> bool
         Supprime des enregistrements d'historique associés à une clé API.
 
     supprimer_tout() -> bool
         Supprime tous les enregistrements d'historique des consommateurs de VOD.
+
+    creer_partitions(debut, fin) -> int
+        Crée les partitions mensuelles manquantes de l'historique entre deux dates.
+
+    purger(avant) -> int
+        Supprime l'historique antérieur à une date en supprimant les partitions entières.
     """
+    def __init__(self):
+        self._verrou_dates = Lock()
+        self._derniere_date = datetime.min
+
+    def dates_requete(self, nombre: int = 1) -> list[datetime]:
+        """
+        Fournit des dates de requête strictement croissantes dans le processus, à partir de la date actuelle.
+        Toutes les écritures de l'historique (simulation, lot, tampon) tirent leurs dates de ce générateur :
+        deux lignes d'une même clé API ne peuvent donc pas entrer en conflit sur la clé primaire (cle_api, date_requete).
+
+        Parameters
+        ----------
+        nombre : int, optional
+            Nombre de dates à fournir, par défaut 1.
+
+        Returns
+        -------
+        list[datetime]
+            Dates espacées d'au moins une microseconde, postérieures à toutes les dates déjà fournies.
+        """
+        with self._verrou_dates:
+            debut = max(datetime.now(), self._derniere_date + timedelta(microseconds = 1))
+            dates = [debut + timedelta(microseconds = i) for i in range(nombre)]
+            if dates:
+                self._derniere_date = dates[-1]
+        return dates
+
     def creer(self, donnees: InfoVideo, empreinte: float, cle_api: str) -> bool:
         """
         Crée une estimation dans la base de données.
@@ -51,10 +105,10 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
             True si la création est un succès, False sinon.
         """
         res = None
-        date_requete = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        date_requete = self.dates_requete()[0]
         id_utilisateur = ClesAPIDao().trouver_id_par_cle(cle_api)
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "INSERT INTO projet.historique_consommateur(                                                         "
@@ -84,10 +138,88 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
             raise
 
         if res:
-            return cle_api == res["cle_api"] and date_requete == str(res["date_requete"])
+            return cle_api == res["cle_api"] and date_requete == res["date_requete"]
 
         return False
 
+    def creer_lot(self, estimations: list[tuple[InfoVideo, float]], cle_api: str) -> int:
+        """
+        Enregistre un lot d'estimations en une seule requête.
+        Les dates de requête sont fournies par dates_requete pour respecter la clé primaire (cle_api, date_requete).
+
+        Parameters
+        ----------
+        estimations : list[tuple[InfoVideo, float]]
+            Liste de couples (paramètres de visionnage, empreinte carbone associée).
+        cle_api : str
+            Clé API du consommateur de VOD.
+
+        Returns
+        -------
+        int
+            Nombre d'estimations enregistrées.
+
+        Raises
+        ------
+        ValueError
+            Si des estimations n'ont pas été enregistrées (clé API supprimée ou date de requête déjà utilisée).
+        """
+        dates = self.dates_requete(len(estimations))
+        lignes = [(cle_api, date_requete, donnees.duree, donnees.date_visionnage,
+                   donnees.resolution, donnees.type_connexion, donnees.materiel, empreinte,
+                   donnees.localisation.ville, donnees.localisation.pays)
+                  for date_requete, (donnees, empreinte) in zip(dates, estimations)]
+        nb_lignes = self.creer_lignes(lignes)
+        if nb_lignes != len(lignes):
+            raise ValueError("{} estimation(s) du lot non enregistrée(s) dans l'historique".format(len(lignes) - nb_lignes))
+        return nb_lignes
+
+    def creer_lignes(self, lignes: list[tuple]) -> int:
+        """
+        Enregistre des lignes d'historique de plusieurs consommateurs en une seule requête.
+        L'identifiant utilisateur est obtenu par jointure avec la table des clés API : les lignes dont la clé
+        a été supprimée sont ignorées, de même qu'une ligne déjà enregistrée, ce qui rend la requête rejouable.
+
+        Parameters
+        ----------
+        lignes : list[tuple]
+            Tuples (cle_api, date_requete, duree, date_visionnage, resolution, type_connexion, materiel,
+            empreinte_carbone, ville, pays).
+
+        Returns
+        -------
+        int
+            Nombre de lignes enregistrées.
+        """
+        if not lignes:
+            return 0
+
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    res = execute_values(
+                        cursor,
+                        "INSERT INTO projet.historique_consommateur(                                         "
+                        "    id_utilisateur, cle_api, date_requete, duree, date_visionnage,                  "
+                        "    resolution, type_connexion, materiel, empreinte_carbone, ville, pays)           "
+                        "SELECT k.id_utilisateur, v.cle_api, v.date_requete::timestamp, v.duree::int,        "
+                        "       v.date_visionnage::timestamp, v.resolution::int, v.type_connexion::text,     "
+                        "       v.materiel::text, v.empreinte_carbone::real, v.ville::text, v.pays::text     "
+                        "   FROM (VALUES %s) AS v(cle_api, date_requete, duree, date_visionnage, resolution, "
+                        "                         type_connexion, materiel, empreinte_carbone, ville, pays)  "
+                        "   JOIN projet.table_cles_api k ON k.cle_api = v.cle_api                            "
+                        "ON CONFLICT (cle_api, date_requete) DO NOTHING                                      "
+                        "RETURNING cle_api;                                                                  ",
+                        lignes,
+                        page_size = 1000,
+                        fetch = True,
+                    )
+        except Exception as e:
+            print(e)
+            raise
+
+        return len(res)
+
     def trouver_par_id_utilisateur(self, id_utilisateur: int) -> list:
         """
         Trouve les enregistrements d'historique par l'identifiant utilisateur.
@@ -103,7 +235,7 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
             Liste des enregistrements d'historique de consommation trouvés.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "SELECT *                                           "
@@ -138,7 +270,7 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
             Liste des enregistrements d'historique de consommation trouvés.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "SELECT date_requete, duree, date_visionnage, resolution, type_connexion, "
@@ -174,7 +306,7 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
             Liste des empreintes carbone trouvées.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "SELECT empreinte_carbone              "
@@ -193,6 +325,40 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
 
         return list_empreinte
 
+    def trouver_totaux_par_cle_api(self, cle_api: str) -> dict:
+        """
+        Trouve le nombre de requêtes et la somme des empreintes carbone enregistrées pour une clé API,
+        dans la table projet.totaux_consommateur tenue à jour par trigger.
+
+        Parameters
+        ----------
+        cle_api : str
+            Clé API du consommateur de VOD.
+
+        Returns
+        -------
+        dict
+            Nombre de requêtes (nb_requetes) et somme des empreintes carbone (somme_empreinte).
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT nb_requetes, somme_empreinte   "
+                        "   FROM projet.totaux_consommateur    "
+                        "   WHERE cle_api = %(cle_api)s;       ",
+                        {"cle_api": cle_api},
+                    )
+                    res = cursor.fetchone()
+        except Exception as e:
+            print(e)
+            raise
+
+        if res:
+            return {"nb_requetes": res["nb_requetes"], "somme_empreinte": res["somme_empreinte"]}
+
+        return {"nb_requetes": 0, "somme_empreinte": 0}
+
     def trouver_tout(self) -> list:
         """
         Récupère tous les enregistrements d'historique.
@@ -203,7 +369,7 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
             Liste de tous les enregistrements d'historique des consommateurs de VOD.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "SELECT *                               "
@@ -221,6 +387,119 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
 
         return requetes
 
+    @staticmethod
+    def _filtres(cle_api: str | None, id_utilisateur: int | None,
+                 date_debut: datetime | None, date_fin: datetime | None) -> tuple[list[str], dict]:
+        """
+        Construit la clause WHERE et les paramètres communs aux lectures paginées et parcourues.
+        """
+        conditions = []
+        if cle_api is not None:
+            conditions.append("cle_api = %(cle_api)s")
+        if id_utilisateur is not None:
+            conditions.append("id_utilisateur = %(id_utilisateur)s")
+        if date_debut is not None:
+            conditions.append("date_requete >= %(date_debut)s")
+        if date_fin is not None:
+            conditions.append("date_requete < %(date_fin)s")
+        parametres = {"cle_api": cle_api, "id_utilisateur": id_utilisateur,
+                      "date_debut": date_debut, "date_fin": date_fin}
+        return conditions, parametres
+
+    def trouver_page(self, cle_api: str | None = None, id_utilisateur: int | None = None,
+                     apres: tuple[datetime, str] | None = None, limite: int = 1000,
+                     date_debut: datetime | None = None, date_fin: datetime | None = None) -> list:
+        """
+        Récupère une page d'enregistrements d'historique, triés par date de requête puis clé API.
+        La page suivante commence après le dernier enregistrement de la précédente (pagination par clé),
+        ce qui évite de relire les pages déjà parcourues.
+
+        Parameters
+        ----------
+        cle_api : str | None, optional
+            Clé API du consommateur de VOD, tous les consommateurs si None.
+        id_utilisateur : int | None, optional
+            Identifiant de l'utilisateur, tous les utilisateurs si None.
+        apres : tuple[datetime, str] | None, optional
+            Date de requête et clé API du dernier enregistrement de la page précédente.
+        limite : int, optional
+            Nombre maximal d'enregistrements de la page, par défaut 1000.
+        date_debut : datetime | None, optional
+            Date de requête minimale (incluse).
+        date_fin : datetime | None, optional
+            Date de requête maximale (exclue).
+
+        Returns
+        -------
+        list
+            Liste des enregistrements d'historique de la page.
+        """
+        conditions, parametres = self._filtres(cle_api, id_utilisateur, date_debut, date_fin)
+        if apres is not None:
+            conditions.append("(date_requete, cle_api) > (%(apres_date)s, %(apres_cle)s)")
+            parametres["apres_date"], parametres["apres_cle"] = apres
+        parametres["limite"] = limite
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT *                                       "
+                        "   FROM projet.historique_consommateur         "
+                        + (" WHERE " + " AND ".join(conditions) if conditions else "") +
+                        "   ORDER BY date_requete, cle_api              "
+                        "   LIMIT %(limite)s;                           ",
+                        parametres,
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            print(e)
+            raise
+
+        return list(res)
+
+    def parcourir(self, cle_api: str | None = None, id_utilisateur: int | None = None,
+                  date_debut: datetime | None = None, date_fin: datetime | None = None,
+                  taille_lot: int = 1000) -> Iterator[dict]:
+        """
+        Parcourt les enregistrements d'historique, triés par date de requête, à l'aide d'un curseur côté serveur :
+        seuls taille_lot enregistrements sont en mémoire à la fois.
+
+        Parameters
+        ----------
+        cle_api : str | None, optional
+            Clé API du consommateur de VOD, tous les consommateurs si None.
+        id_utilisateur : int | None, optional
+            Identifiant de l'utilisateur, tous les utilisateurs si None.
+        date_debut : datetime | None, optional
+            Date de requête minimale (incluse).
+        date_fin : datetime | None, optional
+            Date de requête maximale (exclue).
+        taille_lot : int, optional
+            Nombre d'enregistrements lus à chaque aller-retour avec la base, par défaut 1000.
+
+        Yields
+        ------
+        dict
+            Enregistrement d'historique.
+        """
+        conditions, parametres = self._filtres(cle_api, id_utilisateur, date_debut, date_fin)
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor(name = "parcours_historique") as cursor:
+                    cursor.itersize = taille_lot
+                    cursor.execute(
+                        "SELECT *                                       "
+                        "   FROM projet.historique_consommateur         "
+                        + (" WHERE " + " AND ".join(conditions) if conditions else "") +
+                        "   ORDER BY date_requete, cle_api;             ",
+                        parametres,
+                    )
+                    for row in cursor:
+                        yield row
+        except Exception as e:
+            print(e)
+            raise
+
     def supprimer(self, cle_api: str) -> bool:
         """
         Supprime les enregistrements d'historique d'une clé API.
@@ -236,7 +515,7 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
             True si la suppression est un succès, False sinon.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         "DELETE FROM projet.historique_consommateur"
@@ -253,6 +532,8 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
     def supprimer_tout(self) -> bool:
         """
         Supprime tous les enregistrements d'historique.
+        Les partitions et les agrégats quotidiens sont vidés par TRUNCATE plutôt que ligne à ligne ;
+        les triggers n'étant pas déclenchés, les totaux par clé API sont supprimés dans la même transaction.
 
         Returns
         -------
@@ -260,15 +541,80 @@ class HistoriqueConsommateurDao(metaclass = Singleton):
             True si la suppression est un succès, False sinon.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
-                        "DELETE FROM projet.historique_consommateur;"
+                        "LOCK TABLE projet.historique_consommateur IN ACCESS EXCLUSIVE MODE;      "
+                        "SELECT EXISTS (SELECT 1 FROM projet.historique_consommateur) AS existe;  "
+                    )
+                    res = cursor.fetchone()["existe"]
+                    cursor.execute(
+                        "TRUNCATE projet.historique_consommateur, projet.agregats_consommateur_jour;  "
+                        "DELETE FROM projet.totaux_consommateur;                                     "
                     )
-                    res = cursor.rowcount
         except Exception as e:
             print(e)
             raise
 
-        return res > 0
- 
\ No newline at end of file
+        return res
+
+    def creer_partitions(self, debut: datetime, fin: datetime) -> int:
+        """
+        Crée les partitions mensuelles manquantes de l'historique entre deux dates (mois inclus).
+        Les lignes de ces mois déjà reçues par la partition par défaut y sont déplacées.
+
+        Parameters
+        ----------
+        debut : datetime
+            Date du premier mois.
+        fin : datetime
+            Date du dernier mois.
+
+        Returns
+        -------
+        int
+            Nombre de partitions créées.
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT projet.creer_partitions_historique(%(debut)s, %(fin)s) AS nb;",
+                        {"debut": debut.date(), "fin": fin.date()},
+                    )
+                    res = cursor.fetchone()
+        except Exception as e:
+            print(e)
+            raise
+
+        return res["nb"]
+
+    def purger(self, avant: datetime) -> int:
+        """
+        Supprime l'historique dont la date de requête est antérieure à une date.
+        Les mois entièrement antérieurs sont supprimés partition par partition, sans DELETE ligne à ligne,
+        et les totaux par clé API sont corrigés en conséquence.
+
+        Parameters
+        ----------
+        avant : datetime
+            Date de requête à partir de laquelle l'historique est conservé.
+
+        Returns
+        -------
+        int
+            Nombre d'enregistrements supprimés.
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT projet.purger_historique(%(avant)s) AS nb;",
+                        {"avant": avant},
+                    )
+                    res = cursor.fetchone()
+        except Exception as e:
+            print(e)
+            raise
+
+        return res["nb"]
@@ -1,4 +1,3 @@
-import re
 from dao.db_connection import DBConnection
 from business_object.serveur_cloud import ServeurCloud
 from business_object.zone_geographique import ZoneGeographique
@@ -12,6 +11,9 @@ class ServeurDao(metaclass = Singleton):
     -------
     trouver_par_fournisseur_cloud(fournisseurs) -> list
         Récupère tous les serveurs appartenant aux fournisseurs cloud de la liste dans la base de données.
+
+    trouver_tout() -> list
+        Récupère tous les serveurs de la base de données.
     """
     def trouver_par_fournisseur_cloud(self, fournisseurs: list) -> list:
         """
@@ -28,12 +30,14 @@ class ServeurDao(metaclass = Singleton):
             Liste de tous les serveurs trouvés.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
-                        "SELECT *                                     "
-                        "   FROM projet.regions_fournisseurs_cloud    "
-                        "   WHERE fournisseur = ANY(%(fournisseurs)s);",
+                        "SELECT r.*, ARRAY(SELECT z.zone_em                                    "
+                        "                    FROM projet.serveur_zone z                        "
+                        "                    WHERE z.identifiant = r.identifiant) AS zones_em  "
+                        "   FROM projet.regions_fournisseurs_cloud r                           "
+                        "   WHERE r.fournisseur = ANY(%(fournisseurs)s);                       ",
                         {"fournisseurs": fournisseurs},
                     )
                     res = cursor.fetchall()
@@ -44,19 +48,54 @@ class ServeurDao(metaclass = Singleton):
 
         if res:
             for row in res:
-                localisation = ZoneGeographique(row["ville"])
-                list_serveur = re.findall(r"'(.*?)'", row["zone_disponibilite_em"])
-                serveur = ServeurCloud(
-                    id_serveur = row["identifiant"],
-                    nom = row["nom"],
-                    code_region = row["code_region"],
-                    fournisseur_cloud = row["fournisseur"],
-                    zone_disponibilite = list_serveur,
-                    localisation = localisation)
-                list_serveurs.append(serveur)
+                list_serveurs.append(self._construire_serveur(row))
 
         return list_serveurs
 
+    def trouver_tout(self) -> list:
+        """
+        Récupère tous les serveurs de la base de données.
+
+        Returns
+        -------
+        list
+            Liste de tous les serveurs.
+        """
+        try:
+            with DBConnection().connexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT r.*, ARRAY(SELECT z.zone_em                                    "
+                        "                    FROM projet.serveur_zone z                        "
+                        "                    WHERE z.identifiant = r.identifiant) AS zones_em  "
+                        "   FROM projet.regions_fournisseurs_cloud r;                          ",
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            print(e)
+            raise
+        list_serveurs = []
+
+        if res:
+            for row in res:
+                list_serveurs.append(self._construire_serveur(row))
+
+        return list_serveurs
+
+    def _construire_serveur(self, row: dict) -> ServeurCloud:
+        """
+        Construit un serveur cloud à partir d'une ligne de la table regions_fournisseurs_cloud.
+        """
+        localisation = ZoneGeographique(row["ville"], zone = row.get("zone_em"),
+                                        latitude = row.get("latitude"), longitude = row.get("longitude"))
+        return ServeurCloud(
+            id_serveur = row["identifiant"],
+            nom = row["nom"],
+            code_region = row["code_region"],
+            fournisseur_cloud = row["fournisseur"],
+            zone_disponibilite = row["zones_em"],
+            localisation = localisation)
+
 if __name__ == "__main__":
     X = ServeurDao().trouver_par_fournisseur_cloud(["AWS", "Azure"])
     for i in range(len(X)):
@@ -0,0 +1,181 @@
+import atexit
+import os
+import time
+import dotenv
+from collections import deque
+from threading import Condition, Lock, Thread
+from business_object.info_video import InfoVideo
+from dao.historique_consommateur_dao import HistoriqueConsommateurDao
+from utils.singleton import Singleton
+
+
+class TamponHistoriqueDao(metaclass = Singleton):
+    """
+    Tampon d'écriture différée de l'historique des consommateurs de VOD.
+    Les simulations sont mises en file en mémoire et enregistrées par un thread en requêtes multi-lignes,
+    dès que la file atteint une taille donnée ou à intervalle régulier : la réponse à une simulation
+    n'attend plus l'écriture en base.
+
+    La configuration se fait par les variables d'environnement :
+    - HISTORIQUE_TAMPON_TAILLE : nombre de lignes déclenchant un enregistrement (par défaut 500).
+    - HISTORIQUE_TAMPON_INTERVALLE : délai maximal en secondes avant l'enregistrement d'une ligne (par défaut 1).
+    - HISTORIQUE_TAMPON_MAX : nombre maximal de lignes en mémoire, les suivantes sont perdues (par défaut 100000).
+    - HISTORIQUE_TAMPON_ESSAIS : nombre de tentatives d'un enregistrement avant de le reporter (par défaut 3).
+
+    Methods
+    -------
+    ajouter(donnees, empreinte, cle_api) -> bool
+        Met en file une simulation à enregistrer.
+    vider() -> int
+        Enregistre immédiatement toutes les lignes en file.
+    arreter()
+        Arrête le thread d'enregistrement après avoir vidé la file.
+    statistiques() -> dict
+        Renvoie la profondeur de la file et les compteurs d'enregistrement.
+    """
+    def __init__(self):
+        dotenv.load_dotenv(override = True)
+        self.taille_lot = int(os.environ.get("HISTORIQUE_TAMPON_TAILLE", 500))
+        self.intervalle = float(os.environ.get("HISTORIQUE_TAMPON_INTERVALLE", 1))
+        self.taille_max = int(os.environ.get("HISTORIQUE_TAMPON_MAX", 100000))
+        self.essais = int(os.environ.get("HISTORIQUE_TAMPON_ESSAIS", 3))
+        self._file = deque()
+        self._condition = Condition()
+        # Un seul enregistrement à la fois, pour que vider() rende la main une fois la file réellement en base.
+        self._verrou_ecriture = Lock()
+        self._thread = None
+        self._arret = False
+        self.lignes_ecrites = 0
+        self.lignes_perdues = 0
+        self.lignes_rejetees = 0
+        self.echecs = 0
+        self.vidages = 0
+        self.duree_vidages = 0.0
+        self.duree_max_vidage = 0.0
+        atexit.register(self.arreter)
+
+    def ajouter(self, donnees: InfoVideo, empreinte: float, cle_api: str) -> bool:
+        """
+        Met en file une simulation à enregistrer.
+
+        Parameters
+        ----------
+        donnees : InfoVideo
+            Objet représentant les paramètres de visionnage de la video.
+        empreinte : float
+            Empreinte carbone associée à la consommation.
+        cle_api : str
+            Clé API du consommateur de VOD.
+
+        Returns
+        -------
+        bool
+            True si la ligne est en file, False si la file est pleine et la ligne perdue.
+        """
+        with self._condition:
+            if len(self._file) >= self.taille_max:
+                self.lignes_perdues += 1
+                return False
+            # Dates strictement croissantes, partagées avec les lots, pour respecter la clé primaire (cle_api, date_requete).
+            date_requete = HistoriqueConsommateurDao().dates_requete()[0]
+            self._file.append((cle_api, date_requete, donnees.duree, donnees.date_visionnage, donnees.resolution,
+                               donnees.type_connexion, donnees.materiel, empreinte,
+                               donnees.localisation.ville, donnees.localisation.pays))
+            if self._thread is None and not self._arret:
+                self._thread = Thread(target = self._boucle, name = "tampon-historique", daemon = True)
+                self._thread.start()
+            if len(self._file) >= self.taille_lot:
+                self._condition.notify()
+        return True
+
+    def _boucle(self):
+        while True:
+            with self._condition:
+                if not self._arret and len(self._file) < self.taille_lot:
+                    self._condition.wait(self.intervalle)
+                if self._arret:
+                    return
+            self._enregistrer()
+
+    def _enregistrer(self) -> int:
+        """
+        Enregistre les lignes en file par lots, avec plusieurs tentatives ;
+        un lot toujours en échec est remis en tête de file pour le passage suivant.
+        """
+        ecrites = 0
+        with self._verrou_ecriture:
+            while True:
+                with self._condition:
+                    lot = [self._file.popleft() for _ in range(min(self.taille_lot, len(self._file)))]
+                if not lot:
+                    return ecrites
+                debut = time.perf_counter()
+                for essai in range(self.essais):
+                    try:
+                        nb_lignes = HistoriqueConsommateurDao().creer_lignes(lot)
+                        break
+                    except Exception:
+                        with self._condition:
+                            self.echecs += 1
+                        time.sleep(min(0.1 * 2 ** essai, 2))
+                else:
+                    self._reporter(lot)
+                    return ecrites
+                duree = time.perf_counter() - debut
+                with self._condition:
+                    self.vidages += 1
+                    self.lignes_ecrites += nb_lignes
+                    # Lignes écartées par la base : clé API supprimée entre-temps ou date de requête déjà enregistrée
+                    self.lignes_rejetees += len(lot) - nb_lignes
+                    self.duree_vidages += duree
+                    self.duree_max_vidage = max(self.duree_max_vidage, duree)
+                ecrites += nb_lignes
+
+    def _reporter(self, lot: list):
+        """
+        Remet un lot en échec en tête de file, dans la limite de la taille maximale.
+        """
+        with self._condition:
+            places = max(self.taille_max - len(self._file), 0)
+            self.lignes_perdues += max(len(lot) - places, 0)
+            self._file.extendleft(reversed(lot[:places]))
+
+    def vider(self) -> int:
+        """
+        Enregistre immédiatement toutes les lignes en file, par exemple avant une lecture de l'historique.
+
+        Returns
+        -------
+        int
+            Nombre de lignes enregistrées.
+        """
+        return self._enregistrer()
+
+    def arreter(self):
+        """
+        Arrête le thread d'enregistrement après avoir vidé la file.
+        """
+        with self._condition:
+            self._arret = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout = 5)
+        self.vider()
+
+    def statistiques(self) -> dict:
+        """
+        Renvoie la profondeur de la file et les compteurs d'enregistrement.
+
+        Returns
+        -------
+        dict
+            Profondeur de la file, lignes enregistrées, perdues (file pleine) et rejetées par la base, échecs, nombre d'enregistrements
+            et durées moyenne et maximale d'un enregistrement en millisecondes.
+        """
+        with self._condition:
+            return {"profondeur": len(self._file), "taille_max": self.taille_max,
+                    "lignes_ecrites": self.lignes_ecrites, "lignes_perdues": self.lignes_perdues,
+                    "lignes_rejetees": self.lignes_rejetees,
+                    "echecs": self.echecs, "vidages": self.vidages,
+                    "duree_moyenne_vidage_ms": round(1000 * self.duree_vidages / self.vidages, 3) if self.vidages else 0.0,
+                    "duree_max_vidage_ms": round(1000 * self.duree_max_vidage, 3)}
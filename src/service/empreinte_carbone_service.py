@@ -1,7 +1,12 @@
 from business_object.info_video import InfoVideo
+from business_object.prevision_carbone import PrevisionCarbone
+from business_object.zone_geographique import ZoneGeographique
 from dao.historique_consommateur_dao import HistoriqueConsommateurDao
-from datetime import datetime, timedelta
-from statistics import mean
+from dao.tampon_historique_dao import TamponHistoriqueDao
+from service.moteur_empreinte import MoteurEmpreinte, resolutions, materiels, types_connexion
+from utils.cache_zone import CacheZone
+from datetime import datetime
+import numpy as np
 
 erreur_em = "Non accès aux données provenant de l'API Electricity Map"
 
@@ -14,6 +19,12 @@ class EmpreinteCarboneService:
     empreinte_carbone(donnees, cle_api) -> float:
         Simule l'impact carbone généré par la lecture d'une vidéo en streaming.
 
+    empreinte_carbone_lot(liste_donnees, cle_api) -> list[dict]:
+        Simule l'impact carbone d'un lot de lectures de vidéos en streaming.
+
+    meilleurs_horaires(donnees, nb_resultats, pas) -> dict:
+        Recherche sur l'horizon de la prévision les heures de visionnage à l'empreinte carbone la plus faible.
+
     empreinte_moyenne(cle_api) -> float:
         Calcule la moyenne de l'empreinte carbone du consommateur sur les requêtes depuis la base de données.
 
@@ -36,69 +47,188 @@ class EmpreinteCarboneService:
         float
             Simulation de l'empreinte carbone générée par la lecture d'une vidéo en gCO2eq.
         """
-        dict_resolution = {240: 426 * 240, 360: 640 * 360, 480: 854 * 480,
-                           720: 1280 * 720, 1080:  1920 * 1080, 1440: 2560 * 1440,
-                           2160: 3840 * 2160, 4320: 7680 * 4320}
-        
-        dict_materiel = {"Ordinateur": 3.2e-4, "Mobile": 1.1e-4}
-
-        dict_type_connexion = {"Wifi": 1.52e-10, "Reseau": 8.84e-10, "Cable": 4.29e-10}
-        
-        resolution = donnees.resolution
-        materiel = donnees.materiel
-        type_connexion = donnees.type_connexion
-        date_visionnage = donnees.date_visionnage
-        energie_data_center = 7.2e-11
-        duree = donnees.duree
-    
-        if resolution not in dict_resolution:
+        self._valider(donnees)
+        prevision = donnees.localisation.prevision_carbone()
+        empreinte = self._calculer(donnees, prevision)
+
+        # Enregistrement différé : la réponse n'attend pas l'écriture dans l'historique.
+        TamponHistoriqueDao().ajouter(donnees, empreinte, cle_api)
+
+        return empreinte
+
+    def empreinte_carbone_lot(self, liste_donnees: list[InfoVideo], cle_api: str) -> list[dict]:
+        """ 
+        Simule l'impact carbone d'un lot de lectures de vidéos en streaming.
+        Les lectures sont regroupées par localisation : la zone et la prévision de chaque localisation ne sont obtenues
+        qu'une fois, et les simulations réussies sont enregistrées dans l'historique en une seule requête.
+
+        Parameters
+        ----------
+        liste_donnees : list[InfoVideo]
+            Informations des vidéos et les paramètres de leur visualisation.
+        cle_api : str
+            Clé API du consommateur de VOD.
+
+        Returns
+        -------
+        list[dict]
+            Pour chaque lecture, dans l'ordre du lot, un dictionnaire contenant soit l'empreinte carbone en gCO2eq
+            (clé "empreinte_carbone"), soit le message d'erreur (clé "erreur").
+        """
+        resultats = [None] * len(liste_donnees)
+        groupes = {}
+        for i, donnees in enumerate(liste_donnees):
+            try:
+                self._valider(donnees)
+            except ValueError as e:
+                resultats[i] = {"erreur": str(e)}
+                continue
+            cle = CacheZone.cle(donnees.localisation.ville, donnees.localisation.pays)
+            groupes.setdefault(cle, []).append(i)
+
+        previsions = []
+        indices_zone = {}
+        # Indice dans previsions de la prévision de chaque lecture à calculer
+        zone_par_lecture = {}
+        for indices in groupes.values():
+            try:
+                zone = liste_donnees[indices[0]].localisation.name_to_zone()
+                if zone not in indices_zone:
+                    indices_zone[zone] = len(previsions)
+                    previsions.append(ZoneGeographique.prevision_zone(zone))
+            except ValueError as e:
+                for i in indices:
+                    resultats[i] = {"erreur": str(e)}
+                continue
+            for i in indices:
+                zone_par_lecture[i] = indices_zone[zone]
+
+        # Calcul de toutes les empreintes en un seul passage du moteur vectorisé
+        a_calculer = sorted(zone_par_lecture)
+        empreintes = self._calculer_lot([liste_donnees[i] for i in a_calculer],
+                                        [zone_par_lecture[i] for i in a_calculer], previsions)
+        estimations = []
+        for i, empreinte in zip(a_calculer, empreintes):
+            if empreinte is None:
+                resultats[i] = {"erreur": erreur_em}
+            else:
+                resultats[i] = {"empreinte_carbone": empreinte}
+                estimations.append((liste_donnees[i], empreinte))
+
+        HistoriqueConsommateurDao().creer_lot(estimations, cle_api)
+
+        return resultats
+
+    def meilleurs_horaires(self, donnees: InfoVideo, nb_resultats: int = 3, pas: int = 15) -> dict:
+        """ 
+        Recherche, de la date de visionnage demandée jusqu'à la fin de la prévision de la zone,
+        les heures de début de visionnage pour lesquelles l'empreinte carbone de la lecture est la plus faible.
+        La fenêtre de visionnage glisse sur toute la prévision : chaque début possible est évalué en temps constant
+        à partir des sommes cumulées de la prévision, sans simulation complète par début.
+        Les simulations ne sont pas enregistrées dans l'historique.
+
+        Parameters
+        ----------
+        donnees : InfoVideo
+            Informations de la vidéo et les paramètres de sa visualisation, la date de visionnage
+            étant le début au plus tôt.
+        nb_resultats : int, optional
+            Nombre de meilleurs débuts renvoyés, par défaut 3.
+        pas : int, optional
+            Écart en minutes entre deux débuts évalués, par défaut 15.
+
+        Returns
+        -------
+        dict
+            Meilleurs débuts par empreinte croissante (clé "meilleurs") et empreinte de chaque début évalué
+            par ordre chronologique (clé "courbe"), sous forme de dictionnaires (date_visionnage, empreinte_carbone).
+        """
+        self._valider(donnees)
+        if nb_resultats < 1:
+            raise ValueError("Le nombre de résultats doit être strictement positif")
+        if pas < 1:
+            raise ValueError("Le pas doit être d'au moins une minute")
+        prevision = donnees.localisation.prevision_carbone()
+        debuts = prevision.debuts_possibles(donnees.date_visionnage, donnees.duree, pas)
+        if len(debuts) == 0:
+            raise ValueError(erreur_em)
+
+        n = len(debuts)
+        moteur = MoteurEmpreinte.depuis_previsions([prevision])
+        empreintes = moteur.calculer(
+            np.full(n, donnees.duree),
+            np.full(n, resolutions.index(donnees.resolution)),
+            np.full(n, materiels.index(donnees.materiel)),
+            np.full(n, types_connexion.index(donnees.type_connexion)),
+            debuts, np.zeros(n, dtype = np.int64))
+        empreintes = [round(empreinte, 1) for empreinte in empreintes.tolist()]
+
+        dates = debuts.astype("datetime64[s]").tolist()
+        courbe = [{"date_visionnage": date, "empreinte_carbone": empreinte} for date, empreinte in zip(dates, empreintes)]
+        # Tri stable : à empreinte égale, le début le plus proche est préféré.
+        meilleurs = [courbe[i] for i in np.argsort(empreintes, kind = "stable")[:nb_resultats]]
+        return {"meilleurs": meilleurs, "courbe": courbe}
+
+    def _valider(self, donnees: InfoVideo):
+        """ 
+        Vérifie les paramètres de visionnage avant toute requête aux API externes.
+        """
+        if donnees.resolution not in resolutions:
             raise ValueError("Résolution non connu")
 
-        if materiel not in dict_materiel:
+        if donnees.materiel not in materiels:
             raise ValueError("Matériel non connu")
 
-        if type_connexion not in dict_type_connexion:
+        if donnees.type_connexion not in types_connexion:
             raise ValueError("Type de connexion non connu")
 
-        if date_visionnage < datetime.now().replace(minute = 0, second = 0, microsecond = 0):
+        if donnees.date_visionnage < datetime.now().replace(minute = 0, second = 0, microsecond = 0):
             raise ValueError(erreur_em)
 
-        liste_dates_electricity = donnees.localisation.prevision_carbone()
+    def _calculer(self, donnees: InfoVideo, prevision: PrevisionCarbone) -> float:
+        """ 
+        Calcule l'empreinte carbone d'une lecture à partir de la prévision de sa zone.
+        """
+        empreinte = self._calculer_lot([donnees], [0], [prevision])[0]
+        if empreinte is None:
+            raise ValueError(erreur_em)
+        return empreinte
 
-        # 25 images par sec * 60 sec
-        nb_bytes = dict_resolution[resolution] * 25 * 60 * duree
-        # en KWh
-        impact_energie = duree * dict_materiel[materiel] + nb_bytes * (dict_type_connexion[type_connexion] + energie_data_center)
-        # Conversion des chaînes de dates en objets datetime
-        dates = [datetime.strptime(date[0], "%Y-%m-%d %H:%M:%S") for date in liste_dates_electricity]
+    def _calculer_lot(self, liste_donnees: list[InfoVideo], zones: list[int], previsions: list[PrevisionCarbone]) -> list:
+        """ 
+        Calcule avec le moteur vectorisé l'empreinte carbone de lectures déjà validées.
 
-        date_maximale = max(dates)
-        date_fin_visionnage = date_visionnage + timedelta(minutes = duree)
-        if date_fin_visionnage > (date_maximale + timedelta(hours = 1)):
-            raise ValueError(erreur_em)
+        Parameters
+        ----------
+        liste_donnees : list[InfoVideo]
+            Informations des vidéos et les paramètres de leur visualisation.
+        zones : list[int]
+            Indice dans previsions de la prévision de chaque lecture.
+        previsions : list[PrevisionCarbone]
+            Prévisions des zones concernées.
 
-        date_visionnage_arrondie = date_visionnage.replace(minute = 0, second = 0, microsecond = 0)
-        # Recherche de l'indice de la date actuelle arrondie à l'inférieure
-        indice_date_visionnage = next((i for i, date in enumerate(dates) if date == date_visionnage_arrondie), None)
-        l = []
-        ecart_date = (dates[indice_date_visionnage + 1] - date_visionnage).seconds // 60 % 60
-        if date_visionnage == date_visionnage_arrondie:
-            ecart_date = 60
-        while duree > 0:
-            l.append((ecart_date, liste_dates_electricity[indice_date_visionnage][1]))
-            duree = duree - ecart_date
-            ecart_date = min(60, duree)
-            indice_date_visionnage += 1
-        intensite_carbone_moyenne = sum((minutes_par_tranche * impact_conso_elec) / donnees.duree for minutes_par_tranche, impact_conso_elec in l)
-        empreinte = round(impact_energie * intensite_carbone_moyenne, 1)
-
-        HistoriqueConsommateurDao().creer(donnees, empreinte, cle_api)
+        Returns
+        -------
+        list
+            Empreinte carbone arrondie de chaque lecture en gCO2eq, None si la prévision ne couvre pas le visionnage.
+        """
+        if not liste_donnees:
+            return []
+        moteur = MoteurEmpreinte.depuis_previsions(previsions)
+        empreintes = moteur.calculer(
+            [donnees.duree for donnees in liste_donnees],
+            MoteurEmpreinte.coder((donnees.resolution for donnees in liste_donnees), resolutions),
+            MoteurEmpreinte.coder((donnees.materiel for donnees in liste_donnees), materiels),
+            MoteurEmpreinte.coder((donnees.type_connexion for donnees in liste_donnees), types_connexion),
+            MoteurEmpreinte.secondes(donnees.date_visionnage for donnees in liste_donnees),
+            zones)
+        # round de Python plutôt que np.round pour conserver les arrondis des empreintes déjà enregistrées.
+        return [None if empreinte != empreinte else round(empreinte, 1) for empreinte in empreintes.tolist()]
 
-        return empreinte
-        
     def empreinte_moyenne(self, cle_api: str) -> float:
         """ 
         Calcule la moyenne de l'empreinte carbone du consommateur sur les requêtes depuis la base de données.
+        La moyenne est obtenue à partir des totaux tenus à jour en base, quelle que soit la taille de l'historique.
 
         Parameters
         ----------
@@ -110,14 +240,16 @@ class EmpreinteCarboneService:
         float
             Moyenne de l'empreinte carbone du consommateur de VOD en gCO2eq.
         """
-        l = HistoriqueConsommateurDao().trouver_empreinte_par_cle_api(cle_api) 
-        if len(l) == 0:
+        TamponHistoriqueDao().vider()
+        totaux = HistoriqueConsommateurDao().trouver_totaux_par_cle_api(cle_api)
+        if totaux["nb_requetes"] == 0:
             return 0
-        return mean(l)
+        return totaux["somme_empreinte"] / totaux["nb_requetes"]
 
     def empreinte_total(self, cle_api: str) -> float:
         """ 
         Calcule le total de l'empreinte carbone du consommateur sur les requêtes depuis la base de données.
+        Le total est lu dans les totaux tenus à jour en base, quelle que soit la taille de l'historique.
 
         Parameters
         ----------
@@ -129,8 +261,8 @@ class EmpreinteCarboneService:
         float
             Total de l'empreinte carbone du consommateur de VOD en gCO2eq.
         """
-        l = HistoriqueConsommateurDao().trouver_empreinte_par_cle_api(cle_api) 
-        return sum(l)
+        TamponHistoriqueDao().vider()
+        return HistoriqueConsommateurDao().trouver_totaux_par_cle_api(cle_api)["somme_empreinte"]
 
 
 if __name__ == "__main__":
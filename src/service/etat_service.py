@@ -1,13 +1,17 @@
 import os
-from dotenv import load_dotenv
 import requests
+from datetime import datetime
+from threading import Event, Lock, Thread
+from dotenv import load_dotenv
+from utils.session_http import SessionHttp
+from utils.singleton import Singleton
 
 load_dotenv()
 token_em = os.environ.get('token_em')
 headers = {'auth-token': token_em}
 
-url_etat_electricity_map = "https://api.electricitymap.org/health"
-url_etat_nominatim_openstreetmap = "https://nominatim.openstreetmap.org/status"
+url_etat_electricity_map = os.environ.get('ELECTRICITY_MAP_URL', "https://api.electricitymap.org").rstrip('/') + "/health"
+url_etat_nominatim_openstreetmap = os.environ.get('NOMINATIM_URL', "https://nominatim.openstreetmap.org").rstrip('/') + "/status"
 
 class EtatService:
     """
@@ -27,9 +31,12 @@ class EtatService:
         Returns
         -------
         bool
-            True si l'accès à l'API est réussi, False sinon.
+            True si l'accès à l'API est réussi, False sinon (y compris en cas d'erreur réseau).
         """
-        response = requests.get(url_etat_electricity_map, headers = headers, timeout = 60)
+        try:
+            response = SessionHttp().get(url_etat_electricity_map, headers = headers, timeout = 60)
+        except requests.RequestException:
+            return False
         if response.status_code == 200:
             return True
         return False
@@ -41,13 +48,116 @@ class EtatService:
         Returns
         -------
         bool
-            True si l'accès à l'API est réussi, False sinon.
+            True si l'accès à l'API est réussi, False sinon (y compris en cas d'erreur réseau).
         """
-        response = requests.get(url_etat_nominatim_openstreetmap, timeout = 90)
+        try:
+            response = SessionHttp().get(url_etat_nominatim_openstreetmap, timeout = 90)
+        except requests.RequestException:
+            return False
         if response.status_code == 200:
             return True
         return False
 
+class MoniteurEtat(metaclass = Singleton):
+    """
+    Surveille en tâche de fond l'accès aux APIs externes et conserve le dernier état connu,
+    afin que les endpoints le consultent sans appel réseau.
+
+    L'intervalle entre deux vérifications se configure par la variable d'environnement
+    ETAT_INTERVALLE en secondes (par défaut 60).
+    Tant qu'aucune vérification n'a abouti, une API est considérée comme accessible.
+
+    Methods
+    -------
+    demarrer()
+        Lance la surveillance périodique dans un thread.
+    arreter()
+        Arrête la surveillance.
+    verifier()
+        Vérifie immédiatement l'accès à chaque API.
+    disponible(api) -> bool
+        Indique si la dernière vérification de l'API a réussi.
+    etat() -> dict
+        Renvoie l'état de chaque API avec les dates de dernière vérification et de dernier succès.
+    """
+    apis = {"electricity_map": "lien_api_electricity_map",
+            "nominatim_openstreetmap": "lien_api_nominatim_openstreetmap"}
+
+    def __init__(self):
+        load_dotenv(override = True)
+        self.intervalle = float(os.environ.get("ETAT_INTERVALLE", 60))
+        self._verrou = Lock()
+        self._arret = Event()
+        self._thread = None
+        self._etat = {api: {"disponible": None, "derniere_verification": None, "dernier_succes": None}
+                      for api in self.apis}
+
+    def demarrer(self):
+        """
+        Lance la surveillance périodique dans un thread, si elle n'est pas déjà en cours.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._arret.clear()
+        self._thread = Thread(target = self._surveiller, name = "moniteur-etat", daemon = True)
+        self._thread.start()
+
+    def arreter(self):
+        """
+        Arrête la surveillance.
+        """
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join(timeout = 1)
+            self._thread = None
+
+    def _surveiller(self):
+        while not self._arret.is_set():
+            self.verifier()
+            self._arret.wait(self.intervalle)
+
+    def verifier(self):
+        """
+        Vérifie immédiatement l'accès à chaque API et met à jour l'état conservé.
+        """
+        for api, methode in self.apis.items():
+            disponible = getattr(EtatService(), methode)()
+            maintenant = datetime.now()
+            with self._verrou:
+                etat = dict(self._etat[api], disponible = disponible, derniere_verification = maintenant)
+                if disponible:
+                    etat["dernier_succes"] = maintenant
+                self._etat[api] = etat
+
+    def disponible(self, api: str) -> bool:
+        """
+        Indique si la dernière vérification de l'API a réussi.
+
+        Parameters
+        ----------
+        api : str
+            Nom de l'API.
+            Possible values: "electricity_map", "nominatim_openstreetmap".
+
+        Returns
+        -------
+        bool
+            False si la dernière vérification a échoué, True sinon.
+        """
+        return self._etat[api]["disponible"] is not False
+
+    def etat(self) -> dict:
+        """
+        Renvoie l'état de chaque API avec les dates de dernière vérification et de dernier succès.
+
+        Returns
+        -------
+        dict
+            Dictionnaire associant à chaque API son état.
+        """
+        with self._verrou:
+            return {api: dict(etat) for api, etat in self._etat.items()}
+
 if __name__ == "__main__":
     X = EtatService()
     print(X.lien_api_electricity_map())
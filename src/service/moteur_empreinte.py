@@ -0,0 +1,132 @@
+import numpy as np
+from business_object.prevision_carbone import PrevisionCarbone, epoch
+
+# Codes acceptés pour chaque paramètre de visionnage, dans l'ordre des tableaux de coefficients.
+resolutions = (240, 360, 480, 720, 1080, 1440, 2160, 4320)
+materiels = ("Ordinateur", "Mobile")
+types_connexion = ("Wifi", "Reseau", "Cable")
+
+# Nombre de pixels par résolution
+coefficients_resolution = np.array([426 * 240, 640 * 360, 854 * 480, 1280 * 720, 1920 * 1080,
+                                    2560 * 1440, 3840 * 2160, 7680 * 4320], dtype = np.float64)
+# Consommation du matériel en kWh par minute
+coefficients_materiel = np.array([3.2e-4, 1.1e-4])
+# Consommation du réseau en kWh par octet
+coefficients_connexion = np.array([1.52e-10, 8.84e-10, 4.29e-10])
+
+energie_data_center = 7.2e-11
+
+
+class MoteurEmpreinte:
+    """
+    Moteur de calcul vectorisé de l'empreinte carbone d'un ensemble de visionnages.
+    L'intensité carbone moyenne de chaque fenêtre de visionnage est obtenue en temps constant
+    par la prévision de sa zone (PrevisionCarbone), zone par zone et sans boucle sur les visionnages.
+
+    Attributes
+    ----------
+    previsions : list[PrevisionCarbone]
+        Prévision de chaque zone, l'indice de zone étant sa position dans la liste.
+
+    Methods
+    -------
+    depuis_previsions(previsions) -> MoteurEmpreinte
+        Construit le moteur à partir des prévisions des zones.
+    coder(valeurs, reference) -> np.ndarray
+        Convertit des valeurs de paramètres en indices dans les tableaux de coefficients.
+    secondes(dates) -> np.ndarray
+        Convertit des dates en secondes depuis l'epoch.
+    calculer(duree, resolution, materiel, type_connexion, debut, zone) -> np.ndarray
+        Calcule l'empreinte carbone non arrondie de chaque visionnage.
+    """
+    def __init__(self, previsions: list[PrevisionCarbone]):
+        self.previsions = list(previsions)
+
+    @classmethod
+    def depuis_previsions(cls, previsions: list[PrevisionCarbone]) -> "MoteurEmpreinte":
+        """
+        Construit le moteur à partir des prévisions des zones.
+
+        Parameters
+        ----------
+        previsions : list[PrevisionCarbone]
+            Prévision de chaque zone.
+
+        Returns
+        -------
+        MoteurEmpreinte
+            Moteur dont l'indice de zone est la position de la prévision dans la liste.
+        """
+        return cls(previsions)
+
+    @staticmethod
+    def coder(valeurs, reference: tuple) -> np.ndarray:
+        """
+        Convertit des valeurs de paramètres en indices dans les tableaux de coefficients.
+
+        Parameters
+        ----------
+        valeurs : iterable
+            Valeurs de résolution, de matériel ou de type de connexion.
+        reference : tuple
+            Valeurs acceptées (resolutions, materiels ou types_connexion).
+
+        Returns
+        -------
+        np.ndarray
+            Indices des valeurs, -1 pour une valeur inconnue.
+        """
+        indices = {valeur: i for i, valeur in enumerate(reference)}
+        return np.fromiter((indices.get(valeur, -1) for valeur in valeurs), dtype = np.int64)
+
+    @staticmethod
+    def secondes(dates) -> np.ndarray:
+        """
+        Convertit des dates (datetime naïves) en secondes depuis l'epoch.
+        """
+        return np.fromiter(((date - epoch).total_seconds() for date in dates), dtype = np.float64)
+
+    def calculer(self, duree: np.ndarray, resolution: np.ndarray, materiel: np.ndarray,
+                 type_connexion: np.ndarray, debut: np.ndarray, zone: np.ndarray) -> np.ndarray:
+        """
+        Calcule l'empreinte carbone non arrondie de chaque visionnage.
+
+        Parameters
+        ----------
+        duree : np.ndarray
+            Durées de visionnage en minutes.
+        resolution : np.ndarray
+            Indices des résolutions (voir coder).
+        materiel : np.ndarray
+            Indices des matériels.
+        type_connexion : np.ndarray
+            Indices des types de connexion.
+        debut : np.ndarray
+            Dates de visionnage en secondes depuis l'epoch.
+        zone : np.ndarray
+            Indices des zones dans les prévisions du moteur.
+
+        Returns
+        -------
+        np.ndarray
+            Empreintes carbone en gCO2eq, NaN lorsque la prévision ne couvre pas la fenêtre de visionnage.
+            Les codes de paramètres doivent avoir été validés au préalable.
+        """
+        duree = np.asarray(duree, dtype = np.int64)
+        debut = np.asarray(debut, dtype = np.float64)
+        zone = np.asarray(zone, dtype = np.int64)
+
+        # 25 images par sec * 60 sec
+        nb_bytes = coefficients_resolution[resolution] * 25 * 60 * duree
+        # en KWh
+        impact_energie = (duree * coefficients_materiel[materiel]
+                          + nb_bytes * (coefficients_connexion[type_connexion] + energie_data_center))
+
+        # Les visionnages sont regroupés par zone : une seule évaluation vectorisée par prévision.
+        intensite = np.empty(len(duree))
+        ordre = np.argsort(zone, kind = "stable")
+        zones, bornes = np.unique(zone[ordre], return_index = True)
+        for z, indices in zip(zones, np.split(ordre, bornes[1:])):
+            intensite[indices] = self.previsions[z].moyennes(debut[indices], duree[indices])
+
+        return np.where(duree > 0, impact_energie * intensite, 0.0)
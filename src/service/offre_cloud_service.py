@@ -1,7 +1,10 @@
+import math
+from business_object.prevision_carbone import PrevisionCarbone
 from business_object.zone_geographique import ZoneGeographique
 from business_object.serveur_cloud import ServeurCloud
-from service.table.serveurs_service import ServeursService
-from datetime import datetime, timedelta
+from service.optimiseur_horaires import OptimiseurHoraires
+from utils.index_serveurs import IndexServeurs
+from datetime import datetime
 
 erreur_geo = "Non reconnaissance de votre position géographique"
 erreur_em = "Non accès aux données provenant de l'API Electricity Map"
@@ -17,6 +20,9 @@ class OffreCloudService:
 
     serveurs_optimaux(fournisseurs_cloud, localisation, duree, date_visionnage) -> dict:
         Associe le serveur cloud à l'impact de la consommation électrique en gCO2eq/kWh prévisionnelllement à la durée de la vidéo.
+
+    serveurs_horaires_optimaux(localisation, duree, date_visionnage, nb_resultats, capacite, pas, fournisseurs_cloud) -> list[dict]:
+        Sélectionne conjointement les serveurs et les heures de début de visionnage à l'impact le plus faible.
     """
     def serveurs_eligibles(self, localisation: ZoneGeographique, 
                             fournisseurs_cloud: list[str] = ["AWS", "GCP", "Azure"]) -> list[ServeurCloud]:
@@ -35,13 +41,8 @@ class OffreCloudService:
         list[ServeurCloud]
             Liste de serveurs dont leur zone de disponibilité comprend la localisation géographique du consommateur de VOD.
         """
-        serveurs_eligibles = []
         zone = localisation.name_to_zone()
-        for x in ServeursService().voir(fournisseurs_cloud):
-            zone_accessible = x.zone_disponibilite
-            if zone in zone_accessible:
-                serveurs_eligibles.append(x)
-        return serveurs_eligibles
+        return IndexServeurs().serveurs_eligibles(zone, fournisseurs_cloud)
 
     def serveurs_optimaux(self, localisation: ZoneGeographique, duree: int, date_visionnage: datetime = datetime.now(), 
                             fournisseurs_cloud: list[str] = ["AWS", "GCP", "Azure"]) -> dict:
@@ -69,36 +70,110 @@ class OffreCloudService:
             raise ValueError(erreur_em)
 
         serveurs_eligibles = self.serveurs_eligibles(localisation, fournisseurs_cloud)
-        serveurs_intensite = {}
+
+        # Regroupement des serveurs par zone electricity map : plusieurs régions partagent la même zone,
+        # la prévision de chaque zone n'est donc téléchargée et intégrée qu'une seule fois.
+        serveurs_par_zone = {}
         for serveur in serveurs_eligibles:
+            serveurs_par_zone.setdefault(serveur.zone, []).append(serveur)
 
-            liste_dates_electricity = serveur.localisation.prevision_carbone()
-            date_visionnage_arrondie = date_visionnage.replace(minute = 0, second = 0, microsecond = 0)
-            # Conversion des chaînes de dates en objets datetime
-            dates = [datetime.strptime(date[0], "%Y-%m-%d %H:%M:%S") for date in liste_dates_electricity]
-            date_maximale = max(dates)
-            date_fin_visionnage = date_visionnage + timedelta(minutes = duree)
-            if date_fin_visionnage > (date_maximale + timedelta(hours = 1)):
-                raise ValueError(erreur_em)
-            # Recherche de l'indice de la date actuelle arrondie à l'inférieure
-            indice_date_visionnage = next((i for i, date in enumerate(dates) if date == date_visionnage_arrondie), None)
-            
-            l = []
-            ecart_date = (dates[indice_date_visionnage + 1] - date_visionnage).seconds // 60 % 60
-            duree_restante = duree
-            while duree_restante > 0:
-                l.append((ecart_date, liste_dates_electricity[indice_date_visionnage][1]))
-                duree_restante = duree_restante  - ecart_date
-                ecart_date = min(60, duree_restante)
-                indice_date_visionnage += 1
-            intensite_carbone_moyenne = sum((minutes_par_tranche * impact_conso_elec) / duree for minutes_par_tranche, impact_conso_elec in l)
-
-            serveurs_intensite[serveur] = round(intensite_carbone_moyenne, 1)
+        serveurs_intensite = {}
+        for zone, serveurs in serveurs_par_zone.items():
+            prevision = ZoneGeographique.prevision_zone(zone)
+            intensite_carbone_moyenne = self._intensite_moyenne(prevision, date_visionnage, duree)
+            for serveur in serveurs:
+                serveurs_intensite[serveur] = intensite_carbone_moyenne
 
         # Trier le dictionnaire par intensité carbone
         serveurs_tries = dict(sorted(serveurs_intensite.items(), key = lambda item: item[1]))
         return serveurs_tries
 
+    def serveurs_horaires_optimaux(self, localisation: ZoneGeographique, duree: int, date_visionnage: datetime | None = None,
+                                   nb_resultats: int = 10, capacite: int | None = None, pas: int = 60,
+                                   fournisseurs_cloud: list[str] = ["AWS", "GCP", "Azure"]) -> list[dict]:
+        """
+        Sélectionne conjointement les serveurs cloud et les heures de début de visionnage pour lesquels l'impact
+        de la consommation électrique en gCO2eq/kWh est le plus faible sur la durée de la vidéo,
+        de la date de visionnage jusqu'à la fin des prévisions des zones des serveurs.
+
+        Parameters
+        ----------
+        localisation : ZoneGeographique
+            Représente un lieu géographiquement par le biais du nom d’une ville et du pays.
+        duree : int
+            Durée de la vidéo en minutes.
+        date_visionnage : datetime | None, optional
+            Début de visionnage au plus tôt, par défaut la date de l'appel.
+        nb_resultats : int, optional
+            Nombre de couples (serveur, début) renvoyés, par défaut 10.
+        capacite : int | None, optional
+            Nombre maximal de débuts retenus par serveur, None pour ne pas limiter.
+        pas : int, optional
+            Écart en minutes entre deux débuts évalués, par défaut 60.
+        fournisseurs_cloud : list[str], optional
+            Liste des fournisseurs cloud, par défaut tous les fournisseurs.
+
+        Returns
+        -------
+        list[dict]
+            Couples serveur cloud (clé "serveur") et début de visionnage (clé "date_visionnage") associés
+            à l'impact de la consommation électrique en gCO2eq/kWh (clé "impact_carbone"), par ordre croissant.
+        """
+        if date_visionnage is None:
+            date_visionnage = datetime.now()
+        if date_visionnage < datetime.now().replace(minute = 0, second = 0, microsecond = 0):
+            raise ValueError(erreur_em)
+        if nb_resultats < 1:
+            raise ValueError("Le nombre de résultats doit être strictement positif")
+        if capacite is not None and capacite < 1:
+            raise ValueError("La capacité doit être strictement positive")
+        if pas < 1:
+            raise ValueError("Le pas doit être d'au moins une minute")
+
+        serveurs_eligibles = self.serveurs_eligibles(localisation, fournisseurs_cloud)
+
+        # Une seule prévision par zone electricity map, partagée par les serveurs de la zone.
+        previsions = []
+        indices_zone = {}
+        for serveur in serveurs_eligibles:
+            if serveur.zone not in indices_zone:
+                indices_zone[serveur.zone] = len(previsions)
+                previsions.append(ZoneGeographique.prevision_zone(serveur.zone))
+
+        optimiseur = OptimiseurHoraires(previsions)
+        debuts = optimiseur.debuts(date_visionnage, duree, pas)
+        meilleurs = optimiseur.meilleurs([indices_zone[serveur.zone] for serveur in serveurs_eligibles],
+                                         debuts, duree, nb_resultats, capacite)
+        if serveurs_eligibles and not meilleurs:
+            raise ValueError(erreur_em)
+
+        dates = debuts.astype("datetime64[s]").tolist()
+        return [{"serveur": serveurs_eligibles[i], "date_visionnage": dates[j], "impact_carbone": round(intensite, 1)}
+                for i, j, intensite in meilleurs]
+
+    def _intensite_moyenne(self, prevision: PrevisionCarbone, date_visionnage: datetime, duree: int) -> float:
+        """
+        Calcule l'impact moyen de la consommation électrique en gCO2eq/kWh d'une prévision sur la durée du visionnage,
+        en temps constant à partir des sommes cumulées de la prévision.
+
+        Parameters
+        ----------
+        prevision : PrevisionCarbone
+            Prévision de l'impact carbone d'une zone electricity map.
+        date_visionnage : datetime
+            Date de visionnage de la vidéo.
+        duree : int
+            Durée de la vidéo en minutes.
+
+        Returns
+        -------
+        float
+            Impact moyen de la consommation électrique en gCO2eq/kWh, arrondi au dixième.
+        """
+        intensite_carbone_moyenne = prevision.intensite_moyenne(date_visionnage, duree)
+        if math.isnan(intensite_carbone_moyenne):
+            raise ValueError(erreur_em)
+        return round(intensite_carbone_moyenne, 1)
 
 if __name__ == "__main__":
     X = OffreCloudService()
@@ -0,0 +1,117 @@
+import numpy as np
+from datetime import datetime
+from business_object.prevision_carbone import PrevisionCarbone
+
+
+class OptimiseurHoraires:
+    """
+    Optimiseur vectorisé du choix conjoint d'un serveur et d'une heure de début de visionnage.
+    L'intensité carbone moyenne de chaque couple (zone, début) est calculée en une matrice zones x débuts,
+    chaque case en temps constant grâce aux sommes cumulées des prévisions. Les serveurs d'une même zone
+    partageant la même ligne, la sélection se fait par zone avant d'être étendue aux serveurs.
+
+    Attributes
+    ----------
+    previsions : list[PrevisionCarbone]
+        Prévision de chaque zone, l'indice de zone étant sa position dans la liste.
+
+    Methods
+    -------
+    debuts(depuis, duree, pas) -> np.ndarray
+        Débuts de visionnage couverts par au moins une des prévisions.
+    matrice(debuts, duree) -> np.ndarray
+        Intensité carbone moyenne de chaque couple (zone, début).
+    meilleurs(zones, debuts, duree, nb_resultats, capacite) -> list[tuple]
+        Sélectionne les couples (serveur, début) à l'intensité carbone moyenne la plus faible.
+    """
+    def __init__(self, previsions: list[PrevisionCarbone]):
+        self.previsions = list(previsions)
+
+    def debuts(self, depuis: datetime, duree: int, pas: int = 60) -> np.ndarray:
+        """
+        Débuts de visionnage, alignés sur un multiple du pas, dont la fenêtre est couverte par au moins une des prévisions.
+
+        Parameters
+        ----------
+        depuis : datetime
+            Date de visionnage au plus tôt.
+        duree : int
+            Durée de la vidéo en minutes.
+        pas : int, optional
+            Écart en minutes entre deux débuts, par défaut 60.
+
+        Returns
+        -------
+        np.ndarray
+            Dates de début croissantes en secondes depuis l'epoch.
+        """
+        debuts = [prevision.debuts_possibles(depuis, duree, pas) for prevision in self.previsions]
+        if not debuts:
+            return np.empty(0, dtype = np.int64)
+        # Tous les débuts sont des multiples du pas : l'union des débuts de chaque zone reste régulière.
+        return np.unique(np.concatenate(debuts))
+
+    def matrice(self, debuts: np.ndarray, duree: int) -> np.ndarray:
+        """
+        Intensité carbone moyenne de chaque couple (zone, début).
+
+        Parameters
+        ----------
+        debuts : np.ndarray
+            Dates de début en secondes depuis l'epoch.
+        duree : int
+            Durée de la vidéo en minutes.
+
+        Returns
+        -------
+        np.ndarray
+            Matrice zones x débuts des intensités carbone moyennes en gCO2eq/kWh,
+            NaN lorsque la prévision de la zone ne couvre pas la fenêtre.
+        """
+        matrice = np.empty((len(self.previsions), len(debuts)))
+        durees = np.full(len(debuts), duree)
+        for z, prevision in enumerate(self.previsions):
+            matrice[z] = prevision.moyennes(debuts, durees)
+        return matrice
+
+    def meilleurs(self, zones, debuts: np.ndarray, duree: int, nb_resultats: int = 10,
+                  capacite: int | None = None) -> list[tuple]:
+        """
+        Sélectionne les couples (serveur, début) à l'intensité carbone moyenne la plus faible.
+
+        Parameters
+        ----------
+        zones : array-like
+            Indice dans les prévisions de la zone de chaque serveur.
+        debuts : np.ndarray
+            Dates de début en secondes depuis l'epoch.
+        duree : int
+            Durée de la vidéo en minutes.
+        nb_resultats : int, optional
+            Nombre maximal de couples renvoyés, par défaut 10.
+        capacite : int | None, optional
+            Nombre maximal de débuts retenus par serveur, None pour ne pas limiter.
+
+        Returns
+        -------
+        list[tuple]
+            Couples (indice du serveur, indice du début, intensité carbone moyenne) par intensité croissante,
+            puis par début et par serveur à intensité égale. Les couples non couverts par la prévision sont exclus.
+        """
+        zones = np.asarray(zones, dtype = np.int64)
+        nb_par_serveur = min(nb_resultats, capacite or nb_resultats, len(debuts))
+        if len(zones) == 0 or nb_par_serveur <= 0:
+            return []
+
+        # Meilleurs débuts de chaque zone (NaN en dernier), puis extension aux serveurs de la zone.
+        matrice = self.matrice(debuts, duree)
+        ordre_zone = np.argsort(matrice, axis = 1, kind = "stable")[:, :nb_par_serveur]
+        valeurs_zone = np.take_along_axis(matrice, ordre_zone, axis = 1)
+        indices_debut = ordre_zone[zones].ravel()
+        valeurs = valeurs_zone[zones].ravel()
+        indices_serveur = np.repeat(np.arange(len(zones)), nb_par_serveur)
+
+        couverts = ~np.isnan(valeurs)
+        indices_debut, valeurs, indices_serveur = indices_debut[couverts], valeurs[couverts], indices_serveur[couverts]
+        ordre = np.lexsort((indices_serveur, indices_debut, valeurs))[:nb_resultats]
+        return list(zip(indices_serveur[ordre].tolist(), indices_debut[ordre].tolist(), valeurs[ordre].tolist()))
@@ -1,12 +1,17 @@
 from dao.cles_api_dao import ClesAPIDao
 from service.table.abstract_table import AbstractTable
+from utils.cache_cles import CacheCles
 import os
 import secrets
+import time
 import bcrypt
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Sépare le préfixe public du secret dans une clé API ; absent des clés générées par token_urlsafe.
+separateur = "."
+
 class ClesApiService(AbstractTable):
     def voir(self, *args, **kwargs) -> list:
         """
@@ -34,12 +39,18 @@ class ClesApiService(AbstractTable):
             True si la suppression est réussie, False sinon.
         """
         if id_utilisateur:
-                return ClesAPIDao().supprimer(id_utilisateur)
-        return ClesAPIDao().supprimer_tout()
+            resultat = ClesAPIDao().supprimer(id_utilisateur)
+            CacheCles().invalider(id_utilisateur)
+            return resultat
+        resultat = ClesAPIDao().supprimer_tout()
+        CacheCles().invalider()
+        return resultat
 
     def generer_cle_api(self, type_utilisateur: str) -> dict:
         """
         Génère une nouvelle clé API pour un fournisseur ou un consommateur de VOD.
+        La clé est de la forme "prefixe.secret" : le préfixe public permet de retrouver la clé en base
+        et seul le secret est haché.
 
         Parameters
         ----------
@@ -56,20 +67,23 @@ class ClesApiService(AbstractTable):
             raise ValueError("Mauvais utilisateur")
 
         while True:
-            nouvelle_cle = secrets.token_urlsafe(32)
-            cle_hache = bcrypt.hashpw(nouvelle_cle.encode("utf-8"), bcrypt.gensalt())
+            prefixe = secrets.token_hex(8)
+            secret = secrets.token_urlsafe(32)
+            nouvelle_cle = f"{prefixe}{separateur}{secret}"
+            cle_hache = bcrypt.hashpw(secret.encode("utf-8"), bcrypt.gensalt())
 
-            # Vérification de l'unicité de la clé API hachée dans la table
-            if not ClesAPIDao().existe_cle(cle_hache.decode("utf-8")) and nouvelle_cle != (os.environ.get('token_admin')) and cle_hache.decode("utf-8") != (os.environ.get('token_admin')):
+            # Vérification de l'unicité du préfixe et de la clé API hachée dans la table
+            if not ClesAPIDao().existe_prefixe(prefixe) and not ClesAPIDao().existe_cle(cle_hache.decode("utf-8")) and nouvelle_cle != (os.environ.get('token_admin')) and cle_hache.decode("utf-8") != (os.environ.get('token_admin')):
                 break
 
-        result = ClesAPIDao().creer(cle_hache.decode("utf-8"), type_utilisateur)
+        result = ClesAPIDao().creer(cle_hache.decode("utf-8"), type_utilisateur, prefixe)
         result["cle_api"] = nouvelle_cle
         return result
 
     def trouver_cle_api(self, type_utilisateur: str, cle_api: str) -> str:
         """
         Obtient la clé API hachée d'un consommateur ou fournisseur.
+        Une clé déjà vérifiée récemment est servie par le cache CacheCles sans accès à la base ni bcrypt.
 
         Parameters
         ----------
@@ -87,11 +101,79 @@ class ClesApiService(AbstractTable):
         """
         if type_utilisateur not in ["Fournisseur", "Consommateur"]:
             raise ValueError("Mauvais utilisateur")
-            
-        cles_api_haches = ClesAPIDao().trouver_par_type_utilisateur(type_utilisateur)
+
+        cache = CacheCles()
+        verifiee = cache.trouver(type_utilisateur, cle_api)
+        if verifiee is None:
+            # Une suppression de clé pendant la vérification change la génération : le résultat n'est pas mis en cache.
+            generation = cache.generation()
+            debut = time.perf_counter()
+            try:
+                verifiee = self._verifier_cle_api(type_utilisateur, cle_api)
+            finally:
+                cache.mesurer_verification(time.perf_counter() - debut)
+            cache.enregistrer(type_utilisateur, cle_api, verifiee["cle_api"], verifiee["id_utilisateur"], generation)
+        return verifiee["cle_api"]
+
+    def _verifier_cle_api(self, type_utilisateur: str, cle_api: str) -> dict:
+        """
+        Vérifie une clé API auprès de la base de données.
+        Une clé "prefixe.secret" est retrouvée par son préfixe et vérifiée par un seul bcrypt.
+        Les anciennes clés sans préfixe sont comparées aux seules clés non migrées.
+
+        Returns
+        -------
+        dict
+            Clé API hachée (cle_api) et identifiant de l'utilisateur (id_utilisateur).
+        """
+        if separateur in cle_api:
+            prefixe, secret = cle_api.split(separateur, 1)
+            row = ClesAPIDao().trouver_par_prefixe(type_utilisateur, prefixe)
+            if row and bcrypt.checkpw(secret.encode("utf-8"), row["cle_api"].encode("utf-8")):
+                return row
+            raise ValueError("Clé API invalide")
+
+        cles_api_haches = ClesAPIDao().trouver_sans_prefixe(type_utilisateur)
 
         # Vérifiez si la clé API fournie correspond à l'une des clés API hachées
-        for cle_hache in cles_api_haches:
-            if bcrypt.checkpw(cle_api.encode("utf-8"), cle_hache.encode("utf-8")):
-                return cle_hache
+        for row in cles_api_haches:
+            if bcrypt.checkpw(cle_api.encode("utf-8"), row["cle_api"].encode("utf-8")):
+                return row
         raise ValueError("Clé API invalide")
+
+    def migrer_cle_api(self, type_utilisateur: str, cle_api: str) -> str:
+        """
+        Attribue un préfixe public à une clé API créée avant l'introduction des préfixes.
+        Le secret et son hachage sont conservés, l'historique associé à la clé reste donc inchangé.
+
+        Parameters
+        ----------
+        type_utilisateur : str
+            Type de l'utilisateur propriétaire de la clé.
+            Possible values: "Fournisseur", "Consommateur"
+
+        cle_api : str
+            Ancienne clé API, sans préfixe.
+
+        Returns
+        -------
+        str
+            Nouvelle forme "prefixe.secret" de la clé API, à utiliser pour les prochaines requêtes.
+        """
+        if separateur in cle_api:
+            raise ValueError("Clé API déjà migrée")
+
+        if type_utilisateur not in ["Fournisseur", "Consommateur"]:
+            raise ValueError("Mauvais utilisateur")
+
+        verifiee = self._verifier_cle_api(type_utilisateur, cle_api)
+        while True:
+            prefixe = secrets.token_hex(8)
+            if not ClesAPIDao().existe_prefixe(prefixe):
+                break
+
+        if not ClesAPIDao().ajouter_prefixe(verifiee["cle_api"], prefixe):
+            raise ValueError("Clé API déjà migrée")
+        # L'ancienne forme de la clé n'est plus acceptée : elle ne doit plus être servie par le cache.
+        CacheCles().invalider(verifiee["id_utilisateur"])
+        return f"{prefixe}{separateur}{cle_api}"
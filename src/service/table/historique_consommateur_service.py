@@ -1,15 +1,27 @@
+from dao.agregats_consommateur_dao import AgregatsConsommateurDao
 from dao.historique_consommateur_dao import HistoriqueConsommateurDao
+from dao.tampon_historique_dao import TamponHistoriqueDao
 from service.table.abstract_table import AbstractTable
+from utils.singleton import Singleton
+import base64
 import os
+from datetime import date, datetime
+from threading import Event, Thread
+from typing import Iterator
 from dotenv import load_dotenv
 
 # Charge les variables d'environnement depuis le fichier .env
 load_dotenv()
 
+# Sépare la date de requête de la clé API dans un curseur de pagination ; absent des clés hachées par bcrypt.
+separateur_curseur = "|"
+
 class HistoriqueConsommateurService(AbstractTable):
-    def voir(self, cle_api: str, id_utilisateur: int | None = None, *args, **kwargs) -> list:
+    def voir(self, cle_api: str, id_utilisateur: int | None = None, apres: str | None = None, limite: int = 1000,
+             date_debut: datetime | None = None, date_fin: datetime | None = None, *args, **kwargs) -> list:
         """
-        Renvoie la table de l'historique des consommateurs de VOD selon l'utilisateur.
+        Renvoie une page de la table de l'historique des consommateurs de VOD selon l'utilisateur,
+        triée par date de requête.
 
         Parameters
         ----------
@@ -19,16 +31,115 @@ class HistoriqueConsommateurService(AbstractTable):
         id_utilisateur : int | None, optional
             Identifiant d'un utilisateur connu uniquement par l'administrateur.
 
+        apres : str | None, optional
+            Curseur renvoyé par curseur_suivant pour la page précédente, None pour la première page.
+
+        limite : int, optional
+            Nombre maximal d'enregistrements de la page, par défaut 1000.
+
+        date_debut : datetime | None, optional
+            Date de requête minimale (incluse).
+
+        date_fin : datetime | None, optional
+            Date de requête maximale (exclue).
+
         Returns
         -------
         list
-            Table de l'historique des consommateurs si administrateur sinon l'historique d'un consommateur donné.
+            Page de la table de l'historique des consommateurs si administrateur sinon de l'historique d'un consommateur donné.
+        """
+        if limite <= 0:
+            raise ValueError("La limite doit être positive")
+        # Les simulations encore en file d'écriture doivent apparaître dans l'historique.
+        TamponHistoriqueDao().vider()
+        cle_api_filtre, id_utilisateur_filtre = self._portee(cle_api, id_utilisateur)
+        return HistoriqueConsommateurDao().trouver_page(
+            cle_api = cle_api_filtre, id_utilisateur = id_utilisateur_filtre,
+            apres = self.decoder_curseur(apres) if apres else None, limite = limite,
+            date_debut = date_debut, date_fin = date_fin)
+
+    def parcourir(self, cle_api: str, id_utilisateur: int | None = None,
+                  date_debut: datetime | None = None, date_fin: datetime | None = None) -> Iterator[dict]:
+        """
+        Parcourt l'historique des consommateurs de VOD selon l'utilisateur, sans le charger entièrement en mémoire.
+
+        Parameters
+        ----------
+        cle_api : str
+            Clé API pour filtrer les résultats.
+
+        id_utilisateur : int | None, optional
+            Identifiant d'un utilisateur connu uniquement par l'administrateur.
+
+        date_debut : datetime | None, optional
+            Date de requête minimale (incluse).
+
+        date_fin : datetime | None, optional
+            Date de requête maximale (exclue).
+
+        Yields
+        ------
+        dict
+            Enregistrement d'historique.
+        """
+        TamponHistoriqueDao().vider()
+        cle_api_filtre, id_utilisateur_filtre = self._portee(cle_api, id_utilisateur)
+        return HistoriqueConsommateurDao().parcourir(cle_api = cle_api_filtre, id_utilisateur = id_utilisateur_filtre,
+                                                     date_debut = date_debut, date_fin = date_fin)
+
+    @staticmethod
+    def _portee(cle_api: str, id_utilisateur: int | None) -> tuple:
+        """
+        Restreint un consommateur à son historique ; l'administrateur voit tout ou un utilisateur donné.
         """
         if cle_api == (os.environ.get('token_admin')):
-            if id_utilisateur:
-                    return HistoriqueConsommateurDao().trouver_par_id_utilisateur(id_utilisateur)
-            return HistoriqueConsommateurDao().trouver_tout()
-        return HistoriqueConsommateurDao().trouver_par_cle_api(cle_api)
+            return None, id_utilisateur or None
+        return cle_api, None
+
+    @staticmethod
+    def curseur_suivant(page: list, limite: int) -> str | None:
+        """
+        Renvoie le curseur désignant la fin d'une page, None si c'est la dernière.
+
+        Parameters
+        ----------
+        page : list
+            Page renvoyée par voir.
+        limite : int
+            Limite utilisée pour obtenir la page.
+
+        Returns
+        -------
+        str | None
+            Curseur à transmettre comme paramètre apres pour obtenir la page suivante.
+        """
+        if len(page) < limite:
+            return None
+        dernier = page[-1]
+        valeur = f"{dernier['date_requete'].isoformat()}{separateur_curseur}{dernier['cle_api']}"
+        return base64.urlsafe_b64encode(valeur.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decoder_curseur(curseur: str) -> tuple[datetime, str]:
+        """
+        Décode un curseur renvoyé par curseur_suivant.
+
+        Parameters
+        ----------
+        curseur : str
+            Curseur de pagination.
+
+        Returns
+        -------
+        tuple[datetime, str]
+            Date de requête et clé API du dernier enregistrement de la page précédente.
+        """
+        try:
+            valeur = base64.urlsafe_b64decode(curseur.encode("ascii")).decode("utf-8")
+            date_requete, cle_api = valeur.split(separateur_curseur, 1)
+            return datetime.fromisoformat(date_requete), cle_api
+        except (ValueError, UnicodeError):
+            raise ValueError("Curseur de pagination invalide")
 
     def supprimer(self, cle_api: str, *args, **kwargs) -> bool:
         """
@@ -44,6 +155,161 @@ class HistoriqueConsommateurService(AbstractTable):
         bool
             True si la suppression est réussie, False sinon.
         """
+        TamponHistoriqueDao().vider()
         if cle_api == (os.environ.get('token_admin')):
             return HistoriqueConsommateurDao().supprimer_tout()
-        return HistoriqueConsommateurDao().supprimer(cle_api)
\ No newline at end of file
+        historique = HistoriqueConsommateurDao().supprimer(cle_api)
+        # Les agrégats des jours déjà purgés de l'historique détaillé sont supprimés aussi.
+        agregats = AgregatsConsommateurDao().supprimer(cle_api)
+        return historique or agregats
+
+    def agreger(self, cle_api: str, id_utilisateur: int | None = None, periode: str = "jour",
+                date_debut: date | None = None, date_fin: date | None = None) -> list:
+        """
+        Renvoie l'empreinte carbone par jour ou par semaine selon l'utilisateur, lue dans les agrégats
+        quotidiens tenus à jour en base et non dans l'historique détaillé.
+
+        Parameters
+        ----------
+        cle_api : str
+            Clé API pour filtrer les résultats.
+
+        id_utilisateur : int | None, optional
+            Identifiant d'un utilisateur connu uniquement par l'administrateur.
+
+        periode : str, optional
+            "jour" ou "semaine", par défaut "jour".
+
+        date_debut : date | None, optional
+            Premier jour inclus.
+
+        date_fin : date | None, optional
+            Dernier jour exclu.
+
+        Returns
+        -------
+        list
+            Pour chaque période : début, nombre de requêtes, somme, moyenne, minimum et maximum des empreintes,
+            ainsi que le nombre de requêtes et la somme des empreintes par résolution, par matériel
+            et par type de connexion.
+        """
+        if periode not in ("jour", "semaine"):
+            raise ValueError("La période doit être 'jour' ou 'semaine'")
+        TamponHistoriqueDao().vider()
+        cle_api_filtre, id_utilisateur_filtre = self._portee(cle_api, id_utilisateur)
+        lignes = AgregatsConsommateurDao().trouver(cle_api = cle_api_filtre, id_utilisateur = id_utilisateur_filtre,
+                                                   periode = periode, date_debut = date_debut, date_fin = date_fin)
+        periodes = {}
+        for ligne in lignes:
+            agregat = periodes.setdefault(ligne["debut"], {
+                "debut": ligne["debut"], "nb_requetes": 0, "somme_empreinte": 0.0,
+                "min_empreinte": None, "max_empreinte": None,
+                "par_resolution": {}, "par_materiel": {}, "par_type_connexion": {}})
+            agregat["nb_requetes"] += ligne["nb_requetes"]
+            agregat["somme_empreinte"] += ligne["somme_empreinte"]
+            if agregat["min_empreinte"] is None:
+                agregat["min_empreinte"], agregat["max_empreinte"] = ligne["min_empreinte"], ligne["max_empreinte"]
+            elif ligne["min_empreinte"] is not None:
+                agregat["min_empreinte"] = min(agregat["min_empreinte"], ligne["min_empreinte"])
+                agregat["max_empreinte"] = max(agregat["max_empreinte"], ligne["max_empreinte"])
+            for repartition, cle in (("par_resolution", ligne["resolution"]), ("par_materiel", ligne["materiel"]),
+                                     ("par_type_connexion", ligne["type_connexion"])):
+                part = agregat[repartition].setdefault(cle, {"nb_requetes": 0, "somme_empreinte": 0.0})
+                part["nb_requetes"] += ligne["nb_requetes"]
+                part["somme_empreinte"] += ligne["somme_empreinte"]
+        for agregat in periodes.values():
+            agregat["moyenne_empreinte"] = agregat["somme_empreinte"] / agregat["nb_requetes"]
+        return list(periodes.values())
+
+
+class MaintenanceHistorique(metaclass = Singleton):
+    """
+    Entretient en tâche de fond les partitions mensuelles de l'historique des consommateurs de VOD :
+    les partitions des mois à venir sont créées à l'avance et, si une rétention est fixée,
+    les mois trop anciens sont supprimés partition par partition. La reconstitution des agrégats
+    quotidiens de l'historique existant, après la migration qui les introduit, y est également poursuivie.
+
+    La configuration se fait par les variables d'environnement :
+    - HISTORIQUE_PARTITIONS_AVANCE : nombre de mois à venir dont la partition est créée à l'avance (par défaut 3).
+    - HISTORIQUE_RETENTION_MOIS : nombre de mois entiers d'historique conservés en plus du mois en cours,
+      0 pour tout conserver (par défaut 0).
+    - HISTORIQUE_MAINTENANCE_INTERVALLE : intervalle en secondes entre deux entretiens (par défaut 86400).
+
+    Methods
+    -------
+    demarrer()
+        Lance l'entretien périodique dans un thread.
+    arreter()
+        Arrête l'entretien.
+    maintenir() -> dict
+        Crée les partitions à venir et applique la rétention immédiatement.
+    """
+    def __init__(self):
+        load_dotenv(override = True)
+        self.avance = int(os.environ.get("HISTORIQUE_PARTITIONS_AVANCE", 3))
+        self.retention = int(os.environ.get("HISTORIQUE_RETENTION_MOIS", 0))
+        self.intervalle = float(os.environ.get("HISTORIQUE_MAINTENANCE_INTERVALLE", 86400))
+        self._arret = Event()
+        self._thread = None
+
+    def demarrer(self):
+        """
+        Lance l'entretien périodique dans un thread, s'il n'est pas déjà en cours.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._arret.clear()
+        self._thread = Thread(target = self._entretenir, name = "maintenance-historique", daemon = True)
+        self._thread.start()
+
+    def arreter(self):
+        """
+        Arrête l'entretien.
+        """
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join(timeout = 1)
+            self._thread = None
+
+    def _entretenir(self):
+        while not self._arret.is_set():
+            try:
+                self.maintenir()
+            except Exception as e:
+                # La base peut être momentanément indisponible : l'entretien est retenté au passage suivant.
+                print(e)
+            self._arret.wait(self.intervalle)
+
+    def maintenir(self, maintenant: datetime | None = None) -> dict:
+        """
+        Termine la reconstitution des agrégats quotidiens, crée les partitions du mois en cours
+        et des mois à venir, puis supprime l'historique antérieur à la période de rétention.
+
+        Parameters
+        ----------
+        maintenant : datetime | None, optional
+            Date de référence, par défaut la date courante.
+
+        Returns
+        -------
+        dict
+            Nombre de jours d'agrégats reconstitués, de partitions créées et d'enregistrements supprimés.
+        """
+        maintenant = maintenant or datetime.now()
+        # Les agrégats de l'historique existant sont reconstitués avant que la rétention ne le supprime.
+        jours_rattrapes = 0
+        while (lot := AgregatsConsommateurDao().rattraper()) is not None:
+            jours_rattrapes += (lot["fin"] - lot["debut"]).days
+        partitions = HistoriqueConsommateurDao().creer_partitions(maintenant, self._decaler_mois(maintenant, self.avance))
+        supprimees = 0
+        if self.retention > 0:
+            supprimees = HistoriqueConsommateurDao().purger(self._decaler_mois(maintenant, -self.retention))
+        return {"jours_rattrapes": jours_rattrapes, "partitions_creees": partitions, "lignes_supprimees": supprimees}
+
+    @staticmethod
+    def _decaler_mois(date: datetime, nb_mois: int) -> datetime:
+        """
+        Renvoie le premier jour du mois décalé de nb_mois par rapport à celui d'une date.
+        """
+        mois = date.year * 12 + date.month - 1 + nb_mois
+        return datetime(mois // 12, mois % 12 + 1, 1)
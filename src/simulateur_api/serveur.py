@@ -0,0 +1,283 @@
+"""
+Serveur local remplaçant les API Nominatim OpenStreetMap et Electricity Map, pour lancer l'API,
+les tests, les benchmarks et les tests de charge sans accès réseau.
+
+Lancement depuis le dossier src :
+    python -m simulateur_api.serveur --port 8010 --latence 20 --taux-erreur 0.01
+
+puis, dans le .env de l'API :
+    NOMINATIM_URL=http://127.0.0.1:8010
+    ELECTRICITY_MAP_URL=http://127.0.0.1:8010
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import random
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+
+dossier = Path(__file__).resolve().parent
+fichier_regions = dossier.parents[1] / "data" / "zones_regions_fournisseurs-cloud.csv"
+
+
+class ConfigurationSimulateur(BaseModel):
+    """
+    Comportement du simulateur, modifiable pendant son exécution via l'endpoint /simulateur/configuration.
+
+    Attributes
+    ----------
+    latence: float
+        Latence moyenne ajoutée à chaque réponse en millisecondes.
+    gigue: float
+        Écart-type de la latence en millisecondes.
+    taux_erreur: float
+        Proportion des requêtes répondues par une erreur 503, entre 0 et 1.
+    horizon: int
+        Nombre d'heures des prévisions renvoyées.
+    """
+    latence: float = 0
+    gigue: float = 0
+    taux_erreur: float = 0
+    horizon: int = 72
+
+    @classmethod
+    def depuis_environnement(cls) -> "ConfigurationSimulateur":
+        """
+        Lit la configuration dans les variables d'environnement SIMULATEUR_LATENCE, SIMULATEUR_GIGUE,
+        SIMULATEUR_TAUX_ERREUR et SIMULATEUR_HORIZON.
+        """
+        load_dotenv()
+        return cls(latence = float(os.environ.get("SIMULATEUR_LATENCE", 0)),
+                   gigue = float(os.environ.get("SIMULATEUR_GIGUE", 0)),
+                   taux_erreur = float(os.environ.get("SIMULATEUR_TAUX_ERREUR", 0)),
+                   horizon = int(os.environ.get("SIMULATEUR_HORIZON", 72)))
+
+
+class Fixtures:
+    """
+    Données servies par le simulateur : villes géocodées et profils horaires d'intensité carbone enregistrés,
+    positions des régions des fournisseurs cloud pour retrouver la zone d'un point.
+    Les zones sans profil enregistré reçoivent un profil généré, stable d'un lancement à l'autre.
+
+    Methods
+    -------
+    chercher(ville, pays) -> list[dict]
+        Résultats de recherche Nominatim d'une ville.
+    zone(latitude, longitude) -> str
+        Zone electricity map la plus proche d'un point.
+    intensite(zone, date) -> int
+        Intensité carbone d'une zone à une heure donnée.
+    prevision(zone, maintenant, horizon) -> list[dict]
+        Prévision horaire d'une zone au format Electricity Map.
+    """
+    def __init__(self, chemin: Path = dossier / "fixtures.json", chemin_regions: Path = fichier_regions):
+        with open(chemin, encoding = "utf-8") as fichier:
+            donnees = json.load(fichier)
+        self.villes = {}
+        for ville in donnees["villes"]:
+            self.villes.setdefault(ville["ville"].strip().casefold(), []).append(ville)
+        self.profils = donnees["profils"]
+        self.points = [(float(ville["lat"]), float(ville["lon"]), ville["zone"]) for ville in donnees["villes"]]
+        if chemin_regions.exists():
+            with open(chemin_regions, encoding = "utf-8") as fichier:
+                for ligne in csv.DictReader(fichier, delimiter = ";"):
+                    if ligne.get("zone_em"):
+                        self.points.append((float(ligne["latitude"]), float(ligne["longitude"]), ligne["zone_em"]))
+
+    def chercher(self, ville: str, pays: str | None = None) -> list[dict]:
+        """
+        Résultats de recherche Nominatim d'une ville, vides si la ville ou le pays ne sont pas connus.
+        """
+        resultats = self.villes.get(ville.strip().casefold(), [])
+        if pays:
+            pays = pays.strip().casefold()
+            resultats = [resultat for resultat in resultats if pays in (p.casefold() for p in resultat["pays"])]
+        return [{"lat": resultat["lat"], "lon": resultat["lon"], "display_name": f"{resultat['ville']}, {resultat['pays'][0]}"}
+                for resultat in resultats]
+
+    def zone(self, latitude: float, longitude: float) -> str:
+        """
+        Zone electricity map du point connu le plus proche.
+        """
+        return min(self.points, key = lambda point: (point[0] - latitude) ** 2 + (point[1] - longitude) ** 2)[2]
+
+    def intensite(self, zone: str, date: datetime) -> int:
+        """
+        Intensité carbone d'une zone à une heure donnée, en gCO2eq/kWh.
+        """
+        if zone in self.profils:
+            return self.profils[zone][date.hour]
+        graine = zlib.crc32(zone.encode())
+        base = 50 + graine % 500
+        return round(base * (1 + 0.3 * math.sin(2 * math.pi * (date.hour + graine % 24) / 24)))
+
+    def prevision(self, zone: str, maintenant: datetime, horizon: int = 72) -> list[dict]:
+        """
+        Prévision horaire d'une zone au format Electricity Map, à partir de l'heure pleine courante.
+        """
+        debut = maintenant.replace(minute = 0, second = 0, microsecond = 0)
+        dates = [debut + timedelta(hours = h) for h in range(horizon)]
+        return [{"carbonIntensity": self.intensite(zone, date), "datetime": date.strftime("%Y-%m-%dT%H:%M:%S.000Z")}
+                for date in dates]
+
+
+def creer_app(configuration: ConfigurationSimulateur | None = None, fixtures: Fixtures | None = None) -> FastAPI:
+    """
+    Crée l'application du simulateur.
+
+    Parameters
+    ----------
+    configuration : ConfigurationSimulateur | None, optional
+        Latence et erreurs injectées, par défaut lues dans les variables d'environnement.
+    fixtures : Fixtures | None, optional
+        Données servies, par défaut celles du dossier du simulateur.
+
+    Returns
+    -------
+    FastAPI
+        Application répondant aux endpoints /search, /status, /health,
+        /v3/carbon-intensity/latest et /v3/carbon-intensity/forecast.
+    """
+    simulateur = FastAPI(title = "Simulateur Nominatim / Electricity Map")
+    simulateur.state.configuration = configuration or ConfigurationSimulateur.depuis_environnement()
+    simulateur.state.fixtures = fixtures or Fixtures()
+    simulateur.state.compteurs = {"requetes": 0, "erreurs": 0}
+    aleatoire = random.Random(0)
+
+    @simulateur.middleware("http")
+    async def injecter(request: Request, call_next):
+        if request.url.path.startswith("/simulateur"):
+            return await call_next(request)
+        configuration = simulateur.state.configuration
+        simulateur.state.compteurs["requetes"] += 1
+        latence = max(aleatoire.gauss(configuration.latence, configuration.gigue), 0) if configuration.gigue else configuration.latence
+        if latence > 0:
+            await asyncio.sleep(latence / 1000)
+        if aleatoire.random() < configuration.taux_erreur:
+            simulateur.state.compteurs["erreurs"] += 1
+            return JSONResponse({"error": "Erreur injectée par le simulateur"}, status_code = 503)
+        return await call_next(request)
+
+    @simulateur.get("/search")
+    async def chercher(city: str, country: str = None, format: str = "json"):
+        return simulateur.state.fixtures.chercher(city, country)
+
+    @simulateur.get("/status")
+    async def statut_nominatim():
+        return PlainTextResponse("OK")
+
+    @simulateur.get("/health")
+    async def sante_electricity_map():
+        return {"status": "ok", "monitors": {"state": "ok"}}
+
+    @simulateur.get("/v3/carbon-intensity/latest")
+    async def intensite_courante(lat: float = None, lon: float = None, zone: str = None,
+                                 auth_token: str = Header(None)):
+        fixtures = simulateur.state.fixtures
+        if zone is None:
+            if lat is None or lon is None:
+                return JSONResponse({"error": "zone ou lat/lon requis"}, status_code = 400)
+            zone = fixtures.zone(lat, lon)
+        maintenant = datetime.utcnow().replace(minute = 0, second = 0, microsecond = 0)
+        return {"zone": zone, "carbonIntensity": fixtures.intensite(zone, maintenant),
+                "datetime": maintenant.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "updatedAt": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")}
+
+    @simulateur.get("/v3/carbon-intensity/forecast")
+    async def prevision(zone: str, auth_token: str = Header(None)):
+        forecast = simulateur.state.fixtures.prevision(zone, datetime.utcnow(), simulateur.state.configuration.horizon)
+        return {"zone": zone, "forecast": forecast, "updatedAt": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")}
+
+    @simulateur.get("/simulateur/configuration")
+    async def lire_configuration():
+        return {**simulateur.state.configuration.model_dump(), **simulateur.state.compteurs}
+
+    @simulateur.put("/simulateur/configuration")
+    async def modifier_configuration(configuration: ConfigurationSimulateur):
+        simulateur.state.configuration = configuration
+        return configuration
+
+    return simulateur
+
+
+class ServeurSimulateur:
+    """
+    Simulateur lancé dans un thread du processus courant, pour les tests et les benchmarks.
+
+    Methods
+    -------
+    demarrer() -> str
+        Démarre le serveur et renvoie son adresse.
+    arreter()
+        Arrête le serveur.
+    """
+    def __init__(self, configuration: ConfigurationSimulateur | None = None, port: int = 0):
+        self.app = creer_app(configuration or ConfigurationSimulateur())
+        if port == 0:
+            with socket.socket() as s:
+                s.bind(("127.0.0.1", 0))
+                port = s.getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        self._serveur = uvicorn.Server(uvicorn.Config(self.app, host = "127.0.0.1", port = port, log_level = "warning"))
+        self._thread = None
+
+    def demarrer(self) -> str:
+        """
+        Démarre le serveur et attend qu'il accepte les connexions.
+
+        Returns
+        -------
+        str
+            Adresse du simulateur, à utiliser comme NOMINATIM_URL et ELECTRICITY_MAP_URL.
+        """
+        self._thread = threading.Thread(target = self._serveur.run, name = "simulateur-api", daemon = True)
+        self._thread.start()
+        limite = time.monotonic() + 10
+        while not self._serveur.started:
+            if time.monotonic() > limite or not self._thread.is_alive():
+                raise RuntimeError("Le simulateur n'a pas démarré")
+            time.sleep(0.01)
+        return self.url
+
+    def arreter(self):
+        """
+        Arrête le serveur.
+        """
+        self._serveur.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout = 5)
+
+    def __enter__(self):
+        self.demarrer()
+        return self
+
+    def __exit__(self, *args):
+        self.arreter()
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(description = "Simulateur local des API Nominatim et Electricity Map")
+    parseur.add_argument("--hote", default = "127.0.0.1")
+    parseur.add_argument("--port", type = int, default = 8010)
+    parseur.add_argument("--latence", type = float, help = "latence moyenne en millisecondes")
+    parseur.add_argument("--gigue", type = float, help = "écart-type de la latence en millisecondes")
+    parseur.add_argument("--taux-erreur", type = float, help = "proportion de réponses 503")
+    arguments = parseur.parse_args()
+
+    configuration = ConfigurationSimulateur.depuis_environnement()
+    for champ, valeur in (("latence", arguments.latence), ("gigue", arguments.gigue), ("taux_erreur", arguments.taux_erreur)):
+        if valeur is not None:
+            setattr(configuration, champ, valeur)
+    uvicorn.run(creer_app(configuration), host = arguments.hote, port = arguments.port)
@@ -0,0 +1,99 @@
+import asyncio
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+import httpx
+import app as module_app
+from app import app, get_cle_api_consommateur, get_cle_consommateur_ou_administateur, get_liens_api
+
+class TestApp(unittest.TestCase):
+
+    def setUp(self):
+        app.dependency_overrides[get_cle_api_consommateur] = lambda: "cle_api_hachee"
+        app.dependency_overrides[get_liens_api] = lambda: None
+        app.dependency_overrides[get_cle_consommateur_ou_administateur] = lambda: "cle_api_hachee"
+        self.parcours_ferme = False
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+
+    def requete(self, methode, chemin, **kwargs):
+        async def envoyer():
+            async with httpx.AsyncClient(transport = httpx.ASGITransport(app = app), base_url = "http://test") as client:
+                return await client.request(methode, chemin, **kwargs)
+        return asyncio.run(envoyer())
+
+    @patch('service.empreinte_carbone_service.EmpreinteCarboneService.empreinte_carbone_lot')
+    def test_lot_sans_date_visionnage(self, mock_lot):
+        mock_lot.return_value = [{"empreinte_carbone": 1.0}]
+        visionnage = {"duree": 60, "resolution": 720, "type_connexion": "Wifi", "materiel": "Mobile",
+                      "localisation": {"ville": "Paris", "pays": "France"}}
+        avant = datetime.now()
+        reponse = self.requete("POST", "/empreinte-carbone/simulation/lot", json = [visionnage],
+                               headers = {"cle-api": "cle"})
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse.json(), [{"empreinte_carbone": 1.0}])
+        # La date par défaut est celle de la requête et non celle de l'import du module
+        date_visionnage = mock_lot.call_args[0][0][0].date_visionnage
+        self.assertTrue(avant <= date_visionnage <= datetime.now())
+
+    def parcours(self, nombre):
+        try:
+            for i in range(nombre):
+                yield {"id_utilisateur": 1, "cle_api": "cle_api_hachee", "duree": 60, "resolution": 720,
+                       "type_connexion": "Wifi", "materiel": "Mobile", "date_visionnage": datetime(2024, 1, 1),
+                       "ville": "Paris", "pays": None, "empreinte_carbone": float(i),
+                       "date_requete": datetime(2024, 1, 1, 0, i)}
+        finally:
+            self.parcours_ferme = True
+
+    def places_export(self):
+        return module_app.exports_historique._value
+
+    @patch('service.table.historique_consommateur_service.HistoriqueConsommateurService.parcourir')
+    def test_historique_ndjson(self, mock_parcourir):
+        mock_parcourir.return_value = self.parcours(3)
+        places = self.places_export()
+        reponse = self.requete("GET", "/historique-empreinte", params = {"format": "ndjson"}, headers = {"cle-api": "cle"})
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(len(reponse.text.splitlines()), 3)
+        self.assertTrue(self.parcours_ferme)
+        self.assertEqual(self.places_export(), places)
+
+    @patch('service.table.historique_consommateur_service.HistoriqueConsommateurService.parcourir')
+    def test_historique_ndjson_vide(self, mock_parcourir):
+        mock_parcourir.return_value = self.parcours(0)
+        places = self.places_export()
+        reponse = self.requete("GET", "/historique-empreinte", params = {"format": "ndjson"}, headers = {"cle-api": "cle"})
+        self.assertEqual(reponse.status_code, 404)
+        self.assertEqual(self.places_export(), places)
+
+    @patch('service.table.historique_consommateur_service.HistoriqueConsommateurService.parcourir')
+    def test_historique_ndjson_exports_limites(self, mock_parcourir):
+        places = self.places_export()
+        for _ in range(places):
+            module_app.exports_historique.acquire()
+        try:
+            reponse = self.requete("GET", "/historique-empreinte", params = {"format": "ndjson"}, headers = {"cle-api": "cle"})
+        finally:
+            for _ in range(places):
+                module_app.exports_historique.release()
+        self.assertEqual(reponse.status_code, 503)
+        mock_parcourir.assert_not_called()
+
+    def test_historique_ndjson_deconnexion(self):
+        # Le client se déconnecte après la première ligne : la tâche de fond ferme le parcours et libère la place.
+        places = self.places_export()
+        module_app.exports_historique.acquire()
+        requetes = self.parcours(3)
+        reponse = module_app.diffuser_historique(requetes, next(requetes), False)
+
+        async def deconnecter():
+            await reponse.body_iterator.__anext__()
+            await reponse.background()
+        asyncio.run(deconnecter())
+        self.assertTrue(self.parcours_ferme)
+        self.assertEqual(self.places_export(), places)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import patch
+import bcrypt
+from service.table.cles_api_service import ClesApiService
+from utils.cache_cles import CacheCles
+
+class TestCacheCles(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CacheCles()
+        self.cache.vider()
+        self.cle_hachee = bcrypt.hashpw(b"secret", bcrypt.gensalt(4)).decode("utf-8")
+        self.row = {"cle_api": self.cle_hachee, "id_utilisateur": 7}
+
+    def tearDown(self):
+        self.cache.vider()
+
+    def test_empreinte_sans_cle_en_clair(self):
+        empreinte = self.cache.empreinte("Consommateur", "abc.secret")
+        self.assertNotIn(b"secret", empreinte)
+        self.assertNotEqual(empreinte, self.cache.empreinte("Fournisseur", "abc.secret"))
+
+    @patch('dao.cles_api_dao.ClesAPIDao.trouver_par_prefixe')
+    def test_une_seule_verification(self, mock_trouver_par_prefixe):
+        mock_trouver_par_prefixe.return_value = self.row
+        succes = self.cache.succes
+        for _ in range(3):
+            self.assertEqual(ClesApiService().trouver_cle_api("Consommateur", "abc.secret"), self.cle_hachee)
+        mock_trouver_par_prefixe.assert_called_once()
+        self.assertEqual(self.cache.succes - succes, 2)
+
+    @patch('dao.cles_api_dao.ClesAPIDao.trouver_par_prefixe')
+    def test_cle_invalide_non_conservee(self, mock_trouver_par_prefixe):
+        mock_trouver_par_prefixe.return_value = self.row
+        with self.assertRaises(ValueError):
+            ClesApiService().trouver_cle_api("Consommateur", "abc.faux")
+        self.assertEqual(len(self.cache), 0)
+
+    @patch('dao.cles_api_dao.ClesAPIDao.supprimer')
+    @patch('dao.cles_api_dao.ClesAPIDao.trouver_par_prefixe')
+    def test_invalidation_suppression(self, mock_trouver_par_prefixe, mock_supprimer):
+        mock_trouver_par_prefixe.return_value = self.row
+        mock_supprimer.return_value = True
+        ClesApiService().trouver_cle_api("Consommateur", "abc.secret")
+        self.cache.enregistrer("Fournisseur", "def.secret", "autre", 8)
+        ClesApiService().supprimer(id_utilisateur = 7)
+        self.assertIsNone(self.cache.trouver("Consommateur", "abc.secret"))
+        self.assertIsNotNone(self.cache.trouver("Fournisseur", "def.secret"))
+
+    @patch('dao.cles_api_dao.ClesAPIDao.supprimer')
+    @patch('dao.cles_api_dao.ClesAPIDao.trouver_par_prefixe')
+    def test_suppression_pendant_verification(self, mock_trouver_par_prefixe, mock_supprimer):
+        mock_supprimer.return_value = True
+
+        def supprimer_pendant_verification(*args):
+            # La clé est supprimée alors que la vérification bcrypt est en cours
+            ClesApiService().supprimer(id_utilisateur = 7)
+            return self.row
+        mock_trouver_par_prefixe.side_effect = supprimer_pendant_verification
+        self.assertEqual(ClesApiService().trouver_cle_api("Consommateur", "abc.secret"), self.cle_hachee)
+        self.assertIsNone(self.cache.trouver("Consommateur", "abc.secret"))
+
+    def test_enregistrer_generation(self):
+        generation = self.cache.generation()
+        self.cache.invalider(8)
+        self.assertFalse(self.cache.enregistrer("Consommateur", "abc.secret", self.cle_hachee, 7, generation))
+        self.assertTrue(self.cache.enregistrer("Consommateur", "abc.secret", self.cle_hachee, 7, self.cache.generation()))
+        self.assertIsNotNone(self.cache.trouver("Consommateur", "abc.secret"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import time
+from threading import Event, Thread
+from unittest.mock import patch, Mock
+from utils.cache_prevision import CachePrevision
+
+class TestCachePrevision(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CachePrevision()
+        self.cache.vider()
+        self.prevision = [("2024-01-01 10:00:00", 100), ("2024-01-01 11:00:00", 50)]
+
+    def test_obtenir_une_seule_fois(self):
+        chargement = Mock(return_value = self.prevision)
+        self.assertEqual(self.cache.obtenir("FR", chargement), self.prevision)
+        self.assertEqual(self.cache.obtenir("FR", chargement), self.prevision)
+        chargement.assert_called_once_with("FR")
+
+    def test_requetes_simultanees_regroupees(self):
+        debut = Event()
+        appels = []
+
+        def chargement(zone):
+            appels.append(zone)
+            debut.wait(1)
+            return self.prevision
+
+        resultats = []
+        threads = [Thread(target = lambda: resultats.append(self.cache.obtenir("DE", chargement))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        debut.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(appels, ["DE"])
+        self.assertEqual(resultats, [self.prevision] * 5)
+
+    def test_erreur_propagee(self):
+        chargement = Mock(side_effect = ValueError("Non accès aux données provenant de l'API Electricity Map"))
+        with self.assertRaises(ValueError):
+            self.cache.obtenir("ES", chargement)
+        with self.assertRaises(ValueError):
+            self.cache.obtenir("ES", chargement)
+        self.assertEqual(chargement.call_count, 2)
+
+    @patch('utils.cache_prevision.time.time')
+    def test_expiration_heure_pleine(self, mock_time):
+        mock_time.return_value = 3600 * 10 + 1800
+        chargement = Mock(return_value = self.prevision)
+        self.cache.obtenir("IT-NO", chargement)
+        mock_time.return_value = 3600 * 11 - 1
+        self.cache.obtenir("IT-NO", chargement)
+        chargement.assert_called_once()
+
+    @patch('utils.cache_prevision.time.time')
+    def test_perime_servi_pendant_rafraichissement(self, mock_time):
+        mock_time.return_value = 3600 * 10
+        ancienne = Mock(return_value = self.prevision)
+        self.cache.obtenir("GB", ancienne)
+        mock_time.return_value = 3600 * 11 + 60
+        nouvelle_prevision = [("2024-01-01 11:00:00", 80)]
+        rafraichi = Event()
+
+        def chargement(zone):
+            rafraichi.set()
+            return nouvelle_prevision
+
+        self.assertEqual(self.cache.obtenir("GB", chargement), self.prevision)
+        self.assertTrue(rafraichi.wait(1))
+        time.sleep(0.05)
+        self.assertEqual(self.cache.obtenir("GB", Mock()), nouvelle_prevision)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import patch
+from utils.cache_ttl import CacheTTL
+from utils.cache_zone import CacheZone
+
+class TestCacheTTL(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CacheTTL(duree_vie = 60, taille_max = 2)
+
+    def test_obtenir_absent(self):
+        self.assertIsNone(self.cache.obtenir("Paris"))
+        self.assertEqual(self.cache.echecs, 1)
+
+    def test_obtenir_present(self):
+        self.cache.ajouter("Paris", "FR")
+        self.assertEqual(self.cache.obtenir("Paris"), "FR")
+        self.assertEqual(self.cache.succes, 1)
+
+    @patch('utils.cache_ttl.time.time')
+    def test_expiration(self, mock_time):
+        mock_time.return_value = 1000
+        self.cache.ajouter("Paris", "FR")
+        mock_time.return_value = 1061
+        self.assertIsNone(self.cache.obtenir("Paris"))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_eviction_lru(self):
+        self.cache.ajouter("Paris", "FR")
+        self.cache.ajouter("Lyon", "FR")
+        self.cache.obtenir("Paris")
+        self.cache.ajouter("Berlin", "DE")
+        self.assertIsNone(self.cache.obtenir("Lyon"))
+        self.assertEqual(self.cache.obtenir("Paris"), "FR")
+        self.assertEqual(self.cache.obtenir("Berlin"), "DE")
+
+    def test_statistiques(self):
+        self.cache.ajouter("Paris", "FR")
+        self.cache.obtenir("Paris")
+        self.cache.obtenir("Lyon")
+        stats = self.cache.statistiques()
+        self.assertEqual(stats["succes"], 1)
+        self.assertEqual(stats["echecs"], 1)
+        self.assertEqual(stats["taux_succes"], 0.5)
+
+    def test_cle_zone_normalisee(self):
+        self.assertEqual(CacheZone.cle(" Paris ", "France"), CacheZone.cle("paris", "FRANCE"))
+        self.assertEqual(CacheZone.cle("Paris", None), ("paris", ""))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import random
+import unittest
+from benchmarks.charge import Scenarios, melange_defaut, point_saturation, resumer
+
+class TestCharge(unittest.TestCase):
+
+    def test_resumer(self):
+        mesures = [("simulation", 200, 0.010)] * 98 + [("simulation", 503, 0.5), ("historique", 0, 1.0)]
+        resume = resumer(mesures, duree = 10)
+        self.assertEqual(resume["simulation"]["requetes"], 99)
+        self.assertEqual(resume["simulation"]["erreurs"], 1)
+        self.assertEqual(resume["total"]["erreurs"], 2)
+        self.assertEqual(resume["total"]["debit"], 10)
+        self.assertAlmostEqual(resume["simulation"]["p50_ms"], 10)
+        self.assertEqual(resume["historique"]["max_ms"], 1000)
+
+    def test_point_saturation(self):
+        paliers = [{"concurrence": c, "resume": {"total": {"debit": d}}} for c, d in [(1, 50), (4, 180), (16, 190), (64, 120)]]
+        self.assertEqual(point_saturation(paliers), 16)
+        self.assertIsNone(point_saturation(paliers[:2]))
+
+    def test_scenarios_cles_par_role(self):
+        scenarios = Scenarios(["c1", "c2"], ["f1"], "admin")
+        aleatoire = random.Random(0)
+        for nom in melange_defaut:
+            methode, chemin, arguments = scenarios.requete(nom, 1, aleatoire)
+            attendue = {"serveurs_optimaux": "f1", "export_admin": "admin", "metriques_admin": "admin"}.get(nom, "c2")
+            self.assertEqual(arguments["headers"]["cle-api"], attendue)
+
+if __name__ == '__main__':
+    unittest.main()
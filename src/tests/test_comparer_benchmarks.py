@@ -0,0 +1,28 @@
+import unittest
+from benchmarks.comparer import comparer, rapport
+
+class TestComparerBenchmarks(unittest.TestCase):
+
+    def setUp(self):
+        self.reference = {"resultats": {"a": {"mediane_us": 100.0}, "b": {"mediane_us": 100.0},
+                                        "c": {"mediane_us": 100.0}, "d": {"mediane_us": 50.0}}}
+        self.actuel = {"resultats": {"a": {"mediane_us": 130.0}, "b": {"mediane_us": 110.0},
+                                     "c": {"mediane_us": 60.0}, "e": {"mediane_us": 10.0}}}
+
+    def test_statuts(self):
+        lignes = {ligne["nom"]: ligne for ligne in comparer(self.reference, self.actuel, seuil = 0.2)}
+        self.assertEqual({nom: ligne["statut"] for nom, ligne in lignes.items()},
+                         {"a": "regression", "b": "stable", "c": "amelioration", "d": "supprimee", "e": "nouvelle"})
+        self.assertAlmostEqual(lignes["a"]["ecart"], 0.3)
+        self.assertIsNone(lignes["e"]["ecart"])
+
+    def test_seuil(self):
+        lignes = comparer(self.reference, self.actuel, seuil = 0.05)
+        self.assertEqual([ligne["nom"] for ligne in lignes if ligne["statut"] == "regression"], ["a", "b"])
+
+    def test_rapport(self):
+        texte = rapport(comparer(self.reference, self.actuel, seuil = 0.2), 0.2)
+        self.assertIn("1 régression(s) au-delà de 20%", texte)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+import psycopg2
+from psycopg2.pool import PoolError
+from dao.db_connection import DBConnection
+
+environnement = {"HOST": "localhost", "PORT": "5432", "DATABASE": "test", "DB_USER": "test", "PASSWORD": "test",
+                 "DB_POOL_MIN": "1", "DB_POOL_MAX": "1", "DB_POOL_ATTENTE": "0.05"}
+
+class TestDBConnection(unittest.TestCase):
+
+    def setUp(self):
+        patcher_pool = patch('dao.db_connection.ThreadedConnectionPool')
+        patcher_env = patch.dict(os.environ, environnement)
+        patcher_dotenv = patch('dao.db_connection.dotenv.load_dotenv')
+        self.mock_pool = patcher_pool.start().return_value
+        patcher_env.start()
+        patcher_dotenv.start()
+        self.addCleanup(patch.stopall)
+        self.connexion = MagicMock(closed = 0)
+        self.connexion.get_transaction_status.return_value = 0
+        self.mock_pool.getconn.return_value = self.connexion
+        # Instance indépendante du singleton partagé par les DAO.
+        self.db = DBConnection.__new__(DBConnection)
+        self.db.__init__()
+
+    def test_emprunt_et_restitution(self):
+        with self.db.connexion() as connection:
+            self.assertIs(connection, self.connexion)
+            self.assertEqual(self.db.statistiques()["en_cours"], 1)
+        self.mock_pool.putconn.assert_called_once_with(self.connexion, close = False)
+        self.assertEqual(self.db.statistiques()["en_cours"], 0)
+        self.assertEqual(self.db.statistiques()["emprunts"], 1)
+
+    def test_connexion_rompue_fermee(self):
+        with self.assertRaises(psycopg2.OperationalError):
+            with self.db.connexion():
+                raise psycopg2.OperationalError("server closed the connection")
+        self.mock_pool.putconn.assert_called_once_with(self.connexion, close = True)
+        self.assertEqual(self.db.statistiques()["reconnexions"], 1)
+
+    def test_pool_plein(self):
+        with self.db.connexion():
+            with self.assertRaises(PoolError):
+                with self.db.connexion():
+                    pass
+
+if __name__ == '__main__':
+    unittest.main()
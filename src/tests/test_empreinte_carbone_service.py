@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import patch
 from service.empreinte_carbone_service import EmpreinteCarboneService
 from business_object.info_video import InfoVideo
+from business_object.prevision_carbone import PrevisionCarbone
 from business_object.zone_geographique import ZoneGeographique
 from service.table.cles_api_service import ClesApiService
 from datetime import datetime, timedelta
@@ -50,34 +51,96 @@ class TestEmpreinteCarboneService(unittest.TestCase):
     @patch('business_object.zone_geographique.ZoneGeographique.prevision_carbone')
     def test_empreinte_carbone_date_fin_visionnage_postérieure_prévision(self, mock_prevision_carbone):
         next_hour = self.date_visionnage + timedelta(hours = 1)
-        mock_prevision_carbone.return_value = [(str(self.date_visionnage), 100),(str(next_hour), 50)]
+        mock_prevision_carbone.return_value = PrevisionCarbone.depuis_liste([(str(self.date_visionnage), 100),(str(next_hour), 50)])
         self.info_video.date_visionnage = datetime.now() + timedelta(hours = 1)
         with self.assertRaises(ValueError, msg = "Non accès aux données provenant de l'API Electricity Map"):
             self.empreinte_service.empreinte_carbone(self.info_video, self.cle_api)
 
-    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.creer')
+    @patch('dao.tampon_historique_dao.TamponHistoriqueDao.ajouter')
     @patch('business_object.zone_geographique.ZoneGeographique.prevision_carbone')
-    def test_empreinte_carbone_entree_valide_2(self, mock_prevision_carbone, mock_creer):
+    def test_empreinte_carbone_entree_valide_2(self, mock_prevision_carbone, mock_ajouter):
         next_hour = self.date_visionnage + timedelta(hours = 1)
-        mock_prevision_carbone.return_value = [(str(self.date_visionnage), 100),(str(next_hour), 50)]
+        mock_prevision_carbone.return_value = PrevisionCarbone.depuis_liste([(str(self.date_visionnage), 100),(str(next_hour), 50)])
         empreinte_calculee = self.empreinte_service.empreinte_carbone(self.info_video, self.cle_api)
         nb_bytes = 1280 * 720 * 25 * 60 * self.info_video.duree
         impact_energie = self.info_video.duree * 1.1e-4 + nb_bytes * (1.52e-10 + 7.2e-11)
         empreinte_main = round(impact_energie * (60*100 + 30*50)/90 ,1)
         self.assertEqual(empreinte_calculee, empreinte_main)
-        mock_creer.assert_called()
+        mock_ajouter.assert_called()
 
-    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.trouver_empreinte_par_cle_api')
-    def test_empreinte_moyenne(self, mock_trouver_empreinte):
-        mock_trouver_empreinte.return_value = [100, 200, 300]
+    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.trouver_totaux_par_cle_api')
+    def test_empreinte_moyenne(self, mock_trouver_totaux):
+        mock_trouver_totaux.return_value = {"nb_requetes": 3, "somme_empreinte": 600}
         moyenne = self.empreinte_service.empreinte_moyenne(self.cle_api)
         self.assertEqual(moyenne, 200)
 
-    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.trouver_empreinte_par_cle_api')
-    def test_empreinte_total(self, mock_trouver_empreinte):
-        mock_trouver_empreinte.return_value = [100, 200, 300]
+    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.trouver_totaux_par_cle_api')
+    def test_empreinte_total(self, mock_trouver_totaux):
+        mock_trouver_totaux.return_value = {"nb_requetes": 3, "somme_empreinte": 600}
         total = self.empreinte_service.empreinte_total(self.cle_api)
         self.assertEqual(total, 600)
 
+    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.trouver_totaux_par_cle_api')
+    def test_empreinte_moyenne_sans_historique(self, mock_trouver_totaux):
+        mock_trouver_totaux.return_value = {"nb_requetes": 0, "somme_empreinte": 0}
+        self.assertEqual(self.empreinte_service.empreinte_moyenne(self.cle_api), 0)
+
+class TestEmpreinteCarboneServiceSansBase(unittest.TestCase):
+
+    def setUp(self):
+        now = datetime.now()
+        self.date_visionnage = now.replace(minute = 0, second = 0, microsecond = 0)
+        self.empreinte_service = EmpreinteCarboneService()
+        self.zone_geo = ZoneGeographique("Paris", "France")
+        self.info_video = InfoVideo(90, 720, "Wifi", "Mobile", self.zone_geo, self.date_visionnage)
+        self.cle_api = "cle_api_hachee"
+
+    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.creer_lot')
+    @patch('business_object.zone_geographique.ZoneGeographique.prevision_zone')
+    @patch('business_object.zone_geographique.ZoneGeographique.name_to_zone')
+    def test_empreinte_carbone_lot(self, mock_name_to_zone, mock_prevision_zone, mock_creer_lot):
+        next_hour = self.date_visionnage + timedelta(hours = 1)
+        mock_name_to_zone.return_value = "FR"
+        mock_prevision_zone.return_value = PrevisionCarbone.depuis_liste([(str(self.date_visionnage), 100),(str(next_hour), 50)])
+        lot = [self.info_video,
+               InfoVideo(90, 1223, "Wifi", "Mobile", ZoneGeographique("Paris", "France"), self.date_visionnage),
+               InfoVideo(30, 720, "Wifi", "Mobile", ZoneGeographique("Paris", "France"), self.date_visionnage),
+               InfoVideo(180, 720, "Wifi", "Mobile", ZoneGeographique("Paris", "France"), self.date_visionnage)]
+        resultats = self.empreinte_service.empreinte_carbone_lot(lot, self.cle_api)
+        self.assertEqual(len(resultats), 4)
+        self.assertEqual(resultats[0]["empreinte_carbone"], self.empreinte_service._calculer(self.info_video, mock_prevision_zone.return_value))
+        self.assertEqual(resultats[1], {"erreur": "Résolution non connu"})
+        self.assertIn("empreinte_carbone", resultats[2])
+        self.assertIn("erreur", resultats[3])
+        mock_prevision_zone.assert_called_once_with("FR")
+        self.assertEqual(len(mock_creer_lot.call_args[0][0]), 2)
+
+    @patch('dao.tampon_historique_dao.TamponHistoriqueDao.ajouter')
+    @patch('business_object.zone_geographique.ZoneGeographique.prevision_carbone')
+    def test_meilleurs_horaires(self, mock_prevision_carbone, mock_ajouter):
+        heures = [self.date_visionnage + timedelta(hours = i) for i in range(4)]
+        mock_prevision_carbone.return_value = PrevisionCarbone.depuis_liste(
+            [(str(heure), intensite) for heure, intensite in zip(heures, [300, 100, 50, 200])])
+        self.info_video.duree = 60
+        horaires = self.empreinte_service.meilleurs_horaires(self.info_video, nb_resultats = 2, pas = 30)
+        # Débuts de l'heure courante à 3h plus tard, toutes les 30 minutes
+        self.assertEqual([point["date_visionnage"] for point in horaires["courbe"]],
+                         [self.date_visionnage + timedelta(minutes = 30 * i) for i in range(7)])
+        self.assertEqual([point["date_visionnage"] for point in horaires["meilleurs"]], [heures[2], heures[1] + timedelta(minutes = 30)])
+        # Chaque point de la courbe est l'empreinte d'une simulation à ce début
+        for point in horaires["courbe"]:
+            self.info_video.date_visionnage = point["date_visionnage"]
+            self.assertEqual(point["empreinte_carbone"],
+                             self.empreinte_service._calculer(self.info_video, mock_prevision_carbone.return_value))
+        mock_ajouter.assert_not_called()
+
+    @patch('business_object.zone_geographique.ZoneGeographique.prevision_carbone')
+    def test_meilleurs_horaires_video_plus_longue_que_la_prevision(self, mock_prevision_carbone):
+        next_hour = self.date_visionnage + timedelta(hours = 1)
+        mock_prevision_carbone.return_value = PrevisionCarbone.depuis_liste([(str(self.date_visionnage), 100),(str(next_hour), 50)])
+        self.info_video.duree = 121
+        with self.assertRaises(ValueError, msg = "Non accès aux données provenant de l'API Electricity Map"):
+            self.empreinte_service.meilleurs_horaires(self.info_video)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from unittest.mock import patch
+from service.etat_service import MoniteurEtat
+
+class TestMoniteurEtat(unittest.TestCase):
+
+    def setUp(self):
+        self.moniteur = MoniteurEtat()
+
+    def tearDown(self):
+        self.moniteur.arreter()
+        for etat in self.moniteur._etat.values():
+            etat.update(disponible = None, derniere_verification = None, dernier_succes = None)
+
+    def test_etat_inconnu_disponible(self):
+        self.assertTrue(self.moniteur.disponible("electricity_map"))
+
+    @patch('service.etat_service.EtatService.lien_api_nominatim_openstreetmap')
+    @patch('service.etat_service.EtatService.lien_api_electricity_map')
+    def test_verifier(self, mock_em, mock_nominatim):
+        mock_em.return_value = True
+        mock_nominatim.return_value = False
+        self.moniteur.verifier()
+        self.assertTrue(self.moniteur.disponible("electricity_map"))
+        self.assertFalse(self.moniteur.disponible("nominatim_openstreetmap"))
+        etat = self.moniteur.etat()
+        self.assertIsNotNone(etat["electricity_map"]["dernier_succes"])
+        self.assertIsNone(etat["nominatim_openstreetmap"]["dernier_succes"])
+        self.assertIsNotNone(etat["nominatim_openstreetmap"]["derniere_verification"])
+
+    @patch('service.etat_service.EtatService.lien_api_nominatim_openstreetmap')
+    @patch('service.etat_service.EtatService.lien_api_electricity_map')
+    def test_dernier_succes_conserve(self, mock_em, mock_nominatim):
+        mock_nominatim.return_value = True
+        mock_em.return_value = True
+        self.moniteur.verifier()
+        succes = self.moniteur.etat()["electricity_map"]["dernier_succes"]
+        mock_em.return_value = False
+        self.moniteur.verifier()
+        self.assertFalse(self.moniteur.disponible("electricity_map"))
+        self.assertEqual(self.moniteur.etat()["electricity_map"]["dernier_succes"], succes)
+
+if __name__ == '__main__':
+    unittest.main()
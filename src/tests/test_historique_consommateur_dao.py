@@ -0,0 +1,43 @@
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from business_object.info_video import InfoVideo
+from business_object.zone_geographique import ZoneGeographique
+from dao.historique_consommateur_dao import HistoriqueConsommateurDao
+from dao.tampon_historique_dao import TamponHistoriqueDao
+
+class TestHistoriqueConsommateurDao(unittest.TestCase):
+
+    def setUp(self):
+        self.dao = HistoriqueConsommateurDao()
+        self.donnees = InfoVideo(60, 720, "Wifi", "Mobile", ZoneGeographique("Paris", "France"), datetime.now())
+
+    def test_dates_requete_croissantes(self):
+        dates = self.dao.dates_requete(1000) + self.dao.dates_requete(3)
+        self.assertEqual(len(dates), 1003)
+        self.assertTrue(all(a < b for a, b in zip(dates, dates[1:])))
+
+    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.creer_lignes')
+    def test_lot_et_tampon_sans_conflit(self, mock_creer_lignes):
+        mock_creer_lignes.side_effect = len
+        with patch.dict(os.environ, {"HISTORIQUE_TAMPON_TAILLE": "10"}), patch('dao.tampon_historique_dao.dotenv.load_dotenv'):
+            tampon = TamponHistoriqueDao.__new__(TamponHistoriqueDao)
+            tampon.__init__()
+        tampon._arret = True
+        self.assertEqual(self.dao.creer_lot([(self.donnees, 1.5)] * 1000, "cle"), 1000)
+        tampon.ajouter(self.donnees, 1.5, "cle")
+        self.assertEqual(tampon.vider(), 1)
+        # La simulation mise en tampon après le lot ne reprend aucune de ses dates
+        date_lot = mock_creer_lignes.call_args_list[0][0][0][-1][1]
+        date_tampon = mock_creer_lignes.call_args_list[1][0][0][0][1]
+        self.assertLess(date_lot, date_tampon)
+
+    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.creer_lignes')
+    def test_lot_lignes_non_enregistrees(self, mock_creer_lignes):
+        mock_creer_lignes.return_value = 1
+        with self.assertRaises(ValueError):
+            self.dao.creer_lot([(self.donnees, 1.5)] * 2, "cle")
+
+if __name__ == '__main__':
+    unittest.main()
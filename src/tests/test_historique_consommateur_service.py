@@ -0,0 +1,74 @@
+import os
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+from service.table.historique_consommateur_service import HistoriqueConsommateurService, MaintenanceHistorique
+
+class TestHistoriqueConsommateurService(unittest.TestCase):
+
+    def test_curseur_aller_retour(self):
+        page = [{"date_requete": datetime(2023, 11, 2, 10, 0, 0, 12), "cle_api": "$2b$12$abc/def"}]
+        curseur = HistoriqueConsommateurService.curseur_suivant(page, 1)
+        self.assertEqual(HistoriqueConsommateurService.decoder_curseur(curseur),
+                         (datetime(2023, 11, 2, 10, 0, 0, 12), "$2b$12$abc/def"))
+
+    def test_derniere_page_sans_curseur(self):
+        page = [{"date_requete": datetime(2023, 11, 2), "cle_api": "cle"}]
+        self.assertIsNone(HistoriqueConsommateurService.curseur_suivant(page, 2))
+
+    def test_curseur_invalide(self):
+        with self.assertRaises(ValueError):
+            HistoriqueConsommateurService.decoder_curseur("pas-un-curseur")
+
+    @patch('service.table.historique_consommateur_service.TamponHistoriqueDao')
+    @patch('service.table.historique_consommateur_service.HistoriqueConsommateurDao.trouver_page')
+    def test_voir_consommateur_limite_a_sa_cle(self, mock_trouver_page, mock_tampon):
+        mock_trouver_page.return_value = []
+        HistoriqueConsommateurService().voir("cle_consommateur", id_utilisateur = 3, limite = 10)
+        mock_trouver_page.assert_called_once_with(cle_api = "cle_consommateur", id_utilisateur = None, apres = None,
+                                                  limite = 10, date_debut = None, date_fin = None)
+        mock_tampon.return_value.vider.assert_called_once()
+
+    @patch('service.table.historique_consommateur_service.TamponHistoriqueDao')
+    @patch('service.table.historique_consommateur_service.AgregatsConsommateurDao.trouver')
+    def test_agreger_repartitions(self, mock_trouver, mock_tampon):
+        mock_trouver.return_value = [
+            {"debut": date(2023, 11, 13), "resolution": 720, "materiel": "Mobile", "type_connexion": "Wifi",
+             "nb_requetes": 3, "somme_empreinte": 6.0, "min_empreinte": 1.0, "max_empreinte": 3.0},
+            {"debut": date(2023, 11, 13), "resolution": 1080, "materiel": "Mobile", "type_connexion": "Cable",
+             "nb_requetes": 1, "somme_empreinte": 10.0, "min_empreinte": 10.0, "max_empreinte": 10.0}]
+        agregats = HistoriqueConsommateurService().agreger("cle_consommateur", periode = "semaine")
+        mock_trouver.assert_called_once_with(cle_api = "cle_consommateur", id_utilisateur = None, periode = "semaine",
+                                             date_debut = None, date_fin = None)
+        self.assertEqual(len(agregats), 1)
+        self.assertEqual(agregats[0]["nb_requetes"], 4)
+        self.assertEqual(agregats[0]["moyenne_empreinte"], 4.0)
+        self.assertEqual((agregats[0]["min_empreinte"], agregats[0]["max_empreinte"]), (1.0, 10.0))
+        self.assertEqual(agregats[0]["par_materiel"], {"Mobile": {"nb_requetes": 4, "somme_empreinte": 16.0}})
+        self.assertEqual(agregats[0]["par_resolution"][1080], {"nb_requetes": 1, "somme_empreinte": 10.0})
+
+    def test_agreger_periode_invalide(self):
+        with self.assertRaises(ValueError):
+            HistoriqueConsommateurService().agreger("cle_consommateur", periode = "mois")
+
+    @patch('service.table.historique_consommateur_service.load_dotenv')
+    @patch('service.table.historique_consommateur_service.AgregatsConsommateurDao.rattraper')
+    @patch('service.table.historique_consommateur_service.HistoriqueConsommateurDao.purger')
+    @patch('service.table.historique_consommateur_service.HistoriqueConsommateurDao.creer_partitions')
+    def test_maintenir_partitions_et_retention(self, mock_creer_partitions, mock_purger, mock_rattraper, mock_dotenv):
+        mock_rattraper.side_effect = [{"debut": date(2023, 9, 1), "fin": date(2023, 9, 8), "jour_fin": date(2023, 9, 10)},
+                                      {"debut": date(2023, 9, 8), "fin": date(2023, 9, 10), "jour_fin": date(2023, 9, 10)},
+                                      None]
+        mock_creer_partitions.return_value = 2
+        mock_purger.return_value = 10
+        with patch.dict(os.environ, {"HISTORIQUE_PARTITIONS_AVANCE": "3", "HISTORIQUE_RETENTION_MOIS": "2"}):
+            # Instance indépendante du singleton utilisé par l'API.
+            maintenance = MaintenanceHistorique.__new__(MaintenanceHistorique)
+            maintenance.__init__()
+        resultat = maintenance.maintenir(datetime(2023, 11, 15, 12, 0))
+        mock_creer_partitions.assert_called_once_with(datetime(2023, 11, 15, 12, 0), datetime(2024, 2, 1))
+        mock_purger.assert_called_once_with(datetime(2023, 9, 1))
+        self.assertEqual(resultat, {"jours_rattrapes": 9, "partitions_creees": 2, "lignes_supprimees": 10})
+
+if __name__ == '__main__':
+    unittest.main()
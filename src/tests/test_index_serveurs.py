@@ -0,0 +1,36 @@
+import unittest
+from unittest.mock import patch
+from business_object.serveur_cloud import ServeurCloud
+from business_object.zone_geographique import ZoneGeographique
+from utils.index_serveurs import IndexServeurs
+
+class TestIndexServeurs(unittest.TestCase):
+
+    def setUp(self):
+        self.paris = ServeurCloud("eu-west-3", "Europe (Paris)", "FR-IDF", "AWS", ["FR", "DE"], ZoneGeographique("Paris"))
+        self.berlin = ServeurCloud("europe-west10-a", "Berlin", "DE-BE", "GCP", ["DE"], ZoneGeographique("Berlin"))
+        self.madrid = ServeurCloud("eu-south-2", "Europe (Spain)", "ES-M", "AWS", ["ES"], ZoneGeographique("Madrid"))
+        self.index = IndexServeurs()
+
+    def tearDown(self):
+        self.index._index = None
+
+    @patch('dao.serveur_dao.ServeurDao.trouver_tout')
+    def test_serveurs_eligibles(self, mock_trouver_tout):
+        mock_trouver_tout.return_value = [self.paris, self.berlin, self.madrid]
+        self.index.construire()
+        self.assertEqual(self.index.serveurs_eligibles("DE", ["AWS", "GCP", "Azure"]), [self.paris, self.berlin])
+        self.assertEqual(self.index.serveurs_eligibles("DE", ["GCP"]), [self.berlin])
+        self.assertEqual(self.index.serveurs_eligibles("US-CAL-CISO", ["AWS"]), [])
+
+    @patch('dao.serveur_dao.ServeurDao.trouver_tout')
+    def test_reconstruction(self, mock_trouver_tout):
+        mock_trouver_tout.return_value = [self.paris]
+        self.index.construire()
+        mock_trouver_tout.return_value = [self.madrid]
+        self.index.construire()
+        self.assertEqual(self.index.serveurs_eligibles("FR", ["AWS"]), [])
+        self.assertEqual(self.index.serveurs_eligibles("ES", ["AWS"]), [self.madrid])
+
+if __name__ == '__main__':
+    unittest.main()
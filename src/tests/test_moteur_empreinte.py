@@ -0,0 +1,119 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from business_object.prevision_carbone import PrevisionCarbone
+from service.moteur_empreinte import (MoteurEmpreinte, resolutions, materiels, types_connexion, coefficients_resolution,
+                                      coefficients_materiel, coefficients_connexion, energie_data_center)
+
+def empreinte_historique(duree, resolution, materiel, type_connexion, date_visionnage, liste_dates_electricity):
+    """
+    Copie de référence du calcul scalaire d'EmpreinteCarboneService.empreinte_carbone avant MoteurEmpreinte,
+    sans arrondi final.
+    """
+    impact_energie = duree * coefficients_materiel[materiels.index(materiel)] \
+        + coefficients_resolution[resolutions.index(resolution)] * 25 * 60 * duree \
+        * (coefficients_connexion[types_connexion.index(type_connexion)] + energie_data_center)
+    dates = [datetime.strptime(date[0], "%Y-%m-%d %H:%M:%S") for date in liste_dates_electricity]
+    date_visionnage_arrondie = date_visionnage.replace(minute = 0, second = 0, microsecond = 0)
+    indice_date_visionnage = next((i for i, date in enumerate(dates) if date == date_visionnage_arrondie), None)
+    l = []
+    ecart_date = (dates[indice_date_visionnage + 1] - date_visionnage).seconds // 60 % 60
+    if date_visionnage == date_visionnage_arrondie:
+        ecart_date = 60
+    duree_restante = duree
+    while duree_restante > 0:
+        l.append((ecart_date, liste_dates_electricity[indice_date_visionnage][1]))
+        duree_restante = duree_restante - ecart_date
+        ecart_date = min(60, duree_restante)
+        indice_date_visionnage += 1
+    intensite_carbone_moyenne = sum((minutes_par_tranche * impact_conso_elec) / duree
+                                    for minutes_par_tranche, impact_conso_elec in l)
+    return impact_energie * intensite_carbone_moyenne
+
+
+class TestMoteurEmpreinte(unittest.TestCase):
+
+    def setUp(self):
+        self.moteur = MoteurEmpreinte.depuis_previsions([
+            PrevisionCarbone.depuis_liste([("2024-01-01 10:00:00", 100), ("2024-01-01 11:00:00", 50)]),
+            PrevisionCarbone.depuis_liste([("2024-01-01 10:00:00", 300), ("2024-01-01 11:00:00", 200),
+                                           ("2024-01-01 12:00:00", 100)])])
+        self.debut = float(np.datetime64("2024-01-01 10:00:00", "s").astype(np.int64))
+
+    def calculer(self, duree, debut, zone, resolution = 720, materiel = "Mobile", type_connexion = "Wifi"):
+        return self.moteur.calculer(np.array(duree),
+                                    MoteurEmpreinte.coder([resolution] * len(duree), resolutions),
+                                    MoteurEmpreinte.coder([materiel] * len(duree), materiels),
+                                    MoteurEmpreinte.coder([type_connexion] * len(duree), types_connexion),
+                                    np.array(debut), np.array(zone))
+
+    def impact(self, duree):
+        return duree * 1.1e-4 + 1280 * 720 * 25 * 60 * duree * (1.52e-10 + 7.2e-11)
+
+    def test_fenetre_sur_plusieurs_heures(self):
+        empreinte = self.calculer([90], [self.debut], [0])
+        self.assertEqual(round(empreinte[0], 1), round(self.impact(90) * (60*100 + 30*50)/90, 1))
+
+    def test_debut_en_cours_d_heure(self):
+        # Visionnage de 10h30 à 11h30 : 30 minutes à 300 puis 30 minutes à 200
+        empreinte = self.calculer([60], [self.debut + 1800], [1])
+        self.assertAlmostEqual(empreinte[0], self.impact(60) * 250)
+
+    def test_prevision_insuffisante(self):
+        empreinte = self.calculer([121, 10, 10], [self.debut, self.debut - 3600, self.debut], [0, 0, 1])
+        self.assertTrue(np.isnan(empreinte[0]))
+        self.assertTrue(np.isnan(empreinte[1]))
+        self.assertFalse(np.isnan(empreinte[2]))
+
+    def test_duree_nulle(self):
+        self.assertEqual(self.calculer([0], [self.debut], [0])[0], 0.0)
+
+    def test_session_courte_premiere_heure(self):
+        # Visionnage de 10h30 à 10h50 : 20 minutes à 300, le calcul historique comptait les 30 minutes
+        # restantes de la première heure et surestimait l'empreinte de moitié.
+        empreinte = self.calculer([20], [self.debut + 1800], [1])
+        self.assertAlmostEqual(empreinte[0], self.impact(20) * 300)
+        liste = [("2024-01-01 10:00:00", 300), ("2024-01-01 11:00:00", 200), ("2024-01-01 12:00:00", 100)]
+        historique = empreinte_historique(20, 720, "Mobile", "Wifi", datetime(2024, 1, 1, 10, 30), liste)
+        self.assertAlmostEqual(historique, self.impact(20) * 450)
+
+    def test_equivalence_calcul_historique(self):
+        aleatoire = random.Random(0)
+        origine = datetime(2024, 1, 1)
+        nb_heures = 24
+        liste = [((origine + timedelta(hours = h)).strftime("%Y-%m-%d %H:%M:%S"), aleatoire.randint(20, 600))
+                 for h in range(nb_heures)]
+        moteur = MoteurEmpreinte.depuis_previsions([PrevisionCarbone.depuis_liste(liste)])
+        cas = []
+        for _ in range(2000):
+            minute_debut = aleatoire.randrange((nb_heures - 1) * 60)
+            cas.append((aleatoire.randint(1, nb_heures * 60 - minute_debut), minute_debut,
+                        aleatoire.choice(resolutions), aleatoire.choice(materiels), aleatoire.choice(types_connexion)))
+        duree, minute_debut, resolution, materiel, type_connexion = zip(*cas)
+        debut = MoteurEmpreinte.secondes([origine + timedelta(minutes = m) for m in minute_debut])
+        empreintes = self.moteur_calculer(moteur, duree, resolution, materiel, type_connexion, debut)
+        nb_sessions_courtes = 0
+        for (duree, minute_debut, resolution, materiel, type_connexion), empreinte in zip(cas, empreintes):
+            historique = empreinte_historique(duree, resolution, materiel, type_connexion,
+                                              origine + timedelta(minutes = minute_debut), liste)
+            # Seules les sessions plus courtes que le reste de leur première heure diffèrent
+            if duree < 60 - minute_debut % 60:
+                nb_sessions_courtes += 1
+                self.assertGreater(historique, empreinte)
+            else:
+                self.assertAlmostEqual(empreinte, historique, delta = 1e-9 * historique)
+        self.assertGreater(nb_sessions_courtes, 0)
+
+    @staticmethod
+    def moteur_calculer(moteur, duree, resolution, materiel, type_connexion, debut):
+        return moteur.calculer(np.array(duree), MoteurEmpreinte.coder(resolution, resolutions),
+                               MoteurEmpreinte.coder(materiel, materiels),
+                               MoteurEmpreinte.coder(type_connexion, types_connexion),
+                               debut, np.zeros(len(duree), dtype = np.int64))
+
+    def test_coder(self):
+        np.testing.assert_array_equal(MoteurEmpreinte.coder(["Mobile", "Tablette"], materiels), [1, -1])
+
+if __name__ == '__main__':
+    unittest.main()
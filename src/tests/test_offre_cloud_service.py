@@ -1,64 +1,95 @@
-
-import unittest
-from unittest.mock import Mock
-from service.offre_cloud_service import OffreCloudService
-from business_object.ZoneGeographique import ZoneGeographique
-from dao.serveur_dao import ServeurDao 
-
-class TestOffreCloudService(unittest.TestCase):
-
-    def setUp(self):
-        self.offre_service = OffreCloudService()
-        self.zone_geo = ZoneGeographique("Marseille")
-        self.fournisseurs_cloud = ["Fournisseur1", "Fournisseur2"]
-        self.date_visionnage = datetime.now()
-        self.duree = 60
-
-    @patch('service.table_service.TableService.voir_table_serveurs')
-    @patch('business_object.zone_geographique.ZoneGeographique.name_to_zone')
-    def test_serveurs_eligibles(self, mock_name_to_zone, mock_voir_table_serveurs):
-        mock_name_to_zone.return_value = "zone_test"
-        mock_voir_table_serveurs.return_value = [ServeurCloud(...), ServeurCloud(...)]
-        result = self.offre_service.serveurs_eligibles(self.fournisseurs_cloud, self.zone_geo)
-        self.assertIsInstance(result, list)
-        self.assertTrue(all(isinstance(serveur, ServeurCloud) for serveur in result))
-
-    @patch('business_object.zone_geographique.ZoneGeographique.prevision_carbone')
-    @patch('service.table_service.TableService.voir_table_serveurs')
-    def test_serveurs_optimaux(self, mock_voir_table_serveurs, mock_prevision_carbone):
-        mock_prevision_carbone.return_value = [("2022-01-01 00:00:00", 100)]
-        mock_voir_table_serveurs.return_value = [ServeurCloud(...), ServeurCloud(...)]
-        result = self.offre_service.serveurs_optimaux(self.fournisseurs_cloud, self.zone_geo, self.duree, self.date_visionnage)
-        self.assertIsInstance(result, dict)
-        self.assertTrue(all(isinstance(key, ServeurCloud) and isinstance(value, float) for key, value in result.items()))
-
-class TestOffreCloudService(unittest.TestCase):
-
-    def setUp(self):
-        self.service = OffreCloudService()
-        self.localisation = ZoneGeographique("Marseille")
-        self.fournisseurs_cloud = ["Fournisseur1", "Fournisseur2"]
-        self.duree = 60
-        self.date_visionnage = datetime.now()
-
-    @patch('service.table_service.TableService.voir_table_serveurs')
-    @patch('business_object.zone_geographique.ZoneGeographique.name_to_zone')
-    def test_serveurs_eligibles(self, mock_name_to_zone, mock_voir_table_serveurs):
-        mock_name_to_zone.return_value = "zone_test"
-        mock_voir_table_serveurs.return_value = [MagicMock(spec=ServeurCloud), MagicMock(spec=ServeurCloud)]
-        result = self.service.serveurs_eligibles(self.fournisseurs_cloud, self.localisation)
-        self.assertIsInstance(result, list)
-        self.assertTrue(all(isinstance(serveur, ServeurCloud) for serveur in result))
-
-    @patch('business_object.zone_geographique.ZoneGeographique.prevision_carbone')
-    @patch('service.table_service.TableService.voir_table_serveurs')
-    def test_serveurs_optimaux(self, mock_voir_table_serveurs, mock_prevision_carbone):
-        mock_prevision_carbone.return_value = [("2022-01-01 00:00:00", 100)]
-        mock_voir_table_serveurs.return_value = [MagicMock(spec=ServeurCloud), MagicMock(spec=ServeurCloud)]
-        result = self.service.serveurs_optimaux(self.fournisseurs_cloud, self.localisation, self.duree, self.date_visionnage)
-        self.assertIsInstance(result, dict)
-        self.assertTrue(all(isinstance(key, ServeurCloud) and isinstance(value, float) for key, value in result.items()))
-
-
-if __name__ == '__main__':
-    unittest.main()
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from service.offre_cloud_service import OffreCloudService
+from business_object.serveur_cloud import ServeurCloud
+from business_object.prevision_carbone import PrevisionCarbone
+from business_object.zone_geographique import ZoneGeographique
+from simulateur_api.serveur import ConfigurationSimulateur, ServeurSimulateur
+from utils.cache_prevision import CachePrevision
+
+class TestOffreCloudService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Les API externes sont remplacées par le simulateur local.
+        cls.simulateur = ServeurSimulateur(ConfigurationSimulateur())
+        url = cls.simulateur.demarrer()
+        cls.patchs = [patch('business_object.zone_geographique.url_geo', url + "/search"),
+                      patch('business_object.zone_geographique.url_em', url + "/v3/carbon-intensity/latest"),
+                      patch('business_object.zone_geographique.url_em_prev', url + "/v3/carbon-intensity/forecast")]
+        for p in cls.patchs:
+            p.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for p in cls.patchs:
+            p.stop()
+        cls.simulateur.arreter()
+
+    def setUp(self):
+        CachePrevision().vider()
+        self.offre_service = OffreCloudService()
+        self.zone_geo = ZoneGeographique("Marseille")
+        self.fournisseurs_cloud = ["AWS", "GCP"]
+        self.date_visionnage = datetime.now()
+        self.duree = 60
+        self.serveurs = [ServeurCloud("aws-eu-west-3", "Europe (Paris)", "eu-west-3", "AWS", ["FR"], ZoneGeographique("Paris", zone = "FR")),
+                         ServeurCloud("aws-eu-central-1", "Europe (Frankfurt)", "eu-central-1", "AWS", ["FR"], ZoneGeographique("Frankfurt", zone = "DE")),
+                         ServeurCloud("gcp-europe-west2", "London", "europe-west2", "GCP", ["FR"], ZoneGeographique("London", zone = "GB"))]
+
+    @patch('utils.index_serveurs.IndexServeurs.serveurs_eligibles')
+    def test_serveurs_eligibles(self, mock_serveurs_eligibles):
+        mock_serveurs_eligibles.return_value = self.serveurs
+        result = self.offre_service.serveurs_eligibles(self.zone_geo, self.fournisseurs_cloud)
+        self.assertIsInstance(result, list)
+        self.assertTrue(all(isinstance(serveur, ServeurCloud) for serveur in result))
+        mock_serveurs_eligibles.assert_called_once_with("FR", self.fournisseurs_cloud)
+
+    @patch('utils.index_serveurs.IndexServeurs.serveurs_eligibles')
+    def test_serveurs_optimaux(self, mock_serveurs_eligibles):
+        mock_serveurs_eligibles.return_value = self.serveurs
+        result = self.offre_service.serveurs_optimaux(self.zone_geo, self.duree, self.date_visionnage, self.fournisseurs_cloud)
+        self.assertIsInstance(result, dict)
+        self.assertTrue(all(isinstance(key, ServeurCloud) and isinstance(value, float) for key, value in result.items()))
+        self.assertEqual(list(result.values()), sorted(result.values()))
+
+    @patch('business_object.zone_geographique.ZoneGeographique.prevision_zone')
+    @patch('utils.index_serveurs.IndexServeurs.serveurs_eligibles')
+    def test_serveurs_optimaux_une_prevision_par_zone(self, mock_serveurs_eligibles, mock_prevision_zone):
+        self.serveurs += [ServeurCloud("gcp-europe-west9", "Paris", "europe-west9", "GCP", ["FR"], ZoneGeographique("Paris", zone = "FR")),
+                          ServeurCloud("azure-francecentral", "France Central", "francecentral", "Azure", ["FR"], ZoneGeographique("Paris", zone = "FR"))]
+        mock_serveurs_eligibles.return_value = self.serveurs
+        heure = self.date_visionnage.replace(minute = 0, second = 0, microsecond = 0)
+        mock_prevision_zone.return_value = PrevisionCarbone.depuis_liste(
+            [(str(heure + timedelta(hours = h)), 100) for h in range(3)])
+        result = self.offre_service.serveurs_optimaux(self.zone_geo, self.duree, self.date_visionnage, ["AWS", "GCP", "Azure"])
+        self.assertEqual(len(result), 5)
+        self.assertEqual(Counter(appel.args[0] for appel in mock_prevision_zone.call_args_list), {"FR": 1, "DE": 1, "GB": 1})
+
+    @patch('utils.index_serveurs.IndexServeurs.serveurs_eligibles')
+    def test_serveurs_horaires_optimaux(self, mock_serveurs_eligibles):
+        mock_serveurs_eligibles.return_value = self.serveurs
+        result = self.offre_service.serveurs_horaires_optimaux(self.zone_geo, self.duree, self.date_visionnage,
+                                                               nb_resultats = 5, capacite = 2)
+        self.assertEqual(len(result), 5)
+        impacts = [item["impact_carbone"] for item in result]
+        self.assertEqual(impacts, sorted(impacts))
+        self.assertTrue(all(nb <= 2 for nb in Counter(item["serveur"].id_serveur for item in result).values()))
+        self.assertTrue(all(item["date_visionnage"] >= self.date_visionnage.replace(minute = 0, second = 0, microsecond = 0)
+                            for item in result))
+
+    @patch('utils.index_serveurs.IndexServeurs.serveurs_eligibles')
+    def test_serveurs_horaires_optimaux_date_par_defaut(self, mock_serveurs_eligibles):
+        mock_serveurs_eligibles.return_value = self.serveurs
+        # Sans date de visionnage, la recherche part de la date de l'appel et non de celle de l'import.
+        with patch('service.offre_cloud_service.datetime') as mock_datetime:
+            mock_datetime.now.return_value = self.date_visionnage
+            result = self.offre_service.serveurs_horaires_optimaux(self.zone_geo, self.duree, nb_resultats = 3)
+        self.assertEqual(len(result), 3)
+        self.assertTrue(all(item["date_visionnage"] >= self.date_visionnage.replace(second = 0, microsecond = 0)
+                            for item in result))
+
+if __name__ == '__main__':
+    unittest.main()
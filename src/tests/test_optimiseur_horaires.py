@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+from datetime import datetime
+from business_object.prevision_carbone import PrevisionCarbone
+from service.optimiseur_horaires import OptimiseurHoraires
+
+class TestOptimiseurHoraires(unittest.TestCase):
+
+    def setUp(self):
+        self.optimiseur = OptimiseurHoraires([
+            PrevisionCarbone.depuis_liste([("2024-01-01 10:00:00", 100), ("2024-01-01 11:00:00", 50)]),
+            PrevisionCarbone.depuis_liste([("2024-01-01 10:00:00", 300), ("2024-01-01 11:00:00", 20),
+                                           ("2024-01-01 12:00:00", 100)])])
+        self.debut = int(np.datetime64("2024-01-01 10:00:00", "s").astype(np.int64))
+        self.debuts = self.optimiseur.debuts(datetime(2024, 1, 1, 10, 0), 60, 60)
+
+    def test_debuts_union_des_previsions(self):
+        np.testing.assert_array_equal(self.debuts, self.debut + 3600 * np.arange(3))
+
+    def test_matrice(self):
+        np.testing.assert_allclose(self.optimiseur.matrice(self.debuts, 60), [[100, 50, np.nan], [300, 20, 100]])
+
+    def test_meilleurs_sans_capacite(self):
+        # Serveurs 0 et 2 dans la zone 1, serveur 1 dans la zone 0
+        meilleurs = self.optimiseur.meilleurs([1, 0, 1], self.debuts, 60, nb_resultats = 4)
+        self.assertEqual(meilleurs, [(0, 1, 20.0), (2, 1, 20.0), (1, 1, 50.0), (1, 0, 100.0)])
+
+    def test_meilleurs_avec_capacite(self):
+        meilleurs = self.optimiseur.meilleurs([1, 0], self.debuts, 60, nb_resultats = 4, capacite = 1)
+        self.assertEqual(meilleurs, [(0, 1, 20.0), (1, 1, 50.0)])
+
+    def test_meilleurs_exclut_les_fenetres_non_couvertes(self):
+        meilleurs = self.optimiseur.meilleurs([0], self.debuts, 60, nb_resultats = 10)
+        self.assertEqual([j for _, j, _ in meilleurs], [1, 0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+from datetime import datetime
+from unittest.mock import patch
+from business_object.prevision_carbone import PrevisionCarbone
+from business_object.zone_geographique import ZoneGeographique
+
+class TestPrevisionCarbone(unittest.TestCase):
+
+    def setUp(self):
+        self.prevision = PrevisionCarbone.depuis_liste([("2024-01-01 10:00:00", 300), ("2024-01-01 11:00:00", 200),
+                                                        ("2024-01-01 12:00:00", 100)])
+
+    def test_fenetre_a_cheval_sur_deux_heures(self):
+        # 30 minutes à 300 puis 30 minutes à 200
+        self.assertAlmostEqual(self.prevision.intensite_moyenne(datetime(2024, 1, 1, 10, 30), 60), 250)
+
+    def test_debut_a_l_heure_pleine(self):
+        self.assertAlmostEqual(self.prevision.intensite_moyenne(datetime(2024, 1, 1, 11, 0), 60), 200)
+
+    def test_debut_arrondi_a_la_minute_suivante(self):
+        # Fenêtre de 10h59 à 11h01 : une minute à 300 puis une à 200
+        self.assertAlmostEqual(self.prevision.intensite_moyenne(datetime(2024, 1, 1, 10, 58, 30), 2), 250)
+
+    def test_fenetre_jusqu_a_la_fin_de_la_prevision(self):
+        self.assertAlmostEqual(self.prevision.intensite_moyenne(datetime(2024, 1, 1, 10, 0), 180), 200)
+        self.assertTrue(np.isnan(self.prevision.intensite_moyenne(datetime(2024, 1, 1, 10, 0), 181)))
+
+    def test_fenetre_avant_la_prevision(self):
+        self.assertTrue(np.isnan(self.prevision.intensite_moyenne(datetime(2024, 1, 1, 9, 59), 10)))
+
+    def test_moyennes_vectorisees(self):
+        debut = self.prevision.debut
+        np.testing.assert_allclose(self.prevision.moyennes([debut, debut + 3600, debut + 7200], [120, 30, 60]),
+                                   [250, 200, 100])
+
+    def test_debuts_possibles(self):
+        # Premier début aligné sur le quart d'heure suivant, dernier début 90 minutes avant la fin (13h)
+        debuts = self.prevision.debuts_possibles(datetime(2024, 1, 1, 10, 5), 90, 15)
+        self.assertEqual(debuts[0], self.prevision.debut + 900)
+        self.assertEqual(debuts[-1], self.prevision.debut + 5400)
+        self.assertEqual(len(self.prevision.debuts_possibles(datetime(2024, 1, 1, 10, 0), 181)), 0)
+
+    def test_prevision_vide(self):
+        self.assertTrue(np.isnan(PrevisionCarbone.depuis_liste([]).intensite_moyenne(datetime(2024, 1, 1), 10)))
+
+    def test_depuis_epochs(self):
+        prevision = PrevisionCarbone.depuis_epochs(self.prevision.instants, [300, 200, 100])
+        self.assertEqual((prevision.debut, prevision.pas), (self.prevision.debut, 3600))
+        with self.assertRaises(ValueError):
+            PrevisionCarbone.depuis_epochs([0, 3600, 10800], [1, 2, 3])
+
+    @patch('business_object.zone_geographique.SessionHttp')
+    def test_telecharger_prevision_sans_chaines(self, mock_session):
+        reponse = mock_session.return_value.get.return_value
+        reponse.status_code = 200
+        reponse.json.return_value = {"zone": "FR", "forecast": [
+            {"carbonIntensity": 300, "datetime": "2024-01-01T10:00:00.000Z"},
+            {"carbonIntensity": 200, "datetime": "2024-01-01T11:00:00.000Z"},
+            {"carbonIntensity": 100, "datetime": "2024-01-01T12:00:00.000Z"}]}
+        prevision = ZoneGeographique.telecharger_prevision("FR")
+        self.assertEqual(prevision.debut, self.prevision.debut)
+        np.testing.assert_array_equal(prevision.intensites, [300.0, 200.0, 100.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 from business_object.zone_geographique import ZoneGeographique
 from business_object.serveur_cloud import ServeurCloud
 
@@ -21,6 +22,23 @@ class TestServeurCloud(unittest.TestCase):
         self.assertListEqual(self.serveur.zone_disponibilite, self.zone_disponibilite)
         self.assertEqual(self.serveur.localisation, self.localisation)
 
+    @patch('utils.session_http.SessionHttp.get')
+    def test_zone_pre_calculee(self, mock_get):
+        serveur = ServeurCloud(self.id_serveur, self.nom, self.code_region, self.fournisseur_cloud, self.zone_disponibilite,
+                               ZoneGeographique("Paris", zone = "FR", latitude = 48.86, longitude = 2.35))
+        self.assertEqual(serveur.zone, "FR")
+        mock_get.assert_not_called()
+
+    @patch('business_object.zone_geographique.ZoneGeographique.coordonnees_to_zone')
+    @patch('business_object.zone_geographique.ZoneGeographique.coordonnees')
+    @patch('utils.cache_zone.CacheZone.trouver')
+    def test_zone_sans_pre_calcul(self, mock_trouver, mock_coordonnees, mock_coordonnees_to_zone):
+        mock_trouver.return_value = None
+        mock_coordonnees.return_value = (48.86, 2.35)
+        mock_coordonnees_to_zone.return_value = "FR"
+        self.assertEqual(self.serveur.zone, "FR")
+        mock_coordonnees_to_zone.assert_called_once_with(48.86, 2.35)
+
     def test_repr(self):
         representation = repr(self.serveur)
         self.assertIsInstance(representation, str)
@@ -0,0 +1,21 @@
+import unittest
+from unittest.mock import patch
+from utils.session_http import SessionHttp
+
+class TestSessionHttp(unittest.TestCase):
+
+    @patch('requests.Session.get')
+    def test_timeout_par_defaut(self, mock_get):
+        SessionHttp().get("https://nominatim.openstreetmap.org/status")
+        mock_get.assert_called_once_with("https://nominatim.openstreetmap.org/status", timeout = SessionHttp().timeout)
+
+    @patch('requests.Session.get')
+    def test_timeout_explicite(self, mock_get):
+        SessionHttp().get("https://api.electricitymap.org/health", timeout = 60)
+        mock_get.assert_called_once_with("https://api.electricitymap.org/health", timeout = 60)
+
+    def test_session_partagee(self):
+        self.assertIs(SessionHttp(), SessionHttp())
+
+if __name__ == '__main__':
+    unittest.main()
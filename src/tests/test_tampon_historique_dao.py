@@ -0,0 +1,64 @@
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from business_object.info_video import InfoVideo
+from business_object.zone_geographique import ZoneGeographique
+from dao.tampon_historique_dao import TamponHistoriqueDao
+
+environnement = {"HISTORIQUE_TAMPON_TAILLE": "2", "HISTORIQUE_TAMPON_INTERVALLE": "60",
+                 "HISTORIQUE_TAMPON_MAX": "3", "HISTORIQUE_TAMPON_ESSAIS": "2"}
+
+class TestTamponHistoriqueDao(unittest.TestCase):
+
+    def setUp(self):
+        with patch.dict(os.environ, environnement), patch('dao.tampon_historique_dao.dotenv.load_dotenv'):
+            # Instance indépendante du singleton, sans thread d'enregistrement.
+            self.tampon = TamponHistoriqueDao.__new__(TamponHistoriqueDao)
+            self.tampon.__init__()
+        self.tampon._arret = True
+        self.donnees = InfoVideo(60, 720, "Wifi", "Mobile", ZoneGeographique("Paris", "France"), datetime.now())
+
+    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.creer_lignes')
+    def test_vider_par_lots(self, mock_creer_lignes):
+        mock_creer_lignes.side_effect = len
+        for _ in range(3):
+            self.assertTrue(self.tampon.ajouter(self.donnees, 1.5, "cle"))
+        self.assertEqual(self.tampon.vider(), 3)
+        self.assertEqual(mock_creer_lignes.call_count, 2)
+        lignes = mock_creer_lignes.call_args_list[0][0][0]
+        self.assertLess(lignes[0][1], lignes[1][1])
+        self.assertEqual(self.tampon.statistiques()["profondeur"], 0)
+        self.assertEqual(self.tampon.statistiques()["lignes_ecrites"], 3)
+
+    def test_file_bornee(self):
+        for _ in range(3):
+            self.tampon.ajouter(self.donnees, 1.5, "cle")
+        self.assertFalse(self.tampon.ajouter(self.donnees, 1.5, "cle"))
+        self.assertEqual(self.tampon.statistiques()["lignes_perdues"], 1)
+
+    @patch('dao.tampon_historique_dao.time.sleep')
+    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.creer_lignes')
+    def test_echec_reporte(self, mock_creer_lignes, mock_sleep):
+        mock_creer_lignes.side_effect = Exception("connexion perdue")
+        self.tampon.ajouter(self.donnees, 1.5, "cle")
+        self.assertEqual(self.tampon.vider(), 0)
+        self.assertEqual(self.tampon.statistiques()["echecs"], 2)
+        self.assertEqual(self.tampon.statistiques()["profondeur"], 1)
+        mock_creer_lignes.side_effect = len
+        self.assertEqual(self.tampon.vider(), 1)
+
+    @patch('dao.historique_consommateur_dao.HistoriqueConsommateurDao.creer_lignes')
+    def test_lignes_rejetees(self, mock_creer_lignes):
+        # Une des deux lignes du lot est écartée par la base (clé API supprimée)
+        mock_creer_lignes.return_value = 1
+        self.tampon.ajouter(self.donnees, 1.5, "cle")
+        self.tampon.ajouter(self.donnees, 1.5, "cle_supprimee")
+        self.assertEqual(self.tampon.vider(), 1)
+        statistiques = self.tampon.statistiques()
+        self.assertEqual(statistiques["lignes_ecrites"], 1)
+        self.assertEqual(statistiques["lignes_rejetees"], 1)
+        self.assertEqual(statistiques["lignes_perdues"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import unittest
+from unittest.mock import patch, mock_open
+import pandas as pd
+from utils.traitement_database import TraitementDatabase
+
+class TestTraitementDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.regions = pd.DataFrame({
+            "identifiant": ["eu-west-3", "europe-west10-a", "sans-zone"],
+            "fournisseur": ["AWS", "GCP", "Azure"],
+            "zone_disponibilite": ["Europe", "Europe", "Europe"],
+            "nom": ["Europe (Paris)", "Berlin", "Inconnue"],
+            "code_region": ["FR-IDF", "DE-BE", "XX"],
+            "ville": ["Paris", "Berlin", "Nulle part"],
+            "zone_disponibilite_em": ["('FR','DE','BE')", "('DE')", None]})
+        self.zones = pd.DataFrame({
+            "identifiant": ["eu-west-3", "europe-west10-a"],
+            "latitude": [48.86, 52.52],
+            "longitude": [2.35, 13.40],
+            "zone_em": ["FR", "DE"]})
+
+    def executer(self, methode, migrations = ()):
+        """
+        Lance la ré-initialisation ou la migration sans base de données et renvoie les tables écrites par to_sql.
+        """
+        tables = {}
+
+        def lire_csv(chemin, **kwargs):
+            return (self.zones if "zones_regions" in chemin else self.regions).copy()
+
+        def ecrire(df, nom, *args, **kwargs):
+            tables[nom] = df.copy()
+
+        with patch("builtins.open", mock_open(read_data = "")), \
+             patch.dict(os.environ, {"HOST": "h", "PORT": "5432", "DATABASE": "d", "DB_USER": "u", "PASSWORD": "p"}), \
+             patch("utils.traitement_database.dotenv.load_dotenv"), \
+             patch("utils.traitement_database.DBConnection"), \
+             patch("utils.traitement_database.create_engine"), \
+             patch("utils.traitement_database.IndexServeurs") as mock_index, \
+             patch("utils.traitement_database.pd.read_csv", side_effect = lire_csv), \
+             patch("utils.traitement_database.os.listdir", return_value = list(migrations)), \
+             patch.object(pd.DataFrame, "to_sql", autospec = True, side_effect = ecrire):
+            self.assertTrue(getattr(TraitementDatabase(), methode)())
+        mock_index.return_value.construire.assert_called_once()
+        return tables
+
+    def test_serveur_zone(self):
+        serveur_zone = self.executer("lancer")["serveur_zone"]
+        self.assertEqual(list(serveur_zone.columns), ["identifiant", "zone_em"])
+        self.assertEqual(sorted(map(tuple, serveur_zone.values.tolist())),
+                         [("eu-west-3", "BE"), ("eu-west-3", "DE"), ("eu-west-3", "FR"), ("europe-west10-a", "DE")])
+
+    def test_regions_fournisseurs_cloud(self):
+        regions = self.executer("lancer")["regions_fournisseurs_cloud"].set_index("identifiant")
+        self.assertEqual(list(regions.columns), ["fournisseur", "nom", "code_region", "ville", "latitude", "longitude", "zone_em"])
+        self.assertEqual(regions.loc["eu-west-3", "zone_em"], "FR")
+        self.assertEqual(regions.loc["europe-west10-a", "latitude"], 52.52)
+        # Une région absente du fichier des zones est conservée, sans position ni zone
+        self.assertTrue(regions.loc["sans-zone", ["latitude", "longitude", "zone_em"]].isna().all())
+
+    def test_migrer_recharge_regions(self):
+        # Une base migrée reçoit les tables des régions au nouveau format sans être ré-initialisée
+        tables = self.executer("migrer", ["001_prefixe_cles_api.sql", "LISEZMOI.txt"])
+        self.assertEqual(set(tables), {"regions_fournisseurs_cloud", "serveur_zone"})
+        self.assertIn("zone_em", tables["regions_fournisseurs_cloud"].columns)
+        self.assertEqual(len(tables["serveur_zone"]), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,32 +1,78 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from business_object.zone_geographique import ZoneGeographique
+from business_object.prevision_carbone import PrevisionCarbone
+from simulateur_api.serveur import ConfigurationSimulateur, ServeurSimulateur
+from utils.cache_prevision import CachePrevision
+
 class TestZoneGeographique(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        # Les API externes sont remplacées par le simulateur local.
+        cls.simulateur = ServeurSimulateur(ConfigurationSimulateur())
+        url = cls.simulateur.demarrer()
+        cls.patchs = [patch('business_object.zone_geographique.url_geo', url + "/search"),
+                      patch('business_object.zone_geographique.url_em', url + "/v3/carbon-intensity/latest"),
+                      patch('business_object.zone_geographique.url_em_prev', url + "/v3/carbon-intensity/forecast")]
+        for p in cls.patchs:
+            p.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for p in cls.patchs:
+            p.stop()
+        cls.simulateur.arreter()
+
     def setUp(self):
         self.ville = "Paris"
         self.pays = "France"
         self.zone_geo = ZoneGeographique(self.ville, self.pays)
+        self.simulateur.app.state.configuration = ConfigurationSimulateur()
+        CachePrevision().vider()
+
+    def test_coordonnees(self):
+        latitude, longitude = self.zone_geo.coordonnees()
+        self.assertAlmostEqual(latitude, 48.8588897)
+        self.assertAlmostEqual(longitude, 2.3200410)
+
+    def test_name_to_zone(self):
+        zone = ZoneGeographique("Berlin", "Allemagne").name_to_zone()
+        self.assertEqual(zone, "DE")
+
+    def test_ville_inconnue(self):
+        with self.assertRaises(ValueError, msg = "Non reconnaissance de votre position géographique"):
+            ZoneGeographique("Atlantide", "France").coordonnees()
+
+    def test_coordonnees_to_zone(self):
+        self.assertEqual(ZoneGeographique.coordonnees_to_zone(48.8588897, 2.3200410), "FR")
+        self.assertEqual(ZoneGeographique.coordonnees_to_zone(52.52, 13.40), "DE")
+
+    @patch('utils.session_http.SessionHttp.get')
+    def test_coordonnees_to_zone_hors_limites(self, mock_get):
+        # Electricity Map refuse les coordonnées hors des bornes de latitude et longitude
+        mock_get.return_value = MagicMock(status_code = 400)
+        with self.assertRaises(ValueError, msg = "Non accès aux données provenant de l'API Electricity Map"):
+            ZoneGeographique.coordonnees_to_zone(120, 400)
+        self.assertEqual(mock_get.call_args.kwargs["params"], {"lat": 120, "lon": 400})
+
+    @patch('utils.session_http.SessionHttp.get')
+    def test_coordonnees_to_zone_inconnue(self, mock_get):
+        # Point sans zone electricity map (en pleine mer)
+        mock_get.return_value = MagicMock(status_code = 404)
+        with self.assertRaises(ValueError, msg = "Non accès aux données provenant de l'API Electricity Map"):
+            ZoneGeographique.coordonnees_to_zone(-48.87, -123.39)
+
+    def test_prevision_carbone(self):
+        prevision = ZoneGeographique.telecharger_prevision("FR")
+        self.assertIsInstance(prevision, PrevisionCarbone)
+        self.assertEqual(len(prevision.intensites), 72)
+        self.assertEqual(prevision.pas, 3600)
 
-    @patch('requests.get')
-    def test_name_to_zone(self, mock_get):
-        # Configurer le mock pour simuler une réponse API réussie
-        mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = [{"lat": "48.8566", "lon": "2.3522"}]
-        zone = self.zone_geo.name_to_zone()
-        self.assertIsNotNone(zone)
-        mock_get.assert_called_with("https://nominatim.openstreetmap.org/search", params={'city': self.ville, 'country': self.pays, 'format': 'json'})
-
-    @patch('requests.get')
-    def test_prevision_carbone(self, mock_get):
-        # Simuler deux appels API : un pour Nominatim et un pour ElectricityMap
-        mock_get.side_effect = [
-            # Réponse de Nominatim
-            MagicMock(status_code=200, json=MagicMock(return_value=[{"lat": "48.8566", "lon": "2.3522"}])),
-            # Réponse de ElectricityMap
-            MagicMock(status_code=200, json=MagicMock(return_value={"forecast": [{"datetime": "2022-01-01T00:00:00Z", "carbonIntensity": 100}]}))
-        ]
-        prevision = self.zone_geo.prevision_carbone()
-        self.assertIsNotNone(prevision)
-        self.assertEqual(len(prevision), 1)
-        self.assertEqual(prevision[0][1], 100)
+    def test_prevision_carbone_erreur_api(self):
+        self.simulateur.app.state.configuration = ConfigurationSimulateur(taux_erreur = 1)
+        with self.assertRaises(ValueError, msg = "Non accès aux données provenant de l'API Electricity Map"):
+            ZoneGeographique.telecharger_prevision("FR")
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,165 @@
+import hashlib
+import hmac
+import os
+import secrets
+import dotenv
+from threading import Lock
+from utils.cache_ttl import CacheTTL
+from utils.singleton import Singleton
+
+
+class CacheCles(CacheTTL, metaclass = Singleton):
+    """
+    Cache partagé des clés API déjà vérifiées : il associe une empreinte de la clé présentée
+    à la clé API hachée et à l'identifiant de son propriétaire, pour éviter une vérification bcrypt
+    à chaque requête. La clé en clair n'est jamais conservée : l'empreinte est un HMAC-SHA256
+    dont le secret est tiré au hasard au démarrage du processus.
+
+    La configuration se fait par les variables d'environnement :
+    - CACHE_CLES_TTL : durée de vie d'une entrée en secondes (par défaut 60).
+    - CACHE_CLES_TAILLE : nombre maximal de clés conservées (par défaut 4096).
+
+    Attributes
+    ----------
+    verifications : int
+        Nombre de vérifications complètes (base de données et bcrypt) effectuées.
+    duree_verifications : float
+        Durée cumulée des vérifications complètes en secondes.
+    duree_max_verification : float
+        Durée de la vérification complète la plus longue en secondes.
+
+    Methods
+    -------
+    trouver(type_utilisateur, cle_api) -> dict | None
+        Renvoie la clé hachée et l'identifiant associés à une clé déjà vérifiée.
+    generation() -> int
+        Renvoie le numéro de génération du cache, incrémenté à chaque invalidation.
+    enregistrer(type_utilisateur, cle_api, cle_hachee, id_utilisateur, generation) -> bool
+        Ajoute une clé vérifiée au cache, sauf si une invalidation a eu lieu pendant sa vérification.
+    invalider(id_utilisateur)
+        Supprime du cache les clés d'un utilisateur, ou toutes les clés.
+    mesurer_verification(duree)
+        Comptabilise la durée d'une vérification complète.
+    """
+    def __init__(self):
+        dotenv.load_dotenv(override = True)
+        super().__init__(duree_vie = float(os.environ.get("CACHE_CLES_TTL", 60)),
+                         taille_max = int(os.environ.get("CACHE_CLES_TAILLE", 4096)))
+        self._secret = secrets.token_bytes(32)
+        # Les invalidations et les enregistrements sont sérialisés pour qu'une vérification commencée
+        # avant une invalidation ne puisse pas remettre en cache une clé supprimée.
+        self._verrou_generation = Lock()
+        self._generation = 0
+        self._verrou_mesures = Lock()
+        self.verifications = 0
+        self.duree_verifications = 0.0
+        self.duree_max_verification = 0.0
+
+    def empreinte(self, type_utilisateur: str, cle_api: str) -> bytes:
+        """
+        Calcule l'empreinte HMAC-SHA256 d'une clé présentée pour un type d'utilisateur.
+        """
+        message = f"{type_utilisateur}:{cle_api}".encode("utf-8")
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def trouver(self, type_utilisateur: str, cle_api: str) -> dict | None:
+        """
+        Renvoie la clé hachée et l'identifiant associés à une clé déjà vérifiée.
+
+        Parameters
+        ----------
+        type_utilisateur : str
+            Type de l'utilisateur.
+        cle_api : str
+            Clé API présentée.
+
+        Returns
+        -------
+        dict | None
+            Clé API hachée (cle_api) et identifiant (id_utilisateur), None si la clé n'est pas en cache.
+        """
+        return self.obtenir(self.empreinte(type_utilisateur, cle_api))
+
+    def generation(self) -> int:
+        """
+        Renvoie le numéro de génération du cache, à lire avant de commencer la vérification d'une clé.
+        """
+        with self._verrou_generation:
+            return self._generation
+
+    def enregistrer(self, type_utilisateur: str, cle_api: str, cle_hachee: str, id_utilisateur: int,
+                    generation: int | None = None) -> bool:
+        """
+        Ajoute une clé vérifiée au cache, sauf si le cache a été invalidé depuis le début de sa vérification.
+
+        Parameters
+        ----------
+        type_utilisateur : str
+            Type de l'utilisateur.
+        cle_api : str
+            Clé API présentée.
+        cle_hachee : str
+            Clé API hachée correspondante.
+        id_utilisateur : int
+            Identifiant du propriétaire de la clé.
+        generation : int | None, optional
+            Génération lue avant la vérification (voir generation), par défaut la génération courante.
+
+        Returns
+        -------
+        bool
+            True si la clé a été ajoutée, False si une invalidation a eu lieu pendant la vérification.
+        """
+        with self._verrou_generation:
+            if generation is not None and generation != self._generation:
+                return False
+            self.ajouter(self.empreinte(type_utilisateur, cle_api),
+                         {"cle_api": cle_hachee, "id_utilisateur": id_utilisateur})
+            return True
+
+    def invalider(self, id_utilisateur: int | None = None):
+        """
+        Supprime du cache les clés d'un utilisateur, ou toutes les clés si aucun identifiant n'est donné.
+
+        Parameters
+        ----------
+        id_utilisateur : int | None, optional
+            Identifiant de l'utilisateur dont la clé a été supprimée.
+        """
+        with self._verrou_generation:
+            self._generation += 1
+            if id_utilisateur is None:
+                self.vider()
+            else:
+                self.supprimer_si(lambda valeur: valeur["id_utilisateur"] == id_utilisateur)
+
+    def mesurer_verification(self, duree: float):
+        """
+        Comptabilise la durée d'une vérification complète.
+
+        Parameters
+        ----------
+        duree : float
+            Durée de la vérification en secondes.
+        """
+        with self._verrou_mesures:
+            self.verifications += 1
+            self.duree_verifications += duree
+            self.duree_max_verification = max(self.duree_max_verification, duree)
+
+    def statistiques(self) -> dict:
+        """
+        Renvoie les compteurs d'utilisation du cache et la latence des vérifications complètes.
+
+        Returns
+        -------
+        dict
+            Compteurs du cache, nombre de vérifications et durées moyenne et maximale en millisecondes.
+        """
+        statistiques = super().statistiques()
+        with self._verrou_mesures:
+            statistiques["verifications"] = self.verifications
+            statistiques["duree_moyenne_verification_ms"] = (
+                round(1000 * self.duree_verifications / self.verifications, 3) if self.verifications else 0.0)
+            statistiques["duree_max_verification_ms"] = round(1000 * self.duree_max_verification, 3)
+        return statistiques
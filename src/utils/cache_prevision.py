@@ -0,0 +1,139 @@
+import os
+import time
+import dotenv
+from threading import Event, Lock, Thread
+from typing import Callable
+from business_object.prevision_carbone import PrevisionCarbone
+from utils.singleton import Singleton
+
+
+class _Vol:
+    """
+    Téléchargement en cours d'une prévision, partagé par toutes les requêtes qui attendent la même zone.
+    """
+    def __init__(self):
+        self.evenement = Event()
+        self.resultat = None
+        self.erreur = None
+
+
+class CachePrevision(metaclass = Singleton):
+    """
+    Cache partagé des prévisions d'intensité carbone par zone electricity map.
+    Les prévisions ne changent qu'une fois par heure : une entrée est valide jusqu'à la prochaine heure pleine.
+
+    - Les requêtes simultanées pour une même zone ne déclenchent qu'un seul appel à l'API ("single-flight").
+    - Une entrée expirée depuis moins de CACHE_PREVISION_PERIME_MAX secondes est renvoyée immédiatement
+      pendant qu'un rafraîchissement est lancé en arrière-plan.
+
+    La configuration se fait par les variables d'environnement :
+    - CACHE_PREVISION_DECALAGE : secondes ajoutées après l'heure pleine avant expiration (par défaut 0).
+    - CACHE_PREVISION_PERIME_MAX : durée en secondes pendant laquelle une entrée expirée peut encore
+      être servie (par défaut 3600).
+
+    Methods
+    -------
+    obtenir(zone, chargement) -> PrevisionCarbone
+        Renvoie la prévision de la zone, en la téléchargeant avec la fonction chargement si besoin.
+    vider()
+        Supprime toutes les prévisions en cache.
+    statistiques() -> dict
+        Renvoie les compteurs d'utilisation du cache.
+    """
+    def __init__(self):
+        dotenv.load_dotenv(override = True)
+        self.decalage = float(os.environ.get("CACHE_PREVISION_DECALAGE", 0))
+        self.perime_max = float(os.environ.get("CACHE_PREVISION_PERIME_MAX", 3600))
+        self.succes = 0
+        self.perimes = 0
+        self.echecs = 0
+        self.telechargements = 0
+        self._entrees = {}
+        self._en_cours = {}
+        self._verrou = Lock()
+
+    def _expiration(self, maintenant: float) -> float:
+        """
+        Renvoie la date d'expiration d'une prévision téléchargée à l'instant maintenant : la prochaine heure pleine.
+        """
+        return (maintenant // 3600 + 1) * 3600 + self.decalage
+
+    def obtenir(self, zone: str, chargement: Callable[[str], PrevisionCarbone]) -> PrevisionCarbone:
+        """
+        Renvoie la prévision de la zone, en la téléchargeant avec la fonction chargement si besoin.
+        La prévision renvoyée est partagée entre les requêtes et ne doit pas être modifiée.
+
+        Parameters
+        ----------
+        zone : str
+            Zone electricity map.
+        chargement : Callable[[str], PrevisionCarbone]
+            Fonction qui télécharge la prévision d'une zone.
+
+        Returns
+        -------
+        PrevisionCarbone
+            Prévision de l'impact carbone de la zone.
+        """
+        maintenant = time.time()
+        with self._verrou:
+            entree = self._entrees.get(zone)
+            if entree is not None:
+                prevision, expiration = entree
+                if maintenant < expiration:
+                    self.succes += 1
+                    return prevision
+                if maintenant < expiration + self.perime_max:
+                    self.perimes += 1
+                    if zone not in self._en_cours:
+                        vol = self._en_cours[zone] = _Vol()
+                        Thread(target = self._telecharger, args = (zone, vol, chargement), daemon = True).start()
+                    return prevision
+            self.echecs += 1
+            vol = self._en_cours.get(zone)
+            meneur = vol is None
+            if meneur:
+                vol = self._en_cours[zone] = _Vol()
+
+        if meneur:
+            self._telecharger(zone, vol, chargement)
+        vol.evenement.wait()
+        if vol.erreur is not None:
+            raise vol.erreur
+        return vol.resultat
+
+    def _telecharger(self, zone: str, vol: _Vol, chargement: Callable[[str], PrevisionCarbone]):
+        """
+        Télécharge la prévision de la zone, l'enregistre puis réveille les requêtes en attente.
+        """
+        try:
+            vol.resultat = chargement(zone)
+            with self._verrou:
+                self._entrees[zone] = (vol.resultat, self._expiration(time.time()))
+        except Exception as e:
+            vol.erreur = e
+        finally:
+            with self._verrou:
+                self.telechargements += 1
+                del self._en_cours[zone]
+            vol.evenement.set()
+
+    def vider(self):
+        """
+        Supprime toutes les prévisions en cache.
+        """
+        with self._verrou:
+            self._entrees.clear()
+
+    def statistiques(self) -> dict:
+        """
+        Renvoie les compteurs d'utilisation du cache.
+
+        Returns
+        -------
+        dict
+            Nombre de zones, de succès, de prévisions périmées servies, d'échecs et de téléchargements.
+        """
+        with self._verrou:
+            return {"taille": len(self._entrees), "succes": self.succes, "perimes": self.perimes,
+                    "echecs": self.echecs, "telechargements": self.telechargements}
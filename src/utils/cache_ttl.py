@@ -0,0 +1,154 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+
+class CacheTTL:
+    """
+    Cache clé-valeur en mémoire, borné en taille (éviction LRU) et dont les entrées expirent après une durée de vie.
+    Les accès sont protégés par un verrou pour pouvoir être partagés entre les requêtes de l'API.
+
+    Attributes
+    ----------
+    duree_vie : float
+        Durée de vie d'une entrée en secondes.
+    taille_max : int
+        Nombre maximal d'entrées conservées, la moins récemment utilisée est évincée au-delà.
+    succes : int
+        Nombre de lectures ayant trouvé une entrée valide.
+    echecs : int
+        Nombre de lectures n'ayant pas trouvé d'entrée valide (absente ou expirée).
+
+    Methods
+    -------
+    obtenir(cle) -> object | None
+        Renvoie la valeur associée à la clé si elle est présente et non expirée.
+    ajouter(cle, valeur, date_maj)
+        Ajoute ou remplace une entrée du cache.
+    supprimer(cle) -> bool
+        Supprime une entrée du cache.
+    supprimer_si(condition) -> int
+        Supprime les entrées dont la valeur vérifie la condition.
+    vider()
+        Supprime toutes les entrées du cache.
+    statistiques() -> dict
+        Renvoie les compteurs d'utilisation du cache.
+    """
+    def __init__(self, duree_vie: float, taille_max: int):
+        self.duree_vie = duree_vie
+        self.taille_max = taille_max
+        self.succes = 0
+        self.echecs = 0
+        self._entrees = OrderedDict()
+        self._verrou = Lock()
+
+    def obtenir(self, cle):
+        """
+        Renvoie la valeur associée à la clé si elle est présente et non expirée.
+
+        Parameters
+        ----------
+        cle : hashable
+            Clé de l'entrée recherchée.
+
+        Returns
+        -------
+        object | None
+            Valeur associée à la clé, None si elle est absente ou expirée.
+        """
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                self.echecs += 1
+                return None
+            valeur, date_maj = entree
+            if time.time() - date_maj > self.duree_vie:
+                del self._entrees[cle]
+                self.echecs += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self.succes += 1
+            return valeur
+
+    def ajouter(self, cle, valeur, date_maj: float | None = None):
+        """
+        Ajoute ou remplace une entrée du cache.
+
+        Parameters
+        ----------
+        cle : hashable
+            Clé de l'entrée.
+        valeur : object
+            Valeur à conserver.
+        date_maj : float | None, optional
+            Date de mise à jour de la valeur en secondes depuis l'epoch, par défaut l'instant présent.
+        """
+        if date_maj is None:
+            date_maj = time.time()
+        with self._verrou:
+            self._entrees[cle] = (valeur, date_maj)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last = False)
+
+    def supprimer(self, cle) -> bool:
+        """
+        Supprime une entrée du cache.
+
+        Parameters
+        ----------
+        cle : hashable
+            Clé de l'entrée à supprimer.
+
+        Returns
+        -------
+        bool
+            True si l'entrée existait, False sinon.
+        """
+        with self._verrou:
+            return self._entrees.pop(cle, None) is not None
+
+    def supprimer_si(self, condition) -> int:
+        """
+        Supprime les entrées dont la valeur vérifie la condition.
+
+        Parameters
+        ----------
+        condition : Callable[[object], bool]
+            Fonction appliquée à chaque valeur du cache.
+
+        Returns
+        -------
+        int
+            Nombre d'entrées supprimées.
+        """
+        with self._verrou:
+            cles = [cle for cle, (valeur, _) in self._entrees.items() if condition(valeur)]
+            for cle in cles:
+                del self._entrees[cle]
+            return len(cles)
+
+    def vider(self):
+        """
+        Supprime toutes les entrées du cache.
+        """
+        with self._verrou:
+            self._entrees.clear()
+
+    def statistiques(self) -> dict:
+        """
+        Renvoie les compteurs d'utilisation du cache.
+
+        Returns
+        -------
+        dict
+            Nombre d'entrées, de succès, d'échecs et taux de succès.
+        """
+        with self._verrou:
+            total = self.succes + self.echecs
+            return {"taille": len(self._entrees), "taille_max": self.taille_max,
+                    "succes": self.succes, "echecs": self.echecs,
+                    "taux_succes": round(self.succes / total, 3) if total else 0.0}
+
+    def __len__(self):
+        return len(self._entrees)
@@ -0,0 +1,95 @@
+import os
+import dotenv
+from datetime import datetime
+from utils.cache_ttl import CacheTTL
+from utils.singleton import Singleton
+
+
+class CacheZone(CacheTTL, metaclass = Singleton):
+    """
+    Cache partagé associant une ville (et son pays) à sa zone electricity map.
+    La zone d'une ville ne change quasiment jamais : le cache évite le géocodage Nominatim et l'appel
+    Electricity Map correspondant à chaque requête.
+
+    La configuration se fait par les variables d'environnement :
+    - CACHE_ZONE_TTL : durée de vie d'une entrée en secondes (par défaut 7 jours).
+    - CACHE_ZONE_TAILLE : nombre maximal de villes conservées (par défaut 1024).
+    - CACHE_ZONE_PERSISTANT : "True" pour enregistrer les zones dans la table projet.cache_zone
+      et recharger le cache au démarrage (par défaut "False").
+
+    Methods
+    -------
+    trouver(ville, pays) -> str | None
+        Renvoie la zone electricity map de la ville si elle est en cache.
+    enregistrer(ville, pays, zone)
+        Ajoute la zone electricity map de la ville au cache.
+    charger()
+        Recharge le cache depuis la base de données.
+    """
+    def __init__(self):
+        dotenv.load_dotenv(override = True)
+        super().__init__(duree_vie = float(os.environ.get("CACHE_ZONE_TTL", 7 * 24 * 3600)),
+                         taille_max = int(os.environ.get("CACHE_ZONE_TAILLE", 1024)))
+        self.persistant = os.environ.get("CACHE_ZONE_PERSISTANT", "False") == "True"
+        if self.persistant:
+            self.charger()
+
+    @staticmethod
+    def cle(ville: str, pays: str | None) -> tuple:
+        """
+        Normalise le couple (ville, pays) pour que "Paris" et " paris " partagent la même entrée.
+        """
+        return (ville.strip().casefold(), (pays or "").strip().casefold())
+
+    def trouver(self, ville: str, pays: str | None = None) -> str | None:
+        """
+        Renvoie la zone electricity map de la ville si elle est en cache.
+
+        Parameters
+        ----------
+        ville : str
+            Nom de la ville.
+        pays : str | None, optional
+            Nom du pays.
+
+        Returns
+        -------
+        str | None
+            Zone electricity map, None si absente ou expirée.
+        """
+        return self.obtenir(self.cle(ville, pays))
+
+    def enregistrer(self, ville: str, pays: str | None, zone: str):
+        """
+        Ajoute la zone electricity map de la ville au cache, et à la base de données si le cache est persistant.
+
+        Parameters
+        ----------
+        ville : str
+            Nom de la ville.
+        pays : str | None
+            Nom du pays.
+        zone : str
+            Zone electricity map comprenant la ville.
+        """
+        cle = self.cle(ville, pays)
+        self.ajouter(cle, zone)
+        if self.persistant:
+            from dao.cache_zone_dao import CacheZoneDao
+            try:
+                CacheZoneDao().creer(cle[0], cle[1], zone, datetime.now())
+            except Exception:
+                # La persistance est facultative : la zone reste disponible en mémoire.
+                pass
+
+    def charger(self):
+        """
+        Recharge le cache depuis la base de données avec les zones les plus récentes encore valides.
+        """
+        from dao.cache_zone_dao import CacheZoneDao
+        try:
+            enregistrements = CacheZoneDao().trouver_recents(self.taille_max)
+        except Exception:
+            return
+        for row in enregistrements:
+            self.ajouter((row["ville"], row["pays"]), row["zone"], row["date_maj"].timestamp())
@@ -0,0 +1,64 @@
+from threading import Lock
+from business_object.serveur_cloud import ServeurCloud
+from utils.singleton import Singleton
+
+
+class IndexServeurs(metaclass = Singleton):
+    """
+    Index inversé en mémoire associant chaque zone electricity map aux serveurs qui la desservent, par fournisseur cloud.
+    Il est construit une seule fois depuis la table projet.regions_fournisseurs_cloud, puis remplacé d'un seul bloc
+    lorsque la table est rechargée, de sorte qu'une requête ne voit jamais un index à moitié construit.
+
+    Methods
+    -------
+    construire()
+        (Re)construit l'index depuis la base de données.
+    serveurs_eligibles(zone, fournisseurs_cloud) -> list[ServeurCloud]
+        Renvoie les serveurs des fournisseurs dont la zone de disponibilité comprend la zone.
+    """
+    def __init__(self):
+        self._index = None
+        self._verrou = Lock()
+
+    def construire(self):
+        """
+        (Re)construit l'index depuis la base de données.
+        """
+        from dao.serveur_dao import ServeurDao
+
+        index = {}
+        for serveur in ServeurDao().trouver_tout():
+            for zone in serveur.zone_disponibilite:
+                index.setdefault(zone, {}).setdefault(serveur.fournisseur_cloud, []).append(serveur)
+        # Remplacement atomique : les requêtes en cours gardent l'ancienne version.
+        self._index = {zone: {fournisseur: tuple(serveurs) for fournisseur, serveurs in par_fournisseur.items()}
+                       for zone, par_fournisseur in index.items()}
+
+    def serveurs_eligibles(self, zone: str, fournisseurs_cloud: list[str]) -> list[ServeurCloud]:
+        """
+        Renvoie les serveurs des fournisseurs dont la zone de disponibilité comprend la zone.
+
+        Parameters
+        ----------
+        zone : str
+            Zone electricity map du consommateur de VOD.
+        fournisseurs_cloud : list[str]
+            Liste des fournisseurs cloud.
+
+        Returns
+        -------
+        list[ServeurCloud]
+            Liste des serveurs éligibles.
+        """
+        index = self._index
+        if index is None:
+            with self._verrou:
+                if self._index is None:
+                    self.construire()
+            index = self._index
+
+        par_fournisseur = index.get(zone, {})
+        serveurs_eligibles = []
+        for fournisseur in fournisseurs_cloud:
+            serveurs_eligibles.extend(par_fournisseur.get(fournisseur, ()))
+        return serveurs_eligibles
@@ -0,0 +1,57 @@
+import os
+import dotenv
+import requests
+from requests.adapters import HTTPAdapter
+from utils.singleton import Singleton
+
+
+class SessionHttp(metaclass = Singleton):
+    """
+    Session HTTP partagée par les appels aux API Nominatim et Electricity Map.
+    Les connexions TCP/TLS sont conservées dans un pool et réutilisées d'une requête à l'autre
+    au lieu d'être ouvertes à chaque appel de requests.get.
+
+    La configuration se fait par les variables d'environnement :
+    - HTTP_POOL_TAILLE : nombre de connexions conservées par hôte (par défaut 20).
+    - HTTP_TIMEOUT : délai maximal d'un appel en secondes, quand l'appelant n'en précise pas (par défaut 30).
+
+    Methods
+    -------
+    get(url, **kwargs) -> requests.Response
+        Effectue une requête GET en réutilisant les connexions du pool.
+    fermer()
+        Ferme les connexions du pool.
+    """
+    def __init__(self):
+        dotenv.load_dotenv(override = True)
+        taille = int(os.environ.get("HTTP_POOL_TAILLE", 20))
+        self.timeout = float(os.environ.get("HTTP_TIMEOUT", 30))
+        self.__session = requests.Session()
+        adaptateur = HTTPAdapter(pool_connections = taille, pool_maxsize = taille)
+        self.__session.mount("https://", adaptateur)
+        self.__session.mount("http://", adaptateur)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Effectue une requête GET en réutilisant les connexions du pool.
+
+        Parameters
+        ----------
+        url : str
+            Adresse de la ressource.
+        **kwargs
+            Arguments transmis à requests.Session.get (params, headers, timeout...).
+
+        Returns
+        -------
+        requests.Response
+            Réponse de l'API.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.__session.get(url, **kwargs)
+
+    def fermer(self):
+        """
+        Ferme les connexions du pool.
+        """
+        self.__session.close()
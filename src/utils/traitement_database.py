@@ -1,5 +1,6 @@
 from utils.singleton import Singleton
 from dao.db_connection import DBConnection
+from utils.index_serveurs import IndexServeurs
 import os
 import pandas as pd
 from sqlalchemy import create_engine, text
@@ -14,8 +15,17 @@ class TraitementDatabase(metaclass = Singleton):
     lancer()
         Ré-initialise la base de données en exécutant le script SQL d'initialisation.
 
+    migrer()
+        Met à jour une base de données existante en exécutant les scripts de data/migrations.
+
+    charger_regions()
+        Recharge les tables des régions des fournisseurs cloud depuis les fichiers csv.
+
     traitement_regions_fournisseur()
         Effectue le traitement des données du csv regions_fournisseurs-cloud.
+
+    traitement_zones_regions()
+        Complète le fichier des zones electricity map des régions en interrogeant les API.
     """
 
     def lancer(self):
@@ -28,13 +38,54 @@ class TraitementDatabase(metaclass = Singleton):
         init_db_as_string = init_db.read()
 
         try:
-            with DBConnection().connection as connection:
+            with DBConnection().connexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(init_db_as_string)
         except Exception as e:
             print(e)
             raise
 
+        self.charger_regions()
+
+        print("Ré-initialisation de la base de données - Terminée")
+
+        return True
+
+    def migrer(self):
+        """
+        Met à jour une base de données existante, sans perte de données, en exécutant dans l'ordre
+        les scripts SQL du dossier data/migrations, puis en rechargeant les tables des régions.
+        Les scripts sont écrits pour pouvoir être rejoués.
+        """
+        print("Migration de la base de données")
+
+        for nom_fichier in sorted(os.listdir("data/migrations")):
+            if not nom_fichier.endswith(".sql"):
+                continue
+            print(f"   {nom_fichier}")
+            migration = open(os.path.join("data/migrations", nom_fichier), encoding = "utf-8")
+            try:
+                with DBConnection().connexion() as connection:
+                    with connection.cursor() as cursor:
+                        cursor.execute(migration.read())
+            except Exception as e:
+                print(e)
+                raise
+
+        # Les tables des régions ne contiennent que des données de référence : elles sont rechargées
+        # depuis les fichiers csv pour suivre leur format (zones normalisées, positions pré-calculées).
+        print("   régions des fournisseurs cloud")
+        self.charger_regions()
+
+        print("Migration de la base de données - Terminée")
+
+        return True
+
+    def charger_regions(self):
+        """
+        Recharge les tables de référence des régions des fournisseurs cloud (regions_fournisseurs_cloud et
+        serveur_zone) depuis les fichiers csv, en une seule transaction. Les clés API et l'historique ne sont pas modifiés.
+        """
         dotenv.load_dotenv(override = True)
         HOST = os.environ["HOST"]
         PORT = os.environ["PORT"]
@@ -48,28 +99,45 @@ class TraitementDatabase(metaclass = Singleton):
         if 'zone_disponibilite' in df.columns:
             df = df.drop(columns = ['zone_disponibilite'])
 
+        # Ajout de la position et de la zone electricity map de chaque région depuis le fichier local,
+        # pour ne jamais géocoder un datacenter au moment d'une requête.
+        df_zones = pd.read_csv('./data/zones_regions_fournisseurs-cloud.csv', delimiter = ';', encoding = "utf-8")
+        df = df.merge(df_zones, on = 'identifiant', how = 'left')
+
+        # Normalisation des zones de disponibilité : une ligne (identifiant, zone_em) par zone desservie,
+        # au lieu d'une chaîne "('FR','DE',...)" à analyser à chaque lecture.
+        df_serveur_zone = df[['identifiant']].assign(
+            zone_em = df['zone_disponibilite_em'].str.findall(r"'(.*?)'")).explode('zone_em').dropna()
+        df = df.drop(columns = ['zone_disponibilite_em'])
+
         connection_string = f'postgresql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}'
 
         # Créez une connexion à la base de données en utilisant SQLAlchemy
         engine = create_engine(connection_string)
 
-        # Écrivez le DataFrame dans la base de données en tant que table
-        df.to_sql('regions_fournisseurs_cloud', engine, schema = "projet", if_exists = 'replace', index = False)
-
+        # Les tables sont remplacées dans une même transaction : en cas d'erreur, les anciennes sont conservées.
         try:
-            with DBConnection().connection as connection:
-                with connection.cursor() as cursor:
-                    cursor.execute(
-                        "ALTER TABLE projet.regions_fournisseurs_cloud"
-                        "   ADD PRIMARY KEY (identifiant);            ",
-                        )
+            with engine.begin() as connection:
+                connection.execute(text("DROP TABLE IF EXISTS projet.serveur_zone;                  "
+                                        "DROP TABLE IF EXISTS projet.regions_fournisseurs_cloud;    "))
+                df.to_sql('regions_fournisseurs_cloud', connection, schema = "projet", if_exists = 'replace', index = False)
+                df_serveur_zone.to_sql('serveur_zone', connection, schema = "projet", if_exists = 'replace', index = False)
+                connection.execute(text(
+                    "ALTER TABLE projet.regions_fournisseurs_cloud                        "
+                    "   ADD PRIMARY KEY (identifiant);                                    "
+                    "ALTER TABLE projet.serveur_zone                                      "
+                    "   ADD PRIMARY KEY (zone_em, identifiant),                           "
+                    "   ADD FOREIGN KEY (identifiant)                                     "
+                    "       REFERENCES projet.regions_fournisseurs_cloud (identifiant)    "
+                    "       ON DELETE CASCADE;                                            "
+                    "CREATE INDEX serveur_zone_identifiant_idx                            "
+                    "   ON projet.serveur_zone (identifiant);                             "))
         except Exception as e:
             print(e)
             raise
 
-        print("Ré-initialisation de la base de données - Terminée")
-
-        return True
+        # Les serveurs ont été rechargés : l'index zone -> serveurs est reconstruit.
+        IndexServeurs().construire()
 
     def traitement_regions_fournisseur(self):
         """
@@ -90,5 +158,29 @@ class TraitementDatabase(metaclass = Singleton):
         # Enregistrer les modifications dans un nouveau fichier CSV
         df.to_csv("data/regions_fournisseurs-cloud.csv", sep = ';', index = False)
 
+    def traitement_zones_regions(self):
+        """
+        Complète le fichier zones_regions_fournisseurs-cloud avec la position et la zone electricity map
+        des régions du csv regions_fournisseurs-cloud qui n'y figurent pas encore (nécessite l'accès aux API).
+        """
+        from business_object.zone_geographique import ZoneGeographique
+
+        df = pd.read_csv('data/regions_fournisseurs-cloud.csv', delimiter = ';', encoding = "utf-8")
+        df_zones = pd.read_csv('data/zones_regions_fournisseurs-cloud.csv', delimiter = ';', encoding = "utf-8")
+
+        lignes = []
+        positions = {}
+        for _, row in df[~df["identifiant"].isin(df_zones["identifiant"])].iterrows():
+            ville = row["ville"].replace("\xa0", " ")
+            if ville not in positions:
+                lieu = ZoneGeographique(ville)
+                latitude, longitude = lieu.coordonnees()
+                positions[ville] = (latitude, longitude, ZoneGeographique.coordonnees_to_zone(latitude, longitude))
+            latitude, longitude, zone = positions[ville]
+            lignes.append({"identifiant": row["identifiant"], "latitude": latitude, "longitude": longitude, "zone_em": zone})
+
+        df_zones = pd.concat([df_zones, pd.DataFrame(lignes, columns = df_zones.columns)], ignore_index = True)
+        df_zones.to_csv("data/zones_regions_fournisseurs-cloud.csv", sep = ';', index = False)
+
 if __name__ == "__main__":
     TraitementDatabase().lancer()